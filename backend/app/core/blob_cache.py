@@ -0,0 +1,187 @@
+from typing import Iterable, List, Optional, Tuple
+import hashlib
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.metrics import STORAGE_CACHE_EVICTED
+from app.core.sqlite_store import SQLiteStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blob_cache (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_blob_cache_last_access ON blob_cache(last_access);
+-- Taille totale des fichiers en cache (ligne unique)
+CREATE TABLE IF NOT EXISTS blob_cache_usage (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO blob_cache_usage (id, bytes) VALUES (0, 0);
+"""
+
+# Entrées évincées par requête tant que la taille maximale est dépassée
+_EVICTION_BATCH = 64
+
+
+def _key(filename: str, folder: str) -> str:
+    return f"{folder}/{filename}"
+
+
+class BlobCache(SQLiteStore):
+    """
+    Cache disque LRU de fichiers d'un backend distant, partagé par les workers
+    d'un même hôte. Les fichiers sont dans STORAGE_CACHE_DIR, l'index SQLite
+    garde leur taille et leur dernier accès : au-delà de STORAGE_CACHE_MAX_BYTES,
+    les moins récemment lus sont supprimés. L'heure d'accès n'est réécrite
+    qu'après STORAGE_CACHE_TOUCH_INTERVAL (une lecture ne coûte pas une écriture)
+    """
+
+    SCHEMA = SCHEMA
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None,
+                 db_path: Optional[str] = None):
+        super().__init__(db_path or settings.STORAGE_CACHE_DB_PATH)
+        self.directory = directory or settings.STORAGE_CACHE_DIR
+        self.max_bytes = settings.STORAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+    def _on_create(self, conn: sqlite3.Connection) -> None:
+        # Index recréé : fichiers d'un cache précédent non comptés, supprimés
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def path_for(self, filename: str, folder: str) -> str:
+        """Emplacement du fichier en cache (empreinte du nom, deux niveaux)"""
+        digest = hashlib.blake2b(_key(filename, folder).encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def temp_path(self) -> str:
+        """Fichier de remplissage, sur le même disque que le cache (renommage atomique)"""
+        temp_dir = os.path.join(self.directory, "tmp")
+        os.makedirs(temp_dir, exist_ok=True)
+        return os.path.join(temp_dir, uuid.uuid4().hex)
+
+    def lookup_sync(self, filename: str, folder: str) -> Optional[Tuple[str, int]]:
+        """Chemin et taille du fichier s'il est en cache (accès enregistré pour le LRU)"""
+        key = _key(filename, folder)
+        with self._reader() as conn:
+            row = conn.execute("SELECT size, last_access FROM blob_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        path = self.path_for(filename, folder)
+        if not os.path.exists(path):
+            # Supprimé entre-temps (éviction concurrente, nettoyage manuel)
+            self.discard_sync([filename], folder)
+            return None
+
+        now = time.time()
+        if now - row["last_access"] >= settings.STORAGE_CACHE_TOUCH_INTERVAL:
+            with self._transaction() as conn:
+                conn.execute("UPDATE blob_cache SET last_access = ? WHERE key = ?", (now, key))
+        return path, row["size"]
+
+    def admit_sync(self, filename: str, folder: str, temp_path: str) -> Optional[str]:
+        """
+        Place un fichier rempli dans le cache et évince les moins récemment lus
+        au-delà de la taille maximale ; retourne son chemin (None si trop gros)
+        """
+        size = os.path.getsize(temp_path)
+        if size > settings.STORAGE_CACHE_MAX_OBJECT_SIZE or size > self.max_bytes:
+            os.remove(temp_path)
+            return None
+
+        path = self.path_for(filename, folder)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+
+        key = _key(filename, folder)
+        victims: List[str] = []
+        with self._transaction() as conn:
+            previous = conn.execute("SELECT size FROM blob_cache WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO blob_cache (key, size, last_access) VALUES (?, ?, ?)",
+                (key, size, time.time())
+            )
+            usage = conn.execute(
+                "UPDATE blob_cache_usage SET bytes = bytes + ? WHERE id = 0 RETURNING bytes",
+                (size - (previous["size"] if previous else 0),)
+            ).fetchone()["bytes"]
+
+            while usage > self.max_bytes:
+                rows = conn.execute(
+                    "DELETE FROM blob_cache WHERE key IN ("
+                    "  SELECT key FROM blob_cache WHERE key != ? ORDER BY last_access LIMIT ?"
+                    ") RETURNING key, size",
+                    (key, _EVICTION_BATCH)
+                ).fetchall()
+                if not rows:
+                    break
+                freed = sum(row["size"] for row in rows)
+                usage = conn.execute(
+                    "UPDATE blob_cache_usage SET bytes = bytes - ? WHERE id = 0 RETURNING bytes", (freed,)
+                ).fetchone()["bytes"]
+                victims.extend(row["key"] for row in rows)
+
+        for victim in victims:
+            victim_folder, victim_filename = victim.split("/", 1)
+            self._remove(self.path_for(victim_filename, victim_folder))
+        if victims:
+            STORAGE_CACHE_EVICTED.inc(len(victims))
+        return path
+
+    def discard_sync(self, filenames: Iterable[str], folder: str) -> None:
+        """Retire des fichiers du cache (supprimés du backend distant)"""
+        filenames = list(filenames)
+        freed = 0
+        with self._transaction() as conn:
+            for filename in filenames:
+                row = conn.execute(
+                    "DELETE FROM blob_cache WHERE key = ? RETURNING size", (_key(filename, folder),)
+                ).fetchone()
+                if row is not None:
+                    freed += row["size"]
+            if freed:
+                conn.execute("UPDATE blob_cache_usage SET bytes = bytes - ? WHERE id = 0", (freed,))
+        for filename in filenames:
+            self._remove(self.path_for(filename, folder))
+
+    def pin_sync(self, path: str) -> str:
+        """
+        Second lien vers un fichier du cache (même inode, sans copie) : lisible même
+        s'il est évincé entre-temps ; à retirer avec unpin_sync
+        """
+        pinned = self.temp_path()
+        try:
+            os.link(path, pinned)
+        except FileNotFoundError:
+            # Évincé avant l'épinglage : erreur de l'appelant (nouvelle tentative)
+            raise
+        except OSError:
+            # Système de fichiers sans liens physiques
+            shutil.copyfile(path, pinned)
+        return pinned
+
+    def unpin_sync(self, pinned: str) -> None:
+        self._remove(pinned)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def lookup(self, filename: str, folder: str) -> Optional[Tuple[str, int]]:
+        return await self._run(self.lookup_sync, filename, folder)
+
+    async def admit(self, filename: str, folder: str, temp_path: str) -> Optional[str]:
+        return await self._run(self.admit_sync, filename, folder, temp_path)
+
+    async def discard(self, filenames: Iterable[str], folder: str) -> None:
+        await self._run(self.discard_sync, filenames, folder)
@@ -11,14 +11,163 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "uploads"
     CV_UPLOAD_DIR: str = "uploads/cv"
     DATA_UPLOAD_DIR: str = "uploads/data"
+    # Répartition des fichiers locaux en sous-dossiers (uploads/cv/ab/cd/abcd....pdf)
+    STORAGE_SHARD_DEPTH: int = 2  # Nombre de niveaux, 0 = dossier à plat
+    STORAGE_SHARD_WIDTH: int = 2  # Caractères du nom par niveau
+    MAX_FORM_OVERHEAD: int = 1024 * 1024  # Marge pour form_data et l'enveloppe multipart
+    DOWNLOAD_CHUNK_SIZE: int = 256 * 1024  # Blocs envoyés par /api/uploads/{id}/cv
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # Lecture/écriture du CV par blocs de 1MB
     
-    # Azure Storage Configuration (for future use)
+    # E/S bloquantes (fichiers, SQLite) exécutées hors de la boucle d'événements
+    IO_THREADS: int = 32  # Taille du pool de threads dédié, par worker
+    # Surveillance de la boucle d'événements (métriques cv_event_loop_*)
+    LOOP_LAG_INTERVAL: float = 0.25  # Secondes entre deux mesures
+    LOOP_LAG_THRESHOLD: float = 0.1  # Retard journalisé (secondes), 0 = désactivé
+    LOOP_LAG_CAPTURE_STACK: bool = True  # Journalise la pile de la boucle pendant un blocage
+    
+    # Préchauffage de chaque worker au démarrage, avant la première requête
+    WARM_UP_ON_STARTUP: bool = True
+    
+    # Contrôle d'admission des uploads (par worker) : surplus rejeté en 503 + Retry-After
+    UPLOAD_MAX_CONCURRENCY: int = 32  # Requêtes d'upload simultanées, 0 = illimité
+    UPLOAD_ADMISSION_TIMEOUT: float = 0.0  # Attente max d'une place libre (secondes)
+    UPLOAD_RETRY_AFTER: int = 1  # Secondes indiquées dans Retry-After
+    
+    # Limitation de débit des uploads par client (seaux à jetons en mémoire, 429)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_IP_RATE: float = 1.0  # Requêtes par seconde et par adresse IP
+    RATE_LIMIT_IP_BURST: int = 20
+    RATE_LIMIT_API_KEYS: List[str] = []  # Clés d'API reconnues (limites propres)
+    RATE_LIMIT_API_KEY_HEADER: str = "X-API-Key"
+    RATE_LIMIT_API_KEY_RATE: float = 20.0
+    RATE_LIMIT_API_KEY_BURST: int = 200
+    RATE_LIMIT_MAX_CLIENTS: int = 100_000  # Seaux conservés en mémoire (LRU)
+    
+    # Idempotence des uploads : réponse rejouée pour une même clé (en-tête Idempotency-Key)
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_HEADER: str = "Idempotency-Key"
+    IDEMPOTENCY_KEY_MAX_LENGTH: int = 255
+    IDEMPOTENCY_DB_PATH: str = "state/idempotency.db"
+    IDEMPOTENCY_TTL: int = 24 * 3600  # Durée de conservation d'une réponse (secondes)
+    IDEMPOTENCY_MAX_KEYS: int = 100_000  # Clés conservées au plus (les plus anciennes évincées)
+    IDEMPOTENCY_LOCK_TIMEOUT: int = 300  # Réservation d'une clé reprise au-delà (worker arrêté)
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 30.0  # Attente d'une requête identique dans un autre worker (409 ensuite)
+    IDEMPOTENCY_POLL_INTERVAL: float = 0.2
+    
+    # Upload par lot (/api/upload/batch)
+    BATCH_MAX_ITEMS: int = 50
+    BATCH_UPLOAD_CONCURRENCY: int = 4  # Sauvegardes simultanées par lot
+    
+    # Uploads reprenables (/api/upload-sessions) : blocs assemblés sur disque,
+    # validés à la finalisation. Dossier partagé par les workers d'un même hôte
+    UPLOAD_SESSION_DIR: str = "state/upload_sessions"
+    UPLOAD_SESSION_DB_PATH: str = "state/upload_sessions.db"
+    UPLOAD_SESSION_TTL: int = 24 * 3600  # Secondes sans nouveau bloc avant expiration
+    UPLOAD_SESSION_MAX_CHUNK_SIZE: int = 16 * 1024 * 1024  # Octets par requête PUT
+    UPLOAD_SESSION_GC_INTERVAL: int = 600  # Secondes, 0 = pas de nettoyage automatique
+    
+    # Listing (/api/uploads) et export en flux (/api/export/uploads)
+    UPLOADS_MAX_PAGE_SIZE: int = 1000
+    EXPORT_BATCH_SIZE: int = 2000  # Uploads lus et encodés par lot
+    
+    # Doublons de candidats : uploads précédents liés par email ou téléphone normalisé
+    DUPLICATE_MAX_LINKS: int = 5  # Derniers uploads précédents retournés par upload
+    
+    # Conservation des données (RGPD) : purge des uploads plus anciens que RETENTION_DAYS
+    RETENTION_DAYS: int = 730  # Durée de conservation d'une candidature (jours)
+    RETENTION_ENABLED: bool = False  # Purge planifiée dans les workers (sinon : manage.py purge-expired)
+    RETENTION_INTERVAL: int = 3600  # Secondes entre deux purges planifiées
+    RETENTION_BATCH_SIZE: int = 500  # Uploads retirés par transaction
+    RETENTION_BATCH_PAUSE: float = 1.0  # Pause entre deux lots (secondes) : priorité aux uploads
+    RETENTION_MAX_UPLOADS_PER_RUN: int = 50_000  # 0 = sans limite
+    RETENTION_DELETE_CONCURRENCY: int = 8  # Suppressions de fichiers simultanées (local, journal)
+    RETENTION_LOCK_TTL: int = 300  # Réservation d'un CV par un upload ou par sa suppression (secondes)
+    RETENTION_LOCK_POLL_INTERVAL: float = 0.1  # Attente d'un upload pendant la suppression du même CV
+    RETENTION_LOCK_PATH: str = "state/retention.lock"  # Une seule purge à la fois entre workers
+    
+    # Événements vers les services aval (outbox transactionnelle, livraison par lots)
+    OUTBOX_SINK_URL: str = ""  # http(s)://... ou file:chemin (NDJSON local) ; vide = pas d'événements
+    OUTBOX_BATCH_SIZE: int = 100  # Événements par requête
+    OUTBOX_MAX_IN_FLIGHT: int = 4  # Lots envoyés simultanément par worker
+    OUTBOX_TIMEOUT: float = 10.0  # Délai maximal d'une requête vers le destinataire
+    OUTBOX_LINGER: float = 0.05  # Attente avant réservation d'un lot (regroupe les uploads simultanés)
+    OUTBOX_POLL_INTERVAL: float = 5.0  # Relecture de l'outbox sans nouvel upload (secondes)
+    OUTBOX_LEASE_SECONDS: int = 60  # Réservation d'un lot, reprise ensuite par un autre worker
+    OUTBOX_MAX_ATTEMPTS: int = 12  # Au-delà : événement abandonné (status 'dead')
+    OUTBOX_BACKOFF_BASE: float = 1.0  # Attente avant la 2e tentative, doublée ensuite
+    OUTBOX_BACKOFF_MAX: float = 600.0
+    
+    # Index des uploads (hors du dossier servi en statique)
+    STATE_DIR: str = "state"
+    INDEX_DB_PATH: str = "state/uploads.db"
+    
+    # Cache des lectures (/api/uploads/{id}, /api/form-config, /uploads)
+    UPLOAD_CACHE_SIZE: int = 10_000  # Entrées du LRU des métadonnées, 0 = désactivé
+    UPLOAD_CACHE_TTL: float = 30.0  # Secondes (écritures des autres workers)
+    FORM_CONFIG_MAX_AGE: int = 300
+    
+    # Extraction du texte des CV (pool de processus)
+    EXTRACTION_ENABLED: bool = True
+    EXTRACTION_DB_PATH: str = "state/extraction.db"
+    EXTRACTION_WORKERS: int = 0  # 0 = nombre de CPU
+    EXTRACTION_MAX_CHARS: int = 200_000
+    EXTRACTION_MAX_ATTEMPTS: int = 3
+    EXTRACTION_LEASE_SECONDS: int = 300  # Reprise des jobs abandonnés par un worker arrêté
+    EXTRACTION_POLL_INTERVAL: float = 2.0
+    
+    # Recherche plein texte (SQLite FTS5)
+    SEARCH_DB_PATH: str = "state/search.db"
+    SEARCH_MAX_TERMS: int = 16
+    SEARCH_MAX_PAGE_SIZE: int = 100
+    
+    # Matching CV / offre d'emploi (matrice NumPy mappée en mémoire)
+    MATCH_DIR: str = "state/match"
+    MATCH_DIM: int = 256  # Dimensions hachées : 500k CV = 512MB en float32
+    MATCH_BLOCK_ROWS: int = 65536  # Lignes par produit matrice-vecteur
+    MATCH_MAX_TOP_K: int = 100
+    MATCH_MAX_QUERY_CHARS: int = 20_000
+    MATCH_INSERT_LINGER: float = 0.05  # Regroupement des uploads simultanés (une écriture des fréquences par lot)
+    
+    # Rattrapage des index de recherche et de matching depuis l'index des uploads
+    RECONCILE_INTERVAL: int = 60  # Secondes entre deux passages, 0 = désactivé
+    RECONCILE_LAG: int = 300  # Uploads revérifiés avant la dernière position (validés dans le désordre)
+    RECONCILE_BATCH_SIZE: int = 500
+    RECONCILE_LOCK_PATH: str = "state/reconcile.lock"  # Un seul rattrapage à la fois entre workers
+    
+    # Métriques Prometheus (/metrics)
+    # Dossier partagé par les workers uvicorn pour l'agrégation, vide = mono-processus
+    METRICS_MULTIPROC_DIR: str = "state/metrics"
+    
+    # Azure Storage Configuration
     AZURE_STORAGE_CONNECTION_STRING: str = ""
     AZURE_CONTAINER_NAME: str = "cv-uploads"
+    AZURE_CREATE_CONTAINER: bool = True  # Création du container au démarrage s'il n'existe pas
+    AZURE_MAX_CONNECTIONS: int = 100  # Taille du pool de connexions HTTP partagé
+    AZURE_KEEPALIVE_TIMEOUT: float = 30.0
+    AZURE_MAX_SINGLE_PUT_SIZE: int = 8 * 1024 * 1024  # Au-delà : envoi par blocs
+    AZURE_BLOCK_SIZE: int = 4 * 1024 * 1024
+    AZURE_UPLOAD_CONCURRENCY: int = 4  # Blocs envoyés en parallèle par fichier
+    AZURE_DELETE_BATCH_SIZE: int = 256  # Blobs supprimés par requête batch (maximum 256)
     
-    # Storage Backend ("local" or "azure")
+    # Cache disque devant Azure : lectures servies localement (LRU borné, partagé par
+    # les workers d'un hôte), uploads écrits dans les deux niveaux
+    STORAGE_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # 0 = pas de cache
+    STORAGE_CACHE_MAX_OBJECT_SIZE: int = 32 * 1024 * 1024  # Fichiers plus gros lus sans cache
+    STORAGE_CACHE_DIR: str = "state/blob_cache"
+    STORAGE_CACHE_DB_PATH: str = "state/blob_cache.db"
+    STORAGE_CACHE_TOUCH_INTERVAL: float = 60.0  # Précision de l'heure d'accès (LRU), en secondes
+    
+    # Storage Backend ("local", "azure" or "log")
     STORAGE_BACKEND: str = "local"
     
+    # Backend "log" : données JSON dans des journaux segmentés (CV en fichiers locaux)
+    # Hors du dossier servi en statique ; ce sont des données primaires à sauvegarder
+    LOG_STORAGE_DIR: str = "state/log"
+    LOG_SEGMENT_SIZE: int = 64 * 1024 * 1024  # Taille de scellement d'un segment
+    LOG_GROUP_COMMIT_DELAY: float = 0.0  # Attente avant écriture d'un lot (secondes)
+    LOG_COMPACTION_INTERVAL: int = 600  # Secondes, 0 = pas de compaction automatique
+    LOG_COMPACTION_MIN_SEGMENTS: int = 4  # Segments scellés avant compaction
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,174 @@
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import base64
+import csv
+import io
+import json
+import logging
+import sqlite3
+
+from app.core.config import settings
+from app.core.form_config import FORM_FIELDS
+from app.core.index import UploadIndex
+from app.core.io_pool import run_io
+
+logger = logging.getLogger(__name__)
+
+# Colonnes CSV fixes, suivies des champs du formulaire puis des champs non configurés
+CSV_BASE_COLUMNS = ("upload_id", "created_at", "cv_filename", "cv_sha256", "cv_size")
+CSV_OTHER_FIELDS_COLUMN = "other_form_fields"
+# Première cellule de la ligne finale d'un export CSV interrompu
+CSV_ERROR_MARKER = "#export_error"
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class InvalidCursor(ValueError):
+    """Curseur de pagination illisible"""
+
+
+def encode_cursor(key: Tuple[str, str]) -> str:
+    """Curseur opaque : clé (created_at, upload_id) du dernier élément retourné"""
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, upload_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(created_at), str(upload_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+def to_index_date(value: Optional[datetime]) -> Optional[str]:
+    """Borne de date au format des dates de l'index (ISO UTC, sans fuseau = UTC)"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def _csv_columns() -> List[str]:
+    form_columns = [field["name"] for field in FORM_FIELDS if field["name"] not in CSV_BASE_COLUMNS]
+    return [*CSV_BASE_COLUMNS, *form_columns, CSV_OTHER_FIELDS_COLUMN]
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return "" if value is None else value
+
+
+class _CSVEncoder:
+    """Lignes CSV d'un lot d'uploads (formulaire à plat, une colonne par champ configuré)"""
+
+    def __init__(self):
+        self.columns = _csv_columns()
+        self.form_columns = self.columns[len(CSV_BASE_COLUMNS):-1]
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+
+    def header(self) -> bytes:
+        self._writer.writerow(self.columns)
+        return self._flush()
+
+    def encode(self, rows: Sequence[sqlite3.Row]) -> bytes:
+        for row in rows:
+            metadata = json.loads(row["metadata"])
+            form_data = metadata.get("form_data") or {}
+            other_fields = {key: value for key, value in form_data.items() if key not in self.form_columns}
+            self._writer.writerow([
+                row["upload_id"],
+                row["created_at"],
+                *(_csv_value(metadata.get(column)) for column in CSV_BASE_COLUMNS[2:]),
+                *(_csv_value(form_data.get(column)) for column in self.form_columns),
+                _csv_value(other_fields) if other_fields else ""
+            ])
+        return self._flush()
+
+    def error(self, message: str, last_created_at: Optional[str]) -> bytes:
+        self._writer.writerow([CSV_ERROR_MARKER, last_created_at or "", message])
+        return self._flush()
+
+    def _flush(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+def _encode_ndjson(rows: Sequence[sqlite3.Row]) -> bytes:
+    """Une ligne par upload : les métadonnées sont déjà stockées en JSON compact"""
+    return "".join(f"{row['metadata']}\n" for row in rows).encode("utf-8")
+
+
+def _ndjson_error(message: str, last_created_at: Optional[str]) -> bytes:
+    return (json.dumps(
+        {"export_error": message, "last_created_at": last_created_at}, ensure_ascii=False, separators=(",", ":")
+    ) + "\n").encode("utf-8")
+
+
+async def iter_export(
+    index: UploadIndex,
+    export_format: str,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    """
+    Export en flux des métadonnées indexées (NDJSON ou CSV), par lots de
+    EXPORT_BATCH_SIZE lus par curseur : la mémoire reste bornée quel que soit le
+    nombre d'uploads. Lecture et encodage d'un lot dans le pool d'E/S
+    Une erreur après l'envoi des en-têtes (statut 200) termine le flux par une
+    ligne d'erreur : {"export_error": ...} en NDJSON, ligne CSV_ERROR_MARKER en CSV,
+    avec la date de création du dernier upload exporté (reprise par created_from)
+    """
+    encoder = _CSVEncoder() if export_format == "csv" else None
+    if encoder is not None:
+        yield encoder.header()
+
+    def next_batch(after: Optional[Tuple[str, str]]) -> Tuple[bytes, Optional[Tuple[str, str]]]:
+        rows = index.page_sync(settings.EXPORT_BATCH_SIZE, after, created_from, created_to)
+        if not rows:
+            return b"", None
+        data = encoder.encode(rows) if encoder is not None else _encode_ndjson(rows)
+        return data, (rows[-1]["created_at"], rows[-1]["upload_id"])
+
+    after = None
+    while True:
+        try:
+            data, next_after = await run_io(next_batch, after)
+        except Exception:
+            logger.exception("Export des uploads interrompu")
+            message = "Export interrompu : erreur de lecture de l'index"
+            last_created_at = after[0] if after else None
+            if encoder is not None:
+                yield encoder.error(message, last_created_at)
+            else:
+                yield _ndjson_error(message, last_created_at)
+            return
+        if next_after is None:
+            return
+        after = next_after
+        yield data
+
+
+def list_page(rows: Sequence[sqlite3.Row], limit: int) -> bytes:
+    """
+    Corps JSON d'une page de GET /api/uploads (`limit + 1` lignes lues pour savoir
+    s'il reste une page). Les métadonnées stockées en JSON compact sont reprises
+    telles quelles, sans décodage ni réencodage
+    """
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor((last["created_at"], last["upload_id"]))
+    return "".join((
+        '{"items":[', ",".join(row["metadata"] for row in items),
+        '],"count":', str(len(items)),
+        ',"next_cursor":', json.dumps(next_cursor), "}"
+    )).encode("utf-8")
@@ -0,0 +1,333 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+
+from app.core.config import settings
+from app.core.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extraction_jobs (
+    upload_id TEXT PRIMARY KEY,
+    cv_filename TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT,
+    enqueued_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_extraction_jobs_status ON extraction_jobs(status, enqueued_at);
+"""
+
+# Statuts d'un job d'extraction
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def extract_pdf(path: str, max_chars: int) -> Dict[str, Any]:
+    """
+    Extrait le texte, le nombre de pages et l'état de chiffrement d'un PDF
+    Exécuté dans un processus du pool : ne doit dépendre d'aucun état de l'application
+    """
+    from pypdf import PasswordType, PdfReader
+
+    reader = PdfReader(path)
+    encrypted = reader.is_encrypted
+    if encrypted:
+        # Beaucoup de PDF sont chiffrés avec un mot de passe utilisateur vide ;
+        # un vrai mot de passe n'est pas une erreur (decrypt ne lève pas)
+        try:
+            decrypted = reader.decrypt("") != PasswordType.NOT_DECRYPTED
+        except Exception:
+            # Dictionnaire de chiffrement illisible ou algorithme non supporté
+            decrypted = False
+        if not decrypted:
+            return {"encrypted": True, "page_count": None, "text": "", "text_truncated": False}
+
+    parts: List[str] = []
+    length = 0
+    for page in reader.pages:
+        page_text = page.extract_text() or ""
+        parts.append(page_text)
+        length += len(page_text)
+        if length >= max_chars:
+            break
+
+    text = "\n".join(parts)
+    return {
+        "encrypted": encrypted,
+        "page_count": len(reader.pages),
+        "text": text[:max_chars],
+        "text_truncated": len(text) > max_chars
+    }
+
+
+def _warm_up_worker() -> None:
+    """Démarre un processus du pool et importe pypdf"""
+    import pypdf  # noqa: F401
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ExtractionQueue(SQLiteStore):
+    """
+    File persistante des jobs d'extraction
+    Les jobs sont réservés atomiquement : plusieurs workers peuvent la consommer
+    """
+
+    SCHEMA = SCHEMA
+
+    def __init__(self, db_path: Optional[str] = None):
+        super().__init__(db_path or settings.EXTRACTION_DB_PATH)
+
+    def enqueue_sync(self, upload_id: str, cv_filename: str) -> None:
+        now = _now()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO extraction_jobs (upload_id, cv_filename, status, enqueued_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (upload_id, cv_filename, PENDING, now, now)
+            )
+
+    def claim_sync(self, limit: int) -> List[sqlite3.Row]:
+        """Réserve jusqu'à `limit` jobs en attente (les réservations expirées sont reprises)"""
+        now = datetime.now(timezone.utc)
+        lease_expired = (now - timedelta(seconds=settings.EXTRACTION_LEASE_SECONDS)).isoformat()
+
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE extraction_jobs SET status = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE upload_id IN ("
+                "  SELECT upload_id FROM extraction_jobs "
+                "  WHERE status = ? OR (status = ? AND updated_at < ?) "
+                "  ORDER BY enqueued_at LIMIT ?"
+                ") RETURNING upload_id, cv_filename, attempts",
+                (RUNNING, now.isoformat(), PENDING, RUNNING, lease_expired, limit)
+            ).fetchall()
+
+    def complete_sync(self, upload_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                      error: Optional[str] = None) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE extraction_jobs SET status = ?, result = ?, error = ?, updated_at = ? "
+                "WHERE upload_id = ?",
+                (
+                    status,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    _now(),
+                    upload_id
+                )
+            )
+
+    def get_job_sync(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        with self._reader() as conn:
+            row = conn.execute(
+                "SELECT * FROM extraction_jobs WHERE upload_id = ?", (upload_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return {
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "error": row["error"],
+            "enqueued_at": row["enqueued_at"],
+            "updated_at": row["updated_at"],
+            "result": json.loads(row["result"]) if row["result"] else None
+        }
+
+    def delete_sync(self, upload_ids: List[str]) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                f"DELETE FROM extraction_jobs WHERE upload_id IN ({','.join('?' * len(upload_ids))})", upload_ids
+            )
+
+    async def enqueue(self, upload_id: str, cv_filename: str) -> None:
+        await self._run(self.enqueue_sync, upload_id, cv_filename)
+
+    async def claim(self, limit: int) -> List[sqlite3.Row]:
+        return await self._run(self.claim_sync, limit)
+
+    async def complete(self, upload_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                       error: Optional[str] = None) -> None:
+        await self._run(self.complete_sync, upload_id, status, result, error)
+
+    async def get_job(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.get_job_sync, upload_id)
+
+    async def delete(self, upload_ids: List[str]) -> None:
+        await self._run(self.delete_sync, upload_ids)
+
+    def get_text_sync(self, upload_id: str) -> Optional[str]:
+        """Texte extrait d'un CV, si l'extraction est terminée"""
+        with self._reader() as conn:
+            row = conn.execute(
+                "SELECT json_extract(result, '$.text') AS text FROM extraction_jobs "
+                "WHERE upload_id = ? AND status = ?",
+                (upload_id, DONE)
+            ).fetchone()
+        return row["text"] if row else None
+
+
+class ExtractionPipeline:
+    """
+    Traitement post-upload des CV
+    Chaque upload est mis en file ; l'extraction PDF s'exécute dans un pool de
+    processus, hors de la boucle d'événements, et son résultat est sauvegardé
+    dans le dossier `extraction` du backend de stockage
+    """
+
+    def __init__(self, storage_service):
+        self.storage_service = storage_service
+        self.queue = ExtractionQueue()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._concurrency = 1
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._result_listeners: List[Callable[[str, Dict[str, Any]], Awaitable[None]]] = []
+
+    def add_result_listener(self, listener: Callable[[str, Dict[str, Any]], Awaitable[None]]) -> None:
+        """Enregistre un traitement appelé avec le résultat de chaque extraction réussie"""
+        if listener not in self._result_listeners:
+            self._result_listeners.append(listener)
+
+    async def start(self) -> None:
+        if not settings.EXTRACTION_ENABLED or self._task is not None:
+            return
+
+        self._concurrency = settings.EXTRACTION_WORKERS or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._concurrency,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._wakeup = asyncio.Event()
+        self.storage_service.add_upload_listener(self.on_upload)
+        self._task = asyncio.create_task(self._run())
+
+    async def warm_up(self) -> None:
+        """
+        Démarre les processus du pool (spawn et imports) avant le premier upload
+        et ouvre la file des jobs
+        """
+        await self.queue.warm_up()
+        if self._executor is None:
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _warm_up_worker) for _ in range(self._concurrency)
+        ))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+        self.queue.close()
+
+    async def on_upload(self, metadata: Dict[str, Any]) -> None:
+        """Listener du StorageService : met le CV en file d'extraction"""
+        await self.queue.enqueue(metadata["upload_id"], metadata["cv_filename"])
+        self._wakeup.set()
+
+    async def on_purge(self, upload_ids: List[str]) -> None:
+        """Listener de la purge de rétention : jobs et textes extraits supprimés"""
+        await self.queue.delete(upload_ids)
+
+    async def get_status(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        return await self.queue.get_job(upload_id)
+
+    async def _run(self) -> None:
+        in_flight: Set[asyncio.Task] = set()
+        try:
+            await self._consume(in_flight)
+        finally:
+            # Arrêt : les jobs en cours seront repris à l'expiration de leur réservation
+            for task in in_flight:
+                task.cancel()
+
+    async def _consume(self, in_flight: Set[asyncio.Task]) -> None:
+        while True:
+            self._wakeup.clear()
+            free_slots = self._concurrency - len(in_flight)
+            jobs = []
+            if free_slots > 0:
+                try:
+                    jobs = await self.queue.claim(free_slots)
+                except Exception:
+                    logger.exception("Impossible de lire la file d'extraction")
+
+            for job in jobs:
+                in_flight.add(asyncio.create_task(self._process(job)))
+
+            if jobs and len(in_flight) < self._concurrency:
+                continue
+
+            # Attente : fin d'un job, nouvel upload ou scrutation périodique
+            # (jobs déposés par un autre worker)
+            wakeup = asyncio.ensure_future(self._wakeup.wait())
+            await asyncio.wait(
+                {wakeup, *in_flight},
+                timeout=settings.EXTRACTION_POLL_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            wakeup.cancel()
+            in_flight.difference_update([task for task in in_flight if task.done()])
+
+    async def _process(self, job: sqlite3.Row) -> None:
+        upload_id = job["upload_id"]
+        loop = asyncio.get_running_loop()
+        try:
+            # Téléchargement compris : un échec suit le chemin des nouvelles tentatives.
+            # Le fichier reste lisible pendant l'extraction (cache disque épinglé)
+            async with self.storage_service.backend.local_file(job["cv_filename"], "cv") as cv_path:
+                if cv_path is None:
+                    result = None
+                else:
+                    result = await loop.run_in_executor(
+                        self._executor, extract_pdf, cv_path, settings.EXTRACTION_MAX_CHARS
+                    )
+            if result is not None:
+                result = {"upload_id": upload_id, "extracted_at": _now(), **result}
+                # Résultat mis en cache dans le stockage, à côté des métadonnées
+                await self.storage_service.backend.save_json(result, f"{upload_id}.json", "extraction")
+        except Exception as e:
+            status = FAILED if job["attempts"] >= settings.EXTRACTION_MAX_ATTEMPTS else PENDING
+            logger.warning("Extraction de %s en échec (%s)", upload_id, e)
+            await self.queue.complete(upload_id, status, error=f"{e.__class__.__name__}: {e}")
+            return
+
+        if result is None:
+            await self.queue.complete(
+                upload_id, SKIPPED, error="CV non accessible localement pour ce backend de stockage"
+            )
+            return
+
+        await self.queue.complete(upload_id, DONE, result=result)
+
+        for listener in self._result_listeners:
+            try:
+                await listener(upload_id, result)
+            except Exception:
+                logger.exception("Échec d'un traitement post-extraction pour %s", upload_id)
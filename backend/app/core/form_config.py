@@ -0,0 +1,75 @@
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from app.core.http_cache import CachedPayload
+
+# Configuration exemple - peut être stockée en base ou dans un fichier
+FORM_CONFIG_VERSION = "1.0"
+# Date de la dernière modification de FORM_FIELDS (à mettre à jour avec la version)
+FORM_CONFIG_LAST_UPDATED = "2024-01-15T00:00:00"
+
+FORM_FIELDS: List[Dict[str, Any]] = [
+    {
+        "name": "prenom",
+        "type": "text",
+        "label": "Prénom",
+        "required": True,
+        "placeholder": "Votre prénom"
+    },
+    {
+        "name": "nom", 
+        "type": "text",
+        "label": "Nom",
+        "required": True,
+        "placeholder": "Votre nom"
+    },
+    {
+        "name": "email",
+        "type": "email",
+        "label": "Email",
+        "required": True,
+        "placeholder": "votre@email.com"
+    },
+    {
+        "name": "telephone",
+        "type": "tel",
+        "label": "Téléphone",
+        "required": False,
+        "placeholder": "01 23 45 67 89"
+    },
+    {
+        "name": "localisation",
+        "type": "text",
+        "label": "Localisation",
+        "required": False,
+        "placeholder": "Ville, Région"
+    },
+    {
+        "name": "date_disponibilite",
+        "type": "date",
+        "label": "Date de disponibilité",
+        "required": False
+    },
+    {
+        "name": "rgpd_consent",
+        "type": "checkbox",
+        "label": "J'accepte le traitement de mes données personnelles conformément au RGPD",
+        "required": True
+    }
+]
+
+
+def get_form_config() -> Dict[str, Any]:
+    """Configuration du formulaire exposée par /api/form-config"""
+    return {
+        "fields": FORM_FIELDS,
+        "version": FORM_CONFIG_VERSION,
+        "last_updated": FORM_CONFIG_LAST_UPDATED
+    }
+
+
+@lru_cache(maxsize=1)
+def get_form_config_payload() -> CachedPayload:
+    """Configuration sérialisée une fois, avec son ETag (identique dans tous les workers)"""
+    return CachedPayload(get_form_config())
+
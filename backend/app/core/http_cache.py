@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+import hashlib
+import json
+import threading
+import time
+
+from fastapi import Request, Response
+
+T = TypeVar("T")
+
+
+class CachedPayload:
+    """Réponse JSON rendue une fois : corps sérialisé et ETag fort"""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, content: Any):
+        self.body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{hashlib.blake2b(self.body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match : comparaison faible (RFC 9110), liste de tags ou *"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def cached_json_response(
+    request: Request, payload: CachedPayload, cache_control: str, status_code: int = 200
+) -> Response:
+    """Réponse JSON avec ETag et Cache-Control ; 304 sans corps si le client est à jour"""
+    headers = {"ETag": payload.etag, "Cache-Control": cache_control}
+    if etag_matches(request, payload.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=payload.body, status_code=status_code, headers=headers, media_type="application/json"
+    )
+
+
+class LRUCache(Generic[T]):
+    """
+    Cache LRU borné, partagé entre threads
+    `ttl` borne la durée de vie des entrées (écritures faites par d'autres workers)
+    """
+
+    def __init__(self, maxsize: int, ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[T]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: T) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0.0
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[T], bool]) -> None:
+        """Supprime les entrées dont la valeur vérifie `predicate`"""
+        with self._lock:
+            for key in [key for key, (value, _) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,125 @@
+from typing import NamedTuple, Optional
+import sqlite3
+import time
+
+from app.core.config import settings
+from app.core.sqlite_store import SQLiteStore
+
+# Réservé : requête en cours ; terminé : réponse enregistrée, rejouée telle quelle
+PENDING = "pending"
+DONE = "done"
+
+SCHEMA = """
+-- Ancienne table : clés non rattachées au client ni au contenu de la requête
+DROP TABLE IF EXISTS idempotency_keys;
+CREATE TABLE IF NOT EXISTS idempotency_responses (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL,
+    status_code INTEGER,
+    content_type TEXT,
+    body BLOB,
+    fingerprint TEXT,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_responses_expires_at ON idempotency_responses(expires_at);
+"""
+
+# Clés expirées supprimées à chaque réponse enregistrée (nettoyage progressif)
+_EXPIRED_BATCH = 100
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    content_type: Optional[str]
+    body: bytes
+    # Empreinte du corps de la requête d'origine (réutilisation de la clé pour une autre requête)
+    fingerprint: str
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "StoredResponse":
+        return cls(row["status_code"], row["content_type"], row["body"], row["fingerprint"])
+
+
+class IdempotencyStore(SQLiteStore):
+    """
+    Réponses des uploads par clé d'idempotence (en-tête Idempotency-Key)
+    Clés propres à chaque client (voir IdempotencyMiddleware), réponses
+    partagées entre workers : une clé est réservée par la première requête, sa
+    réponse est conservée IDEMPOTENCY_TTL secondes et au plus IDEMPOTENCY_MAX_KEYS
+    clés sont gardées (les plus anciennes évincées)
+    """
+
+    SCHEMA = SCHEMA
+
+    def __init__(self, db_path: Optional[str] = None):
+        super().__init__(db_path or settings.IDEMPOTENCY_DB_PATH)
+
+    def begin_sync(self, key: str) -> Optional[sqlite3.Row]:
+        """
+        Réserve la clé ; retourne None si elle est acquise, sinon la ligne existante
+        (réponse enregistrée ou requête en cours dans un autre worker). Une
+        réservation plus ancienne que IDEMPOTENCY_LOCK_TIMEOUT est reprise
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM idempotency_responses WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO idempotency_responses (key, status, expires_at) VALUES (?, ?, ?)",
+                (key, PENDING, now + settings.IDEMPOTENCY_LOCK_TIMEOUT)
+            )
+            if cursor.rowcount:
+                return None
+            return conn.execute(
+                "SELECT status, status_code, content_type, body, fingerprint FROM idempotency_responses "
+                "WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+    def get_sync(self, key: str) -> Optional[sqlite3.Row]:
+        with self._reader() as conn:
+            return conn.execute(
+                "SELECT status, status_code, content_type, body, fingerprint FROM idempotency_responses "
+                "WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+
+    def complete_sync(self, key: str, response: StoredResponse) -> None:
+        """Enregistre la réponse de la clé réservée, évince les clés expirées ou en surnombre"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE idempotency_responses SET status = ?, status_code = ?, content_type = ?, body = ?, "
+                "fingerprint = ?, expires_at = ? WHERE key = ? RETURNING id",
+                (DONE, response.status_code, response.content_type, response.body,
+                 response.fingerprint, now + settings.IDEMPOTENCY_TTL, key)
+            )
+            row = cursor.fetchone()
+            if row is not None and row["id"] > settings.IDEMPOTENCY_MAX_KEYS:
+                # Identifiants croissants : les MAX_KEYS dernières clés sont conservées
+                conn.execute(
+                    "DELETE FROM idempotency_responses WHERE id <= ?", (row["id"] - settings.IDEMPOTENCY_MAX_KEYS,)
+                )
+            conn.execute(
+                "DELETE FROM idempotency_responses WHERE id IN ("
+                "  SELECT id FROM idempotency_responses WHERE expires_at <= ? LIMIT ?"
+                ")",
+                (now, _EXPIRED_BATCH)
+            )
+
+    def release_sync(self, key: str) -> None:
+        """Libère une clé réservée sans réponse à conserver (échec) : la requête pourra être refaite"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM idempotency_responses WHERE key = ? AND status = ?", (key, PENDING))
+
+    async def begin(self, key: str) -> Optional[sqlite3.Row]:
+        return await self._run(self.begin_sync, key)
+
+    async def get(self, key: str) -> Optional[sqlite3.Row]:
+        return await self._run(self.get_sync, key)
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        await self._run(self.complete_sync, key, response)
+
+    async def release(self, key: str) -> None:
+        await self._run(self.release_sync, key)
@@ -0,0 +1,56 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import re
+
+from app.core.validation import DynamicFormValidator
+
+# Types d'identité reconnus, d'après les règles de validation des champs
+IDENTITY_KINDS = ("email", "phone")
+
+_PHONE_SEPARATORS_RE = re.compile(r"[\s.\-()]")
+_FRENCH_PHONE_RE = re.compile(r"^0[1-9][0-9]{8}$")
+
+
+def normalize_email(value: Any) -> Optional[str]:
+    email = str(value).strip().lower()
+    return email if "@" in email else None
+
+
+def normalize_phone(value: Any) -> Optional[str]:
+    """
+    Numéro français sous la forme 0XXXXXXXXX (format accepté par le validateur),
+    séparateurs et indicatif +33 / 0033 compris ; None si le numéro n'est pas reconnu
+    """
+    phone = _PHONE_SEPARATORS_RE.sub("", str(value))
+    for prefix in ("+33", "0033"):
+        if phone.startswith(prefix):
+            phone = "0" + phone[len(prefix):]
+            break
+    return phone if _FRENCH_PHONE_RE.match(phone) else None
+
+
+_NORMALIZERS = {"email": normalize_email, "phone": normalize_phone}
+
+
+@lru_cache(maxsize=1024)
+def identity_kind(field_name: str) -> Optional[str]:
+    """Type d'identité d'un champ du formulaire (validé comme email ou téléphone)"""
+    rule_keys = DynamicFormValidator.rule_keys(field_name)
+    return next((kind for kind in IDENTITY_KINDS if kind in rule_keys), None)
+
+
+def candidate_identities(form_data: Dict[str, Any]) -> List[Tuple[str, bytes]]:
+    """
+    Identités normalisées d'un candidat : (type, empreinte BLAKE2b de 16 octets)
+    Seules les empreintes sont indexées, pas les adresses ni les numéros
+    """
+    identities = set()
+    for field_name, value in form_data.items():
+        kind = identity_kind(field_name)
+        if kind is None or value is None or isinstance(value, (bool, dict, list)):
+            continue
+        normalized = _NORMALIZERS[kind](value)
+        if normalized:
+            identities.add((kind, hashlib.blake2b(f"{kind}:{normalized}".encode("utf-8"), digest_size=16).digest()))
+    return sorted(identities)
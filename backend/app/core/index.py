@@ -0,0 +1,675 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import asyncio
+import json
+import os
+import sqlite3
+import time
+
+from app.core.config import settings
+from app.core.http_cache import LRUCache
+from app.core.identity import candidate_identities
+from app.core.metadata_log import SegmentedLog
+from app.core.sqlite_store import SQLiteStore
+
+# Origine des timestamps uuid1 (intervalles de 100ns depuis le 15/10/1582)
+_UUID1_EPOCH = datetime(1582, 10, 15, tzinfo=timezone.utc)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    upload_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    cv_filename TEXT NOT NULL,
+    cv_available INTEGER NOT NULL DEFAULT 1,
+    metadata TEXT NOT NULL
+);
+-- Parcours par (date, id) : pagination par curseur et export
+CREATE INDEX IF NOT EXISTS idx_uploads_created_at_id ON uploads(created_at, upload_id);
+DROP INDEX IF EXISTS idx_uploads_created_at;
+CREATE TABLE IF NOT EXISTS cv_blobs (
+    sha256 TEXT PRIMARY KEY,
+    cv_filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    refcount INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS upload_counters (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (scope, key)
+) WITHOUT ROWID;
+-- Empreintes des identités normalisées (email, téléphone) : doublons de candidats
+-- Une ligne par upload et identité, numérotée ; la plus récente porte le nombre
+-- d'uploads de l'identité (lecture bornée, sans compteur séparé)
+CREATE TABLE IF NOT EXISTS candidate_identities (
+    identity BLOB NOT NULL,
+    seq INTEGER NOT NULL,
+    upload_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (identity, seq)
+) WITHOUT ROWID;
+-- Outbox : événements écrits dans la transaction de l'upload, livrés par lots aux
+-- services aval (OutboxDispatcher), supprimés une fois livrés
+CREATE TABLE IF NOT EXISTS outbox (
+    event_id INTEGER PRIMARY KEY,
+    event_type TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+-- Fichiers des uploads purgés, à supprimer du stockage (repris en cas d'échec)
+CREATE TABLE IF NOT EXISTS purge_queue (
+    folder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    sha256 TEXT,
+    PRIMARY KEY (folder, filename)
+) WITHOUT ROWID;
+-- Réservations des CV par empreinte : un upload ('upload', avant de réutiliser un
+-- fichier existant) ou la suppression d'un CV orphelin ('purge'), jamais les deux
+CREATE TABLE IF NOT EXISTS cv_locks (
+    sha256 TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Fichiers de métadonnées et d'extraction d'un upload (nommés par upload_id)
+_UPLOAD_JSON_FOLDERS = ("data", "extraction")
+
+
+def _add_event(conn: sqlite3.Connection, event_type: str, payload: Dict[str, Any]) -> None:
+    """Événement d'outbox, écrit dans la transaction en cours (si un destinataire est configuré)"""
+    if settings.OUTBOX_SINK_URL:
+        conn.execute(
+            "INSERT INTO outbox (event_type, created_at, payload) VALUES (?, ?, ?)",
+            (
+                event_type,
+                datetime.now(timezone.utc).isoformat(),
+                json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+            )
+        )
+
+
+def metadata_created_at(metadata: Dict[str, Any]) -> str:
+    """Retourne la date de création (ISO UTC) d'un upload, y compris pour les anciens formats"""
+    if metadata.get("created_at"):
+        return metadata["created_at"]
+
+    # Anciennes métadonnées : seul le timestamp uuid1 est disponible
+    try:
+        uuid1_time = int(metadata["upload_timestamp"])
+        return (_UUID1_EPOCH + timedelta(microseconds=uuid1_time // 10)).isoformat()
+    except (KeyError, TypeError, ValueError):
+        return datetime.now(timezone.utc).isoformat()
+
+
+def _iter_metadata_files(data_dir: str) -> Iterator[Dict[str, Any]]:
+    """Métadonnées des fichiers JSON (dossiers à plat et sous-dossiers de répartition)"""
+    for root, _, filenames in os.walk(data_dir):
+        for filename in filenames:
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(root, filename), "r", encoding="utf-8") as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue
+
+
+def _iter_log_metadata() -> Iterator[Dict[str, Any]]:
+    """Métadonnées du journal (backend log)"""
+    log = SegmentedLog(os.path.join(settings.LOG_STORAGE_DIR, "data"), settings.LOG_SEGMENT_SIZE)
+    for _, metadata in log.iter_records():
+        yield metadata
+
+
+class UploadIndex(SQLiteStore):
+    """
+    Index SQLite des uploads
+    Maintient les métadonnées par upload_id et des compteurs agrégés
+    (total, par jour, par backend) mis à jour dans la même transaction
+    """
+
+    SCHEMA = SCHEMA
+
+    def __init__(self, db_path: Optional[str] = None):
+        super().__init__(db_path or settings.INDEX_DB_PATH)
+        # Lectures par clé récentes ; invalidées à chaque écriture de ce processus,
+        # bornées dans le temps pour les écritures des autres workers
+        self._cache: LRUCache[Dict[str, Any]] = LRUCache(settings.UPLOAD_CACHE_SIZE, settings.UPLOAD_CACHE_TTL)
+
+    def _on_create(self, conn: sqlite3.Connection) -> None:
+        # Premier démarrage : l'index est reconstruit depuis les métadonnées existantes
+        if settings.STORAGE_BACKEND == "log":
+            self._rebuild(_iter_log_metadata(), "LogStructuredStorageBackend")
+        elif os.path.isdir(settings.DATA_UPLOAD_DIR):
+            self._rebuild(_iter_metadata_files(settings.DATA_UPLOAD_DIR))
+
+    @staticmethod
+    def _insert(
+        conn: sqlite3.Connection,
+        metadata: Dict[str, Any],
+        backend: str,
+        identities: Optional[List[Tuple[str, bytes]]] = None
+    ) -> Optional[int]:
+        """Insère un upload ; retourne le nombre de références de son CV (s'il est adressé par contenu)"""
+        created_at = metadata_created_at(metadata)
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO uploads (upload_id, created_at, backend, cv_filename, metadata) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                metadata["upload_id"],
+                created_at,
+                backend,
+                metadata.get("cv_filename", f"{metadata['upload_id']}.pdf"),
+                json.dumps(metadata, ensure_ascii=False, separators=(",", ":"))
+            )
+        )
+        if cursor.rowcount == 0:
+            return None
+
+        conn.executemany(
+            "INSERT INTO upload_counters (scope, key, count) VALUES (?, ?, 1) "
+            "ON CONFLICT (scope, key) DO UPDATE SET count = count + 1",
+            [("total", ""), ("day", created_at[:10]), ("backend", backend)]
+        )
+
+        if identities is None:
+            identities = candidate_identities(metadata.get("form_data") or {})
+        # Numéro et nombre d'uploads repris de la ligne la plus récente de l'identité
+        conn.executemany(
+            "INSERT INTO candidate_identities (identity, seq, upload_id, created_at, kind, count) "
+            "SELECT ?1, coalesce(max(seq), 0) + 1, ?2, ?3, ?4, coalesce(("
+            "  SELECT count FROM candidate_identities WHERE identity = ?1 ORDER BY seq DESC LIMIT 1"
+            "), 0) + 1 FROM candidate_identities WHERE identity = ?1",
+            [(identity, metadata["upload_id"], created_at, kind) for kind, identity in identities]
+        )
+
+        # Comptage des références vers les CV stockés par empreinte
+        sha256 = metadata.get("cv_sha256")
+        if not sha256:
+            return None
+        return conn.execute(
+            "INSERT INTO cv_blobs (sha256, cv_filename, size, refcount) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (sha256) DO UPDATE SET refcount = refcount + 1 "
+            "RETURNING refcount",
+            (sha256, metadata["cv_filename"], metadata.get("cv_size", 0))
+        ).fetchone()["refcount"]
+
+    @staticmethod
+    def _find_duplicates(conn: sqlite3.Connection, identities: List[Tuple[str, bytes]]) -> Dict[str, Any]:
+        """
+        Uploads précédents du même candidat (même email ou même téléphone) : nombre
+        d'uploads par identité et DUPLICATE_MAX_LINKS derniers uploads. Coût borné,
+        même pour une identité très partagée
+        """
+        matches: Dict[str, int] = {}
+        links: Dict[str, Dict[str, Any]] = {}
+        for kind, identity in identities:
+            rows = conn.execute(
+                "SELECT upload_id, created_at, count FROM candidate_identities WHERE identity = ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (identity, settings.DUPLICATE_MAX_LINKS)
+            ).fetchall()
+            if not rows:
+                continue
+            matches[kind] = rows[0]["count"]
+            for row in rows:
+                link = links.setdefault(
+                    row["upload_id"],
+                    {"upload_id": row["upload_id"], "created_at": row["created_at"], "matched_on": []}
+                )
+                link["matched_on"].append(kind)
+
+        uploads = sorted(links.values(), key=lambda link: (link["created_at"], link["upload_id"]), reverse=True)
+        return {"matches": matches, "uploads": uploads[:settings.DUPLICATE_MAX_LINKS]}
+
+    def record_upload_sync(self, metadata: Dict[str, Any], backend: str) -> Dict[str, Any]:
+        """
+        Enregistre un upload et met à jour compteurs, références du CV et identités
+        du candidat (transaction unique : deux uploads simultanés du même candidat
+        sont liés). Retourne le nombre d'uploads référençant le même CV et les
+        uploads précédents du même candidat
+        """
+        identities = candidate_identities(metadata.get("form_data") or {})
+        with self._transaction() as conn:
+            duplicates = self._find_duplicates(conn, identities) if identities else {"matches": {}, "uploads": []}
+            refcount = self._insert(conn, metadata, backend, identities)
+            if metadata.get("cv_sha256"):
+                # CV référencé : la réservation prise à l'écriture n'est plus utile
+                conn.execute(
+                    "DELETE FROM cv_locks WHERE sha256 = ? AND owner = 'upload'", (metadata["cv_sha256"],)
+                )
+            # Événement validé ou annulé avec l'upload (même transaction)
+            _add_event(conn, "upload.created", {"upload": metadata, "duplicate_of": duplicates})
+
+        self._cache.invalidate(metadata["upload_id"])
+        if refcount and refcount > 1:
+            # Le nombre de références des uploads partageant ce CV a changé
+            sha256 = metadata["cv_sha256"]
+            self._cache.invalidate_where(lambda entry: entry["metadata"].get("cv_sha256") == sha256)
+        return {"cv_refcount": refcount, "duplicates": duplicates}
+
+    def get_upload_sync(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """Lecture par clé des métadonnées d'un upload (résultat partagé, à ne pas modifier)"""
+        cached = self._cache.get(upload_id)
+        if cached is not None:
+            return cached
+
+        with self._reader() as conn:
+            row = conn.execute(
+                "SELECT u.metadata, u.cv_available, b.refcount FROM uploads u "
+                "LEFT JOIN cv_blobs b ON b.sha256 = json_extract(u.metadata, '$.cv_sha256') "
+                "WHERE u.upload_id = ?",
+                (upload_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        entry = {
+            "metadata": json.loads(row["metadata"]),
+            "cv_available": bool(row["cv_available"]),
+            "cv_refcount": row["refcount"] or 1
+        }
+        self._cache.put(upload_id, entry)
+        return entry
+
+    def page_sync(
+        self,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        created_from: Optional[str] = None,
+        created_to: Optional[str] = None
+    ) -> List[sqlite3.Row]:
+        """
+        Lot d'uploads dans l'ordre de création, après la clé (created_at, upload_id)
+        `after` ; `created_from` inclus, `created_to` exclu (dates ISO UTC)
+        Les métadonnées sont retournées telles que stockées (JSON compact)
+        """
+        conditions, params = ["(created_at, upload_id) > (?, ?)"], list(after or ("", ""))
+        if created_from:
+            conditions.append("created_at >= ?")
+            params.append(created_from)
+        if created_to:
+            conditions.append("created_at < ?")
+            params.append(created_to)
+
+        with self._reader() as conn:
+            return conn.execute(
+                "SELECT upload_id, created_at, metadata FROM uploads "
+                f"WHERE {' AND '.join(conditions)} ORDER BY created_at, upload_id LIMIT ?",
+                (*params, limit)
+            ).fetchall()
+
+    def iter_metadata_sync(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Parcourt les métadonnées de tous les uploads indexés, par lots (ordre de création)"""
+        after = None
+        while True:
+            rows = self.page_sync(batch_size, after)
+            if not rows:
+                return
+            for row in rows:
+                yield json.loads(row["metadata"])
+            after = (rows[-1]["created_at"], rows[-1]["upload_id"])
+
+    def existing_ids_sync(self, upload_ids: List[str]) -> Set[str]:
+        """upload_id toujours présents dans l'index (non purgés)"""
+        if not upload_ids:
+            return set()
+        with self._reader() as conn:
+            return {
+                row["upload_id"] for row in conn.execute(
+                    f"SELECT upload_id FROM uploads WHERE upload_id IN ({','.join('?' * len(upload_ids))})",
+                    upload_ids
+                )
+            }
+
+    def expired_sync(self, cutoff: str, limit: int) -> List[str]:
+        """Uploads créés avant `cutoff`, les plus anciens d'abord (index sur created_at)"""
+        with self._reader() as conn:
+            return [
+                row["upload_id"] for row in conn.execute(
+                    "SELECT upload_id FROM uploads WHERE created_at < ? ORDER BY created_at, upload_id LIMIT ?",
+                    (cutoff, limit)
+                )
+            ]
+
+    def retention_report_sync(self, cutoff: str, sample_size: int) -> Dict[str, Any]:
+        """Ce que supprimerait une purge des uploads créés avant `cutoff` (rien n'est modifié)"""
+        with self._reader() as conn:
+            uploads = conn.execute(
+                "SELECT count(*) AS count, min(created_at) AS oldest, "
+                "       coalesce(sum(json_extract(metadata, '$.cv_sha256') IS NULL), 0) AS legacy_cvs "
+                "FROM uploads WHERE created_at < ?",
+                (cutoff,)
+            ).fetchone()
+            # CV dont toutes les références sont expirées
+            cvs = conn.execute(
+                "SELECT count(*) AS count, coalesce(sum(b.size), 0) AS size FROM ("
+                "  SELECT json_extract(metadata, '$.cv_sha256') AS sha256, count(*) AS expired "
+                "  FROM uploads WHERE created_at < ? GROUP BY 1"
+                ") e JOIN cv_blobs b ON b.sha256 = e.sha256 WHERE b.refcount <= e.expired",
+                (cutoff,)
+            ).fetchone()
+            sample = conn.execute(
+                "SELECT upload_id, created_at FROM uploads WHERE created_at < ? "
+                "ORDER BY created_at, upload_id LIMIT ?",
+                (cutoff, sample_size)
+            ).fetchall()
+            pending = conn.execute("SELECT count(*) FROM purge_queue").fetchone()[0]
+
+        return {
+            "expired_uploads": uploads["count"],
+            "oldest_created_at": uploads["oldest"],
+            "cv_files": cvs["count"] + uploads["legacy_cvs"],
+            "cv_bytes": cvs["size"],
+            "pending_deletions": pending,
+            "sample": [{"upload_id": row["upload_id"], "created_at": row["created_at"]} for row in sample]
+        }
+
+    def purge_uploads_sync(self, upload_ids: List[str]) -> List[str]:
+        """
+        Retire des uploads de l'index (compteurs et références des CV compris) et met
+        en file, dans la même transaction, leurs fichiers à supprimer du stockage :
+        métadonnées, extraction et CV qui ne sont plus référencés par aucun upload
+        Retourne les uploads effectivement retirés
+        """
+        if not upload_ids:
+            return []
+        placeholders = ",".join("?" * len(upload_ids))
+
+        with self._transaction() as conn:
+            rows = conn.execute(
+                f"DELETE FROM uploads WHERE upload_id IN ({placeholders}) "
+                "RETURNING upload_id, created_at, backend, cv_filename, "
+                "json_extract(metadata, '$.cv_sha256') AS sha256, "
+                "json_extract(metadata, '$.form_data') AS form_data",
+                upload_ids
+            ).fetchall()
+            if not rows:
+                return []
+
+            counters = Counter()
+            references = Counter()
+            files = []
+            for row in rows:
+                counters.update([("total", ""), ("day", row["created_at"][:10]), ("backend", row["backend"])])
+                if row["sha256"]:
+                    references[row["sha256"]] += 1
+                else:
+                    # Ancien format : CV propre à l'upload
+                    files.append(("cv", row["cv_filename"], None))
+                files.extend((folder, f"{row['upload_id']}.json", None) for folder in _UPLOAD_JSON_FOLDERS)
+
+            conn.executemany(
+                "UPDATE upload_counters SET count = count - ? WHERE scope = ? AND key = ?",
+                [(count, scope, key) for (scope, key), count in counters.items()]
+            )
+            conn.execute("DELETE FROM upload_counters WHERE count <= 0")
+
+            self._delete_identities(conn, rows)
+            for row in rows:
+                _add_event(conn, "upload.deleted", {"upload_id": row["upload_id"], "reason": "retention"})
+
+            conn.executemany(
+                "UPDATE cv_blobs SET refcount = refcount - ? WHERE sha256 = ?",
+                [(count, sha256) for sha256, count in references.items()]
+            )
+            orphans = conn.execute(
+                f"DELETE FROM cv_blobs WHERE sha256 IN ({','.join('?' * len(references))}) AND refcount <= 0 "
+                "RETURNING sha256, cv_filename",
+                list(references)
+            ).fetchall() if references else []
+            files.extend(("cv", row["cv_filename"], row["sha256"]) for row in orphans)
+
+            conn.executemany(
+                "INSERT OR IGNORE INTO purge_queue (folder, filename, sha256) VALUES (?, ?, ?)", files
+            )
+
+        purged = [row["upload_id"] for row in rows]
+        for upload_id in purged:
+            self._cache.invalidate(upload_id)
+        # Nombre de références modifié pour les uploads qui partagent encore ces CV
+        shared = set(references) - {row["sha256"] for row in orphans}
+        if shared:
+            self._cache.invalidate_where(lambda entry: entry["metadata"].get("cv_sha256") in shared)
+        return purged
+
+    @staticmethod
+    def _delete_identities(conn: sqlite3.Connection, rows: List[sqlite3.Row]) -> None:
+        """Retire les identités des uploads purgés ; le nombre d'uploads est recalculé sur la ligne la plus récente"""
+        purged = defaultdict(list)
+        for row in rows:
+            for _, identity in candidate_identities(json.loads(row["form_data"] or "{}")):
+                purged[identity].append(row["upload_id"])
+
+        for identity, upload_ids in purged.items():
+            conn.execute(
+                f"DELETE FROM candidate_identities WHERE identity = ? AND upload_id IN ({','.join('?' * len(upload_ids))})",
+                (identity, *upload_ids)
+            )
+            conn.execute(
+                "UPDATE candidate_identities SET count = ("
+                "  SELECT count(*) FROM candidate_identities WHERE identity = ?1"
+                ") WHERE identity = ?1 AND seq = (SELECT max(seq) FROM candidate_identities WHERE identity = ?1)",
+                (identity,)
+            )
+
+    def claim_cv_sync(self, sha256: str) -> bool:
+        """
+        Réserve un CV pour un upload avant de vérifier sa présence dans le stockage
+        False si sa suppression est en cours : l'upload attend sa fin puis le réécrit
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            lock = conn.execute(
+                "SELECT owner FROM cv_locks WHERE sha256 = ? AND expires_at > ?", (sha256, now)
+            ).fetchone()
+            if lock is not None and lock["owner"] == "purge":
+                return False
+            # Suppression pas encore commencée : annulée, le fichier est réutilisé
+            conn.execute("DELETE FROM purge_queue WHERE folder = 'cv' AND sha256 = ?", (sha256,))
+            conn.execute(
+                "INSERT OR REPLACE INTO cv_locks (sha256, owner, expires_at) VALUES (?, 'upload', ?)",
+                (sha256, now + settings.RETENTION_LOCK_TTL)
+            )
+            return True
+
+    async def claim_cv(self, sha256: str) -> None:
+        """Réservation d'un CV par un upload, après la suppression en cours éventuelle"""
+        while not await self._run(self.claim_cv_sync, sha256):
+            await asyncio.sleep(settings.RETENTION_LOCK_POLL_INTERVAL)
+
+    def claim_deletions_sync(self, limit: int) -> List[sqlite3.Row]:
+        """
+        Réserve des fichiers en attente de suppression (folder, filename, sha256)
+        Un CV de nouveau référencé est retiré de la file ; un CV réservé par un
+        upload en cours est laissé en file. Les CV retournés sont réservés pour la
+        purge jusqu'à finish_deletions_sync : un upload du même contenu attend
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM cv_locks WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "DELETE FROM purge_queue WHERE sha256 IS NOT NULL "
+                "AND EXISTS (SELECT 1 FROM cv_blobs b WHERE b.sha256 = purge_queue.sha256)"
+            )
+            rows = conn.execute(
+                "SELECT folder, filename, sha256 FROM purge_queue q "
+                "WHERE sha256 IS NULL OR NOT EXISTS (SELECT 1 FROM cv_locks l WHERE l.sha256 = q.sha256) "
+                "ORDER BY folder, filename LIMIT ?",
+                (limit,)
+            ).fetchall()
+            conn.executemany(
+                "INSERT INTO cv_locks (sha256, owner, expires_at) VALUES (?, 'purge', ?)",
+                [(row["sha256"], now + settings.RETENTION_LOCK_TTL) for row in rows if row["sha256"]]
+            )
+        return rows
+
+    def finish_deletions_sync(self, folder: str, deleted: List[str], claimed: List[sqlite3.Row]) -> None:
+        """Fichiers supprimés retirés de la file ; réservations de la purge levées (supprimés ou non)"""
+        with self._transaction() as conn:
+            conn.executemany(
+                "DELETE FROM purge_queue WHERE folder = ? AND filename = ?",
+                [(folder, filename) for filename in deleted]
+            )
+            conn.executemany(
+                "DELETE FROM cv_locks WHERE sha256 = ? AND owner = 'purge'",
+                [(row["sha256"],) for row in claimed if row["sha256"]]
+            )
+
+    def claim_events_sync(self, limit: int, lease_seconds: float) -> List[sqlite3.Row]:
+        """Réserve jusqu'à `limit` événements à livrer (réservations expirées reprises), les plus anciens d'abord"""
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, lease_until = ? "
+                "WHERE event_id IN ("
+                "  SELECT event_id FROM outbox "
+                "  WHERE status = 'pending' AND next_attempt_at <= ? AND lease_until <= ? "
+                "  ORDER BY event_id LIMIT ?"
+                ") RETURNING event_id, event_type, created_at, payload, attempts",
+                (now + lease_seconds, now, now, limit)
+            ).fetchall()
+        return sorted(rows, key=lambda row: row["event_id"])
+
+    def ack_events_sync(self, event_ids: List[int]) -> None:
+        """Événements livrés : supprimés de l'outbox"""
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM outbox WHERE event_id = ?", [(event_id,) for event_id in event_ids])
+
+    def retry_events_sync(self, event_ids: List[int], delay: float, error: str, dead: bool = False) -> None:
+        """Échec de livraison : nouvelle tentative après `delay` secondes, ou abandon (status 'dead')"""
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE outbox SET status = ?, next_attempt_at = ?, lease_until = 0, last_error = ? "
+                "WHERE event_id = ?",
+                [("dead" if dead else "pending", time.time() + delay, error, event_id) for event_id in event_ids]
+            )
+
+    def requeue_dead_events_sync(self) -> int:
+        """Remet en file les événements abandonnés (destinataire réparé)"""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = 0 WHERE status = 'dead'"
+            ).rowcount
+
+    def outbox_stats_sync(self) -> Dict[str, int]:
+        with self._reader() as conn:
+            return {row["status"]: row["count"] for row in conn.execute(
+                "SELECT status, count(*) AS count FROM outbox GROUP BY status"
+            )}
+
+    def get_stats_sync(self, days: int = 7) -> Dict[str, Any]:
+        """Statistiques issues des compteurs maintenus (sans parcours des uploads)"""
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).date().isoformat()
+
+        with self._reader() as conn:
+            total = conn.execute(
+                "SELECT count FROM upload_counters WHERE scope = 'total' AND key = ''"
+            ).fetchone()
+            by_day = conn.execute(
+                "SELECT key, count FROM upload_counters WHERE scope = 'day' AND key >= ? ORDER BY key",
+                (since,)
+            ).fetchall()
+            by_backend = conn.execute(
+                "SELECT key, count FROM upload_counters WHERE scope = 'backend'"
+            ).fetchall()
+
+        today = datetime.now(timezone.utc).date().isoformat()
+        uploads_by_day = {row["key"]: row["count"] for row in by_day}
+        return {
+            "total_uploads": total["count"] if total else 0,
+            "uploads_today": uploads_by_day.get(today, 0),
+            "uploads_by_day": uploads_by_day,
+            "uploads_by_backend": {row["key"]: row["count"] for row in by_backend}
+        }
+
+    def _rebuild(self, uploads: Iterable[Dict[str, Any]], backend: str = "LocalStorageBackend") -> int:
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM uploads")
+            conn.execute("DELETE FROM cv_blobs")
+            conn.execute("DELETE FROM upload_counters")
+            conn.execute("DELETE FROM candidate_identities")
+            conn.execute("DELETE FROM cv_locks WHERE owner = 'upload'")
+
+            indexed = 0
+            for metadata in uploads:
+                if "upload_id" not in metadata:
+                    continue
+                self._insert(conn, metadata, backend)
+                indexed += 1
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return indexed
+
+    def rebuild_sync(self, data_dir: Optional[str] = None, backend: Optional[str] = None) -> int:
+        """
+        Reconstruit entièrement l'index depuis les métadonnées : fichiers JSON
+        de `data_dir`, ou journal du backend "log" s'il est configuré
+        Retourne le nombre d'uploads indexés
+        """
+        if data_dir is None and settings.STORAGE_BACKEND == "log":
+            uploads, default_backend = _iter_log_metadata(), "LogStructuredStorageBackend"
+        else:
+            uploads, default_backend = _iter_metadata_files(data_dir or settings.DATA_UPLOAD_DIR), "LocalStorageBackend"
+
+        self._cache.clear()
+        with self._lock:
+            self._connect()
+            return self._rebuild(uploads, backend or default_backend)
+
+    async def record_upload(self, metadata: Dict[str, Any], backend: str) -> Dict[str, Any]:
+        return await self._run(self.record_upload_sync, metadata, backend)
+
+    async def get_upload(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.get_upload_sync, upload_id)
+
+    async def page(
+        self,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        created_from: Optional[str] = None,
+        created_to: Optional[str] = None
+    ) -> List[sqlite3.Row]:
+        return await self._run(self.page_sync, limit, after, created_from, created_to)
+
+    async def get_stats(self, days: int = 7) -> Dict[str, Any]:
+        return await self._run(self.get_stats_sync, days)
+
+    async def claim_events(self, limit: int, lease_seconds: float) -> List[sqlite3.Row]:
+        return await self._run(self.claim_events_sync, limit, lease_seconds)
+
+    async def ack_events(self, event_ids: List[int]) -> None:
+        await self._run(self.ack_events_sync, event_ids)
+
+    async def retry_events(self, event_ids: List[int], delay: float, error: str, dead: bool = False) -> None:
+        await self._run(self.retry_events_sync, event_ids, delay, error, dead)
+
+    async def expired(self, cutoff: str, limit: int) -> List[str]:
+        return await self._run(self.expired_sync, cutoff, limit)
+
+    async def retention_report(self, cutoff: str, sample_size: int) -> Dict[str, Any]:
+        return await self._run(self.retention_report_sync, cutoff, sample_size)
+
+    async def purge_uploads(self, upload_ids: List[str]) -> List[str]:
+        return await self._run(self.purge_uploads_sync, upload_ids)
+
+    async def claim_deletions(self, limit: int) -> List[sqlite3.Row]:
+        return await self._run(self.claim_deletions_sync, limit)
+
+    async def finish_deletions(self, folder: str, deleted: List[str], claimed: List[sqlite3.Row]) -> None:
+        await self._run(self.finish_deletions_sync, folder, deleted, claimed)
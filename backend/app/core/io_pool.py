@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+import asyncio
+import os
+import threading
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def io_executor() -> ThreadPoolExecutor:
+    """
+    Pool de threads dédié aux appels système bloquants du chemin des requêtes
+    (fichiers, SQLite). Borné par IO_THREADS et distinct du pool par défaut de
+    la boucle : les calculs (matching) et les tâches de fond ne le saturent pas
+    """
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=settings.IO_THREADS, thread_name_prefix="cv-io")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+async def run_io(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Exécute un appel bloquant dans le pool d'E/S"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown_io_executor() -> None:
+    """Arrêt du worker : attend la fin des appels en cours"""
+    global _executor
+    with _lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,87 @@
+from typing import Optional
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app.core.config import settings
+from app.core.metrics import EVENT_LOOP_LAG_SECONDS, EVENT_LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopLagMonitor:
+    """
+    Mesure le retard de la boucle d'événements : une tâche se réveille toutes les
+    `interval` secondes et l'écart avec le réveil prévu est le temps pendant
+    lequel la boucle était occupée (appel bloquant, calcul). Les retards au-delà
+    de `threshold` sont comptés et journalisés ; un thread de surveillance
+    journalise la pile de la boucle pendant le blocage pour en trouver la cause
+    """
+
+    def __init__(self, interval: Optional[float] = None, threshold: Optional[float] = None,
+                 capture_stack: Optional[bool] = None):
+        self.interval = interval if interval is not None else settings.LOOP_LAG_INTERVAL
+        self.threshold = threshold if threshold is not None else settings.LOOP_LAG_THRESHOLD
+        self.capture_stack = settings.LOOP_LAG_CAPTURE_STACK if capture_stack is None else capture_stack
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+
+    async def start(self) -> None:
+        if self.threshold <= 0 or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+        if self.capture_stack:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.interval * 2)
+            self._watchdog = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - expected)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.threshold:
+                EVENT_LOOP_STALLS.inc()
+                logger.warning("Boucle d'événements bloquée pendant %.0f ms", lag * 1000)
+
+    def _watch(self) -> None:
+        """Thread de surveillance : pile de la boucle, une fois par blocage"""
+        reported_heartbeat = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            if heartbeat == reported_heartbeat:
+                continue
+            if time.monotonic() - heartbeat < self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            reported_heartbeat = heartbeat
+            logger.warning(
+                "Boucle d'événements bloquée depuis plus de %.0f ms :\n%s",
+                self.threshold * 1000, "".join(traceback.format_stack(frame))
+            )
@@ -0,0 +1,481 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import fcntl
+import logging
+import os
+import re
+import threading
+import unicodedata
+import zlib
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.io_pool import run_io
+from app.core.search import form_text
+
+logger = logging.getLogger(__name__)
+
+# Identifiants stockés en ASCII, longueur fixe (uuid4)
+_ID_BYTES = 36
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Mots en minuscules sans accents"""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    ascii_text = normalized.encode("ascii", "ignore").decode("ascii")
+    return [token for token in _TOKEN_RE.findall(ascii_text) if len(token) > 1]
+
+
+def hash_features(text: str, dim: int) -> np.ndarray:
+    """
+    Vecteur de n-grammes de mots hachés (unigrammes et bigrammes)
+    TF sous-linéaire (1 + log tf), signe haché pour compenser les collisions, norme L2
+    """
+    tokens = tokenize(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    vector = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vector
+
+    # crc32 : hachage stable entre processus (contrairement à hash())
+    hashes = np.fromiter((zlib.crc32(feature.encode()) for feature in features), dtype=np.uint32, count=len(features))
+    indices = (hashes % dim).astype(np.int64)
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+
+    counts = np.bincount(indices, minlength=dim).astype(np.float32)
+    signed = np.bincount(indices, weights=signs, minlength=dim).astype(np.float32)
+    present = counts > 0
+    vector[present] = np.sign(signed[present]) * (1.0 + np.log(counts[present]))
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class MatchingIndex:
+    """
+    Matrice des vecteurs de CV (une ligne par upload), mappée en mémoire depuis le disque
+    Les lignes sont ajoutées en fin de fichier sous verrou (fcntl) : tous les workers
+    partagent le même fichier et un redémarrage ne recalcule rien
+    Le score est un produit scalaire TF × IDF² : les fréquences documentaires par
+    dimension sont maintenues à l'ajout et appliquées uniquement au vecteur de requête
+    Les lignes des nouveaux uploads sont mises en file et ajoutées par lots hors
+    du chemin de la requête (une écriture des fréquences par lot) ; les uploads
+    manqués (échec, arrêt du worker, matrice créée après les uploads) sont
+    ajoutés par IndexReconciler
+    """
+
+    def __init__(self, upload_index=None, directory: Optional[str] = None, dim: Optional[int] = None):
+        # Index des uploads : formulaire d'un candidat à la fin de son extraction
+        self.upload_index = upload_index
+        self.directory = directory or settings.MATCH_DIR
+        self.dim = dim or settings.MATCH_DIM
+        self.vectors_path = os.path.join(self.directory, f"vectors_{self.dim}.f32")
+        self.ids_path = os.path.join(self.directory, f"ids_{self.dim}.bin")
+        self.df_path = os.path.join(self.directory, f"df_{self.dim}.i64")
+        # Position du rattrapage depuis l'index des uploads (IndexReconciler)
+        self.position_path = os.path.join(self.directory, f"reconciled_{self.dim}.txt")
+        self.lock_path = os.path.join(self.directory, "matching.lock")
+        self._map_lock = threading.Lock()
+        self._rows = 0
+        # Inodes des fichiers mappés : un rebuild remplace les fichiers au lieu de les réécrire
+        self._mapped_files: Optional[Tuple[int, int]] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        # Nouveaux uploads à ajouter : (upload_id, texte, nombre de lignes à la mise en file)
+        self._pending: List[Tuple[str, str, int]] = []
+        # Lignes connues après le dernier ajout (au plus le nombre réel : les autres workers ajoutent aussi)
+        self._known_rows = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def _file_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return open(self.lock_path, "a+b")
+
+    def upsert_sync(self, upload_id: str, text: str) -> None:
+        """
+        Ajoute ou remplace la ligne d'un upload (vecteur, identifiant, fréquences documentaires)
+        La ligne créée à l'upload (formulaire seul) est réécrite en place une fois le CV extrait
+        """
+        vector = hash_features(text, self.dim)
+        encoded_id = upload_id.encode("ascii")[:_ID_BYTES].ljust(_ID_BYTES)
+
+        with self._file_lock() as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                rows = self._row_count()
+                df = self._load_df()
+                existing = self._find_row(encoded_id, rows)
+
+                if existing is None:
+                    self._append_locked([encoded_id], [vector], rows, df)
+                else:
+                    matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+                    df[:-1][matrix[existing] != 0] -= 1
+                    matrix[existing] = vector
+                    matrix.flush()
+                    del matrix
+                    df[:-1][vector != 0] += 1
+                df.tofile(self.df_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def insert_many_sync(self, items: List[Tuple[str, str, int]]) -> int:
+        """
+        Ajoute les lignes de nouveaux uploads en une écriture ; retourne le nombre de lignes ajoutées
+        Identifiants neufs : pas de recherche dans toute la matrice, seules les lignes
+        ajoutées depuis la mise en file sont vérifiées (extraction déjà terminée)
+        """
+        with self._file_lock() as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                rows = self._row_count()
+                since = min(queued_rows for _, _, queued_rows in items)
+                if since > rows:
+                    # Matrice reconstruite entre-temps (rebuild-match) : tout est vérifié
+                    since = 0
+                recent = set()
+                if rows > since:
+                    ids = np.memmap(self.ids_path, dtype=f"S{_ID_BYTES}", mode="r", shape=(rows,))
+                    recent = set(ids[since:rows].tolist())
+                    del ids
+
+                encoded_ids, vectors = [], []
+                for upload_id, text, _ in items:
+                    encoded_id = upload_id.encode("ascii")[:_ID_BYTES].ljust(_ID_BYTES)
+                    if encoded_id not in recent:
+                        encoded_ids.append(encoded_id)
+                        vectors.append(hash_features(text, self.dim))
+                self._known_rows = rows + len(encoded_ids)
+                if not encoded_ids:
+                    return 0
+
+                df = self._load_df()
+                self._append_locked(encoded_ids, vectors, rows, df)
+                df.tofile(self.df_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return len(encoded_ids)
+
+    def _append_locked(self, encoded_ids: List[bytes], vectors: List[np.ndarray], rows: int, df: np.ndarray) -> None:
+        """Ajoute des lignes en fin de fichier (verrou détenu) ; `df` mis à jour, à réécrire par l'appelant"""
+        # Réalignement si une écriture précédente a été interrompue
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(rows * self.dim * 4)
+            f.write(b"".join(vector.tobytes() for vector in vectors))
+        with open(self.ids_path, "ab") as f:
+            f.truncate(rows * _ID_BYTES)
+            f.write(b"".join(encoded_ids))
+        for vector in vectors:
+            df[:-1][vector != 0] += 1
+        df[-1] += len(vectors)  # Dernière case : nombre total de documents
+
+    def add_missing_sync(
+        self, uploads: List[Dict[str, Any]], cv_text_lookup: Callable[[str], Optional[str]]
+    ) -> List[str]:
+        """Ajoute les uploads absents de la matrice (rattrapage) ; retourne leurs upload_id"""
+        encoded = [metadata["upload_id"].encode("ascii")[:_ID_BYTES].ljust(_ID_BYTES) for metadata in uploads]
+        with self._file_lock() as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                rows = self._row_count()
+                present = np.zeros(len(uploads), dtype=bool)
+                if rows:
+                    ids = np.memmap(self.ids_path, dtype=f"S{_ID_BYTES}", mode="r", shape=(rows,))
+                    present = np.isin(np.array(encoded, dtype=f"S{_ID_BYTES}"), ids)
+                    del ids
+                missing = [i for i in range(len(uploads)) if not present[i]]
+                if not missing:
+                    return []
+
+                vectors = [
+                    hash_features(
+                        self.document_text(
+                            uploads[i].get("form_data", {}), cv_text_lookup(uploads[i]["upload_id"])
+                        ),
+                        self.dim
+                    )
+                    for i in missing
+                ]
+                df = self._load_df()
+                self._append_locked([encoded[i] for i in missing], vectors, rows, df)
+                df.tofile(self.df_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return [uploads[i]["upload_id"] for i in missing]
+
+    def reconcile_position_sync(self) -> Optional[str]:
+        # Matrice vide ou supprimée : rattrapage depuis le début
+        if self._row_count() == 0:
+            return None
+        try:
+            with open(self.position_path, "r", encoding="ascii") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def set_reconcile_position_sync(self, created_at: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{self.position_path}.tmp"
+        with open(temp_path, "w", encoding="ascii") as f:
+            f.write(created_at)
+        os.replace(temp_path, self.position_path)
+
+    def remove_sync(self, upload_ids: List[str]) -> int:
+        """
+        Retire des uploads de la matrice : vecteur et identifiant remis à zéro (score
+        nul, jamais retourné), fréquences documentaires corrigées. La place des
+        lignes est récupérée au prochain rebuild-match
+        """
+        encoded_ids = np.array(
+            [upload_id.encode("ascii")[:_ID_BYTES].ljust(_ID_BYTES) for upload_id in upload_ids],
+            dtype=f"S{_ID_BYTES}"
+        )
+        with self._file_lock() as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                rows = self._row_count()
+                if rows == 0:
+                    return 0
+                ids = np.memmap(self.ids_path, dtype=f"S{_ID_BYTES}", mode="r+", shape=(rows,))
+                found = np.flatnonzero(np.isin(ids, encoded_ids))
+                if found.size:
+                    matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+                    df = self._load_df()
+                    df[:-1] -= np.count_nonzero(matrix[found], axis=0)
+                    df[-1] -= found.size
+                    matrix[found] = 0
+                    ids[found] = b""
+                    matrix.flush()
+                    ids.flush()
+                    del matrix
+                    df.tofile(self.df_path)
+                del ids
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return int(found.size)
+
+    def _find_row(self, encoded_id: bytes, rows: int) -> Optional[int]:
+        if rows == 0:
+            return None
+        ids = np.memmap(self.ids_path, dtype=f"S{_ID_BYTES}", mode="r", shape=(rows,))
+        # Recherche depuis la fin : la mise à jour suit de près l'ajout
+        tail_start = max(0, rows - settings.MATCH_BLOCK_ROWS)
+        for start, stop in ((tail_start, rows), (0, tail_start)):
+            found = np.flatnonzero(ids[start:stop] == encoded_id)
+            if found.size:
+                return start + int(found[-1])
+        return None
+
+    def _row_count(self) -> int:
+        """Nombre de lignes complètes (vecteur et identifiant écrits)"""
+        try:
+            vector_rows = os.path.getsize(self.vectors_path) // (self.dim * 4)
+            id_rows = os.path.getsize(self.ids_path) // _ID_BYTES
+        except FileNotFoundError:
+            return 0
+        return min(vector_rows, id_rows)
+
+    def _load_df(self) -> np.ndarray:
+        if os.path.exists(self.df_path):
+            df = np.fromfile(self.df_path, dtype=np.int64)
+            if df.shape[0] == self.dim + 1:
+                return df
+        return np.zeros(self.dim + 1, dtype=np.int64)
+
+    def _file_ids(self) -> Optional[Tuple[int, int]]:
+        try:
+            return os.stat(self.vectors_path).st_ino, os.stat(self.ids_path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self) -> Tuple[int, Optional[np.ndarray], Optional[np.ndarray]]:
+        """Re-mappe les fichiers si d'autres workers ont ajouté des lignes ou reconstruit la matrice"""
+        rows, files = self._row_count(), self._file_ids()
+        with self._map_lock:
+            if rows != self._rows or files != self._mapped_files or self._vectors is None:
+                # Verrou partagé : pas de remplacement de l'un des fichiers pendant le mappage
+                with self._file_lock() as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_SH)
+                    try:
+                        rows, files = self._row_count(), self._file_ids()
+                        if rows == 0:
+                            self._vectors, self._ids = None, None
+                        else:
+                            self._vectors = np.memmap(
+                                self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)
+                            )
+                            self._ids = np.memmap(self.ids_path, dtype=f"S{_ID_BYTES}", mode="r", shape=(rows,))
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._rows, self._mapped_files = rows, files
+            return self._rows, self._vectors, self._ids
+
+    def _query_vector(self, text: str) -> np.ndarray:
+        query = hash_features(text, self.dim)
+        df = self._load_df()
+        total_docs = max(int(df[-1]), 1)
+        idf = np.log((1.0 + total_docs) / (1.0 + df[:-1])).astype(np.float32) + 1.0
+        weighted = query * idf * idf
+        norm = np.linalg.norm(weighted)
+        return weighted / norm if norm > 0 else weighted
+
+    def top_k_sync(self, text: str, k: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Retourne (nombre de CV comparés, k meilleurs uploads)
+        Produit matrice-vecteur par blocs de lignes puis argpartition
+        """
+        rows, vectors, ids = self._refresh()
+        if rows == 0:
+            return 0, []
+
+        query = self._query_vector(text)
+        k = min(k, rows)
+        block = settings.MATCH_BLOCK_ROWS
+        candidate_scores, candidate_rows = [], []
+
+        for start in range(0, rows, block):
+            scores = vectors[start:start + block] @ query
+            block_k = min(k, scores.shape[0])
+            top = np.argpartition(scores, -block_k)[-block_k:]
+            candidate_scores.append(scores[top])
+            candidate_rows.append(top + start)
+
+        scores = np.concatenate(candidate_scores)
+        row_indices = np.concatenate(candidate_rows)
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(-scores[top])]
+
+        return rows, [
+            {"upload_id": ids[row_indices[i]].decode("ascii").strip(), "score": round(float(scores[i]), 4)}
+            for i in top
+            if scores[i] > 0
+        ]
+
+    def rebuild_sync(
+        self, uploads: Iterable[Dict[str, Any]], cv_text_lookup: Callable[[str], Optional[str]]
+    ) -> int:
+        """
+        Recalcule toute la matrice depuis les métadonnées et les textes extraits
+        Nouveaux fichiers écrits à côté puis substitués (os.replace) : les workers
+        qui ont mappé les anciens les lisent jusqu'à leur prochain re-mappage, sans
+        fichier tronqué sous leurs pieds
+        """
+        df = np.zeros(self.dim + 1, dtype=np.int64)
+        indexed = 0
+        with self._file_lock() as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            temp_paths = [f"{path}.rebuild" for path in (self.vectors_path, self.ids_path, self.df_path)]
+            try:
+                with open(temp_paths[0], "wb") as vectors_file, open(temp_paths[1], "wb") as ids_file:
+                    for metadata in uploads:
+                        upload_id = metadata["upload_id"]
+                        vector = hash_features(
+                            self.document_text(metadata.get("form_data", {}), cv_text_lookup(upload_id)),
+                            self.dim
+                        )
+                        vectors_file.write(vector.tobytes())
+                        ids_file.write(upload_id.encode("ascii")[:_ID_BYTES].ljust(_ID_BYTES))
+                        df[:-1][vector != 0] += 1
+                        indexed += 1
+                    df[-1] = indexed
+                    with open(temp_paths[2], "wb") as df_file:
+                        df.tofile(df_file)
+                        for f in (vectors_file, ids_file, df_file):
+                            f.flush()
+                            os.fsync(f.fileno())
+                for temp_path, path in zip(temp_paths, (self.vectors_path, self.ids_path, self.df_path)):
+                    os.replace(temp_path, path)
+            finally:
+                for temp_path in temp_paths:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        with self._map_lock:
+            self._rows, self._vectors, self._ids, self._mapped_files = 0, None, None, None
+        return indexed
+
+    @staticmethod
+    def document_text(form_data: Dict[str, Any], cv_text: Optional[str] = None) -> str:
+        """Texte vectorisé d'un candidat : champs du formulaire et texte du CV"""
+        return f"{form_text(form_data)}\n{cv_text or ''}"
+
+    async def _run(self, func, *args):
+        return await run_io(func, *args)
+
+    def warm_up_sync(self) -> None:
+        """Mappe la matrice et prépare le vectoriseur avant la première requête"""
+        self._refresh()
+        self._query_vector("warm up")
+
+    async def warm_up(self) -> None:
+        await self._run(self.warm_up_sync)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._known_rows = await self._run(self._row_count)
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._insert_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Dernier lot écrit avant l'arrêt du worker
+        await self._insert_pending()
+
+    async def _insert_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Regroupement des uploads simultanés en un seul lot
+            if settings.MATCH_INSERT_LINGER > 0:
+                await asyncio.sleep(settings.MATCH_INSERT_LINGER)
+            await self._insert_pending()
+
+    async def _insert_pending(self) -> None:
+        items, self._pending = self._pending, []
+        if not items:
+            return
+        try:
+            await self._run(self.insert_many_sync, items)
+        except Exception:
+            # Ajoutés au prochain passage de IndexReconciler
+            logger.exception("Impossible d'ajouter %d uploads à la matrice de matching", len(items))
+
+    async def on_upload(self, metadata: Dict[str, Any]) -> None:
+        """Listener du StorageService : ligne initiale à partir du formulaire, mise en file"""
+        # Lignes existantes avant la mise en file : jamais vérifiées à l'ajout
+        self._pending.append(
+            (metadata["upload_id"], self.document_text(metadata.get("form_data", {})), self._known_rows)
+        )
+        if self._task is None:
+            await self._insert_pending()
+        else:
+            self._wakeup.set()
+
+    async def on_extraction(self, upload_id: str, result: Dict[str, Any]) -> None:
+        """Listener de l'extraction : la ligne est recalculée avec le texte du CV"""
+        upload = await self.upload_index.get_upload(upload_id) if self.upload_index else None
+        if self.upload_index is not None and upload is None:
+            # Upload purgé pendant l'extraction
+            return
+        form_data = upload["metadata"].get("form_data", {}) if upload else {}
+        await self._run(self.upsert_sync, upload_id, self.document_text(form_data, result.get("text")))
+
+    async def on_purge(self, upload_ids: List[str]) -> None:
+        """Listener de la purge de rétention"""
+        purged = set(upload_ids)
+        self._pending = [item for item in self._pending if item[0] not in purged]
+        await self._run(self.remove_sync, upload_ids)
+
+    async def top_k(self, text: str, k: int) -> Tuple[int, List[Dict[str, Any]]]:
+        return await self._run(self.top_k_sync, text, k)
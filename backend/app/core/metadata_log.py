@@ -0,0 +1,325 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import fcntl
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+# En-tête d'un enregistrement : longueur du contenu, crc32 du contenu
+_HEADER = struct.Struct(">II")
+
+OPEN_SUFFIX = ".open"     # Segment actif d'un processus
+SEALED_SUFFIX = ".log"    # Segment scellé (immuable)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Location:
+    """Position d'un enregistrement : segment, offset, longueur, horodatage"""
+
+    __slots__ = ("stem", "offset", "length", "timestamp", "deleted")
+
+    def __init__(self, stem: str, offset: int, length: int, timestamp: int, deleted: bool):
+        self.stem = stem
+        self.offset = offset
+        self.length = length
+        self.timestamp = timestamp
+        self.deleted = deleted
+
+
+class SegmentedLog:
+    """
+    Journal append-only d'enregistrements JSON compacts, réparti en segments
+    Chaque processus écrit dans son propre segment actif (<seq>-<pid>.open), scellé
+    (.log) au-delà de `segment_size`. Un index en mémoire associe chaque clé à la
+    position de sa dernière version (la plus récente par horodatage) ; il est
+    complété en lisant la fin des segments lorsqu'une clé est inconnue
+    """
+
+    def __init__(self, directory: str, segment_size: int):
+        self.directory = directory
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+        self._index: Dict[str, Location] = {}
+        self._positions: Dict[str, int] = {}  # Octets déjà indexés par segment
+        self._loaded = False
+        self._active_fd: Optional[int] = None
+        self._active_stem: Optional[str] = None
+        self._active_size = 0
+        self._active_pid = os.getpid()
+
+    # Segments
+
+    def _segment_stems(self) -> Dict[str, str]:
+        """Segments présents : stem -> suffixe"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return {}
+        stems = {}
+        for name in names:
+            for suffix in (OPEN_SUFFIX, SEALED_SUFFIX):
+                if name.endswith(suffix):
+                    stems[name[:-len(suffix)]] = suffix
+        return stems
+
+    def _segment_path(self, stem: str) -> Optional[str]:
+        for suffix in (SEALED_SUFFIX, OPEN_SUFFIX):
+            path = os.path.join(self.directory, stem + suffix)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _next_seq(self) -> int:
+        seqs = [int(stem.split("-", 1)[0]) for stem in self._segment_stems() if stem.split("-", 1)[0].isdigit()]
+        return max(seqs, default=0) + 1
+
+    def _scan(self, path: str, start: int = 0) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+        """
+        Parcourt les enregistrements complets à partir de `start`
+        Produit (offset, longueur totale, enregistrement) ; s'arrête sur une fin
+        incomplète (écriture en cours ou interrompue)
+        """
+        with open(path, "rb") as f:
+            f.seek(start)
+            offset = start
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return
+                length, crc = _HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+                yield offset, _HEADER.size + length, json.loads(payload)
+                offset += _HEADER.size + length
+
+    def _seal_orphans(self) -> None:
+        """Scelle les segments actifs de processus arrêtés (fin tronquée si incomplète)"""
+        for stem, suffix in self._segment_stems().items():
+            if suffix != OPEN_SUFFIX:
+                continue
+            pid = stem.rsplit("-", 1)[-1]
+            if not pid.isdigit() or int(pid) == os.getpid() or _pid_alive(int(pid)):
+                continue
+            path = os.path.join(self.directory, stem + OPEN_SUFFIX)
+            valid_size = 0
+            for offset, length, _ in self._scan(path):
+                valid_size = offset + length
+            if valid_size == 0:
+                os.remove(path)
+                continue
+            os.truncate(path, valid_size)
+            os.replace(path, os.path.join(self.directory, stem + SEALED_SUFFIX))
+
+    def _open_active(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._seal_orphans()
+        self._active_stem = f"{self._next_seq():012d}-{os.getpid()}"
+        path = os.path.join(self.directory, self._active_stem + OPEN_SUFFIX)
+        self._active_fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._active_size = 0
+        self._active_pid = os.getpid()
+
+    def _seal_active(self) -> None:
+        if self._active_fd is None:
+            return
+        os.fsync(self._active_fd)
+        os.close(self._active_fd)
+        os.replace(
+            os.path.join(self.directory, self._active_stem + OPEN_SUFFIX),
+            os.path.join(self.directory, self._active_stem + SEALED_SUFFIX)
+        )
+        self._active_fd = None
+        self._active_stem = None
+
+    # Index
+
+    def _index_record(self, stem: str, offset: int, length: int, record: Dict[str, Any]) -> None:
+        current = self._index.get(record["k"])
+        if current is None or record["t"] >= current.timestamp:
+            self._index[record["k"]] = Location(stem, offset, length, record["t"], "v" not in record)
+
+    def _refresh(self) -> None:
+        """Indexe les enregistrements écrits depuis le dernier passage (tous processus)"""
+        stems = self._segment_stems()
+        if any(stem not in stems for stem in self._positions):
+            # Segments compactés : index reconstruit
+            self._index.clear()
+            self._positions.clear()
+
+        for stem in sorted(stems):
+            path = os.path.join(self.directory, stem + stems[stem])
+            position = self._positions.get(stem, 0)
+            try:
+                for offset, length, record in self._scan(path, position):
+                    self._index_record(stem, offset, length, record)
+                    position = offset + length
+            except FileNotFoundError:
+                # Segment scellé ou compacté pendant la lecture
+                continue
+            self._positions[stem] = position
+        self._loaded = True
+
+    # API
+
+    def append_batch(self, records: List[Tuple[str, Optional[Dict[str, Any]]]]) -> str:
+        """
+        Ajoute des enregistrements (clé, données ; None = suppression) en une écriture
+        séquentielle suivie d'un seul fsync. Retourne le segment écrit
+        """
+        with self._lock:
+            if self._active_fd is not None and self._active_pid != os.getpid():
+                # Processus forké : le segment actif appartient au parent
+                os.close(self._active_fd)
+                self._active_fd = None
+            if self._active_fd is None:
+                self._open_active()
+
+            buffer = bytearray()
+            entries = []
+            for key, data in records:
+                record = {"k": key, "t": time.time_ns()}
+                if data is not None:
+                    record["v"] = data
+                payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                entries.append((self._active_size + len(buffer), _HEADER.size + len(payload), record))
+                buffer += _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+            os.write(self._active_fd, buffer)
+            os.fsync(self._active_fd)
+            stem = self._active_stem
+
+            if self._loaded:
+                for offset, length, record in entries:
+                    self._index_record(stem, offset, length, record)
+                self._positions[stem] = self._active_size + len(buffer)
+            self._active_size += len(buffer)
+
+            if self._active_size >= self.segment_size:
+                self._seal_active()
+            return stem
+
+    def read(self, key: str) -> Optional[Dict[str, Any]]:
+        """Lecture par clé : une recherche dans l'index puis une lecture positionnée"""
+        with self._lock:
+            for attempt in range(2):
+                location = self._index.get(key)
+                if location is None or attempt:
+                    self._refresh()
+                    location = self._index.get(key)
+                if location is None or location.deleted:
+                    return None
+
+                path = self._segment_path(location.stem)
+                if path is None:
+                    # Segment compacté depuis par un autre processus
+                    self._positions.clear()
+                    self._index.clear()
+                    continue
+                with open(path, "rb") as f:
+                    data = os.pread(f.fileno(), location.length, location.offset)
+                payload = data[_HEADER.size:]
+                if len(data) == location.length and zlib.crc32(payload) == _HEADER.unpack(data[:_HEADER.size])[1]:
+                    record = json.loads(payload)
+                    if record["k"] == key:
+                        return record.get("v")
+                self._positions.clear()
+                self._index.clear()
+            return None
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            if not self._loaded or key not in self._index:
+                self._refresh()
+            location = self._index.get(key)
+            return location is not None and not location.deleted
+
+    def keys(self) -> List[str]:
+        """Clés vivantes (dernière version non supprimée)"""
+        with self._lock:
+            self._refresh()
+            return [key for key, location in self._index.items() if not location.deleted]
+
+    def iter_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for key in self.keys():
+            data = self.read(key)
+            if data is not None:
+                yield key, data
+
+    def compact(self, min_segments: int = 2) -> Dict[str, int]:
+        """
+        Fusionne les segments scellés en un seul, sans les versions remplacées ni
+        les enregistrements supprimés. Un seul processus compacte à la fois ;
+        les autres réindexent à la première lecture d'un segment disparu
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "compaction.lock"), "a+b") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return {"segments": 0, "kept": 0, "dropped": 0}
+
+            with self._lock:
+                self._seal_orphans()
+                self._refresh()
+                stems = self._segment_stems()
+                sealed = sorted(stem for stem, suffix in stems.items() if suffix == SEALED_SUFFIX)
+                if len(sealed) < min_segments:
+                    return {"segments": 0, "kept": 0, "dropped": 0}
+                index = dict(self._index)
+
+            # Clés présentes dans les segments actifs : leurs suppressions doivent être conservées
+            open_keys = set()
+            for stem, suffix in stems.items():
+                # Un segment actif peut avoir été scellé entre-temps
+                path = self._segment_path(stem) if suffix == OPEN_SUFFIX else None
+                if path is not None:
+                    open_keys.update(record["k"] for _, _, record in self._scan(path))
+
+            # Nom jamais réutilisé : un index périmé ne peut pas pointer dans le nouveau segment
+            output_stem = f"{sealed[-1].split('-', 1)[0]}-c{time.time_ns()}"
+            temp_path = os.path.join(self.directory, output_stem + ".tmp")
+            kept = dropped = 0
+            with open(temp_path, "wb") as output:
+                for stem in sealed:
+                    for offset, length, record in self._scan(os.path.join(self.directory, stem + SEALED_SUFFIX)):
+                        location = index.get(record["k"])
+                        is_latest = location is not None and location.stem == stem and location.offset == offset
+                        if not is_latest or ("v" not in record and record["k"] not in open_keys):
+                            dropped += 1
+                            continue
+                        payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                        output.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+                        kept += 1
+                output.flush()
+                os.fsync(output.fileno())
+
+            with self._lock:
+                os.replace(temp_path, os.path.join(self.directory, output_stem + SEALED_SUFFIX))
+                for stem in sealed:
+                    os.remove(os.path.join(self.directory, stem + SEALED_SUFFIX))
+                self._index.clear()
+                self._positions.clear()
+                self._loaded = False
+
+        return {"segments": len(sealed), "kept": kept, "dropped": dropped}
+
+    def sealed_segment_count(self) -> int:
+        return sum(1 for suffix in self._segment_stems().values() if suffix == SEALED_SUFFIX)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._active_pid != os.getpid():
+                self._active_fd = None
+            self._seal_active()
@@ -0,0 +1,226 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+import fcntl
+import os
+import shutil
+import time
+
+from app.core.config import settings
+
+# Verrou partagé détenu jusqu'à la fin du processus (dossier multi-processus utilisé)
+_multiprocess_owner: Optional[int] = None
+
+
+def _attach_multiprocess_dir(directory: str) -> None:
+    """
+    Rattache ce processus au dossier multi-processus ; le dossier est d'abord vidé
+    si aucun processus vivant ne le détient (valeurs d'un lancement précédent),
+    quel que soit le lanceur : start.py, uvicorn --workers, gunicorn
+    """
+    global _multiprocess_owner
+    os.makedirs(os.path.dirname(directory) or ".", exist_ok=True)
+    # Verrou de contrôle : test et rattachement sans concurrence entre processus
+    guard = os.open(f"{directory}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(guard, fcntl.LOCK_EX)
+        owner = os.open(f"{directory}.owners", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(owner, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            shutil.rmtree(directory, ignore_errors=True)
+        except BlockingIOError:
+            pass
+        fcntl.flock(owner, fcntl.LOCK_SH)
+        _multiprocess_owner = owner
+        os.makedirs(directory, exist_ok=True)
+    finally:
+        os.close(guard)
+
+
+# Mode multi-processus : chaque worker uvicorn écrit ses valeurs dans des fichiers
+# mappés en mémoire, agrégés à la lecture de /metrics. La variable doit être
+# définie avant l'import de prometheus_client
+if settings.METRICS_MULTIPROC_DIR:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.abspath(settings.METRICS_MULTIPROC_DIR))
+    _attach_multiprocess_dir(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send  # noqa: E402
+
+# Étapes mesurées d'un upload
+UPLOAD_STAGES = (
+    "multipart_parse",   # Réception du corps et parsing multipart (avant le handler)
+    "form_json_parse",   # json.loads de form_data
+    "file_validation",   # FileValidator (extension, taille annoncée)
+    "form_validation",   # DynamicFormValidator
+    "storage_cv_write",  # Lecture en flux, validation du contenu et écriture du CV
+    "storage_json_write",
+    "index_write",
+    "listeners",
+    "save_total",        # StorageService.save_cv_upload complet
+)
+
+# Des uploads de quelques ms aux écritures distantes lentes
+_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+UPLOAD_STAGE_SECONDS = Histogram(
+    "cv_upload_stage_seconds", "Durée de chaque étape d'un upload", ["stage"], buckets=_LATENCY_BUCKETS
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "cv_http_request_seconds", "Durée totale des requêtes instrumentées", ["endpoint"], buckets=_LATENCY_BUCKETS
+)
+HTTP_REQUESTS = Counter(
+    "cv_http_requests", "Requêtes instrumentées par code de statut", ["endpoint", "status"]
+)
+HTTP_IN_FLIGHT = Gauge(
+    "cv_http_requests_in_flight", "Requêtes instrumentées en cours", ["endpoint"], multiprocess_mode="livesum"
+)
+HTTP_RECEIVED_BYTES = Counter(
+    "cv_http_received_bytes", "Octets de corps de requête reçus", ["endpoint"]
+)
+STORAGE_IN_FLIGHT = Gauge(
+    "cv_storage_saves_in_flight", "Sauvegardes StorageService en cours", multiprocess_mode="livesum"
+)
+STORAGE_WRITTEN_BYTES = Counter(
+    "cv_storage_written_bytes", "Octets de CV écrits par le backend de stockage", ["backend"]
+)
+STORAGE_DEDUPLICATED = Counter(
+    "cv_storage_deduplicated", "CV déjà stockés (écriture évitée)", ["backend"]
+)
+HTTP_REJECTED = Counter(
+    "cv_http_rejected", "Requêtes d'upload rejetées (surcharge 503, débit 429)", ["reason"]
+)
+DUPLICATE_CANDIDATES = Counter(
+    "cv_duplicate_candidates", "Uploads d'un candidat déjà connu (même email ou téléphone)"
+)
+RETENTION_PURGED = Counter(
+    "cv_retention_purged", "Uploads et fichiers supprimés par la purge de rétention", ["kind"]
+)
+OUTBOX_EVENTS = Counter(
+    "cv_outbox_events", "Événements d'outbox par résultat de livraison", ["result"]
+)
+IDEMPOTENT_REQUESTS = Counter(
+    "cv_idempotent_requests",
+    "Uploads avec clé d'idempotence (réponse enregistrée, rejouée, en conflit, requête différente)",
+    ["result"]
+)
+STORAGE_CACHE_REQUESTS = Counter(
+    "cv_storage_cache_requests", "Lectures via le cache disque du stockage distant", ["folder", "result"]
+)
+STORAGE_CACHE_EVICTED = Counter(
+    "cv_storage_cache_evicted", "Fichiers évincés du cache disque (taille maximale atteinte)"
+)
+UPLOAD_STAGE_ERRORS = Counter(
+    "cv_upload_stage_errors", "Échecs par étape d'upload", ["stage"]
+)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "cv_event_loop_lag_seconds", "Retard de la boucle d'événements sur son réveil planifié",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+EVENT_LOOP_STALLS = Counter(
+    "cv_event_loop_stalls", "Blocages de la boucle d'événements au-delà de LOOP_LAG_THRESHOLD"
+)
+
+# Histogrammes par étape résolus une fois : pas de recherche de labels sur le chemin critique
+_STAGE_HISTOGRAMS = {stage: UPLOAD_STAGE_SECONDS.labels(stage=stage) for stage in UPLOAD_STAGES}
+
+# Début de la requête courante (posé par MetricsMiddleware, lu par les handlers)
+_request_started: ContextVar[Optional[float]] = ContextVar("request_started", default=None)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    _STAGE_HISTOGRAMS[stage].observe(seconds)
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """Mesure la durée d'une étape ; les échecs sont comptés par étape"""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        UPLOAD_STAGE_ERRORS.labels(stage=stage).inc()
+        raise
+    finally:
+        _STAGE_HISTOGRAMS[stage].observe(time.perf_counter() - started)
+
+
+def observe_since_request_start(stage: str) -> None:
+    """Durée écoulée depuis l'arrivée de la requête (ex : parsing multipart avant le handler)"""
+    started = _request_started.get()
+    if started is not None:
+        _STAGE_HISTOGRAMS[stage].observe(time.perf_counter() - started)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Métriques au format texte Prometheus, agrégées sur tous les workers"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    """Arrêt d'un worker : ses jauges ne comptent plus dans l'agrégat"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    Mesure les requêtes des chemins instrumentés : durée, requêtes en cours,
+    octets reçus et réponses par code de statut
+    `endpoints` associe chaque chemin à son label ; les autres chemins ne sont pas mesurés
+    """
+
+    def __init__(self, app: ASGIApp, endpoints: Dict[str, str]):
+        self.app = app
+        self.endpoints = endpoints
+        # Séries pré-résolues par chemin
+        self._series = {
+            path: (
+                HTTP_REQUEST_SECONDS.labels(endpoint=label),
+                HTTP_IN_FLIGHT.labels(endpoint=label),
+                HTTP_RECEIVED_BYTES.labels(endpoint=label),
+            )
+            for path, label in endpoints.items()
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        series = self._series.get(scope["path"]) if scope["type"] == "http" else None
+        if series is None:
+            await self.app(scope, receive, send)
+            return
+
+        duration, in_flight, received_bytes = series
+        started = time.perf_counter()
+        token = _request_started.set(started)
+        status = 500
+        received = 0
+
+        async def counted_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        try:
+            await self.app(scope, counted_receive, tracked_send)
+        finally:
+            in_flight.dec()
+            _request_started.reset(token)
+            duration.observe(time.perf_counter() - started)
+            received_bytes.inc(received)
+            HTTP_REQUESTS.labels(endpoint=self.endpoints[scope["path"]], status=str(status)).inc()
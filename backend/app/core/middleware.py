@@ -0,0 +1,459 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import hashlib
+import math
+import time
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.idempotency import DONE, IdempotencyStore, StoredResponse
+from app.core.metrics import HTTP_REJECTED, IDEMPOTENT_REQUESTS
+
+
+def _too_large_detail() -> str:
+    return f"Fichier trop volumineux. Taille maximale: {settings.MAX_FILE_SIZE / (1024*1024):.1f}MB"
+
+
+class RequestTooLarge(HTTPException):
+    """
+    Levée lorsque le corps de la requête dépasse la limite autorisée
+    Hérite de HTTPException pour que FastAPI la propage telle quelle (413)
+    au lieu de la transformer en erreur de parsing
+    """
+
+    def __init__(self):
+        super().__init__(status_code=413, detail=_too_large_detail())
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejette en 413 les uploads trop volumineux avant le parsing multipart
+    La limite est vérifiée sur le Content-Length annoncé puis sur les octets
+    effectivement reçus (transferts chunked)
+    `limits` associe chaque chemin protégé à sa taille de corps maximale
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        max_body_size = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if max_body_size is None or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        # Rejet immédiat sur la taille annoncée
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > max_body_size:
+                    await self._reject(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_size:
+                    raise RequestTooLarge()
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except RequestTooLarge:
+            if response_started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": _too_large_detail()},
+            headers={"Connection": "close"}
+        )
+        await response(scope, receive, send)
+
+
+def _matches(path: str, paths: Tuple[str, ...]) -> bool:
+    """Chemin protégé : égal à l'un des chemins ou situé en dessous"""
+    return any(path == prefix or path.startswith(prefix + "/") for prefix in paths)
+
+
+async def _reject_with_retry(scope: Scope, receive: Receive, send: Send, status_code: int,
+                             detail: str, retry_after: int) -> None:
+    response = JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, retry_after)), "Connection": "close"}
+    )
+    await response(scope, receive, send)
+
+
+class AdmissionControlMiddleware:
+    """
+    Limite le nombre de requêtes d'upload traitées simultanément par worker
+    Au-delà, la requête attend au plus `queue_timeout` secondes une place libre
+    puis est rejetée en 503 avec Retry-After : le surplus est refusé vite au lieu
+    d'être mis en file sans limite (mémoire et E/S disque bornées)
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], max_concurrency: int,
+                 queue_timeout: float = 0.0, retry_after: int = 1):
+        self.app = app
+        self.paths = tuple(paths)
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _acquire(self) -> bool:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return True
+        if self.queue_timeout <= 0:
+            return False
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (self.max_concurrency <= 0 or scope["type"] != "http"
+                or scope["method"] in ("GET", "HEAD", "OPTIONS") or not _matches(scope["path"], self.paths)):
+            await self.app(scope, receive, send)
+            return
+
+        if not await self._acquire():
+            HTTP_REJECTED.labels(reason="overload").inc()
+            await _reject_with_retry(
+                scope, receive, send, 503,
+                "Service momentanément surchargé, veuillez réessayer", self.retry_after
+            )
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._semaphore.release()
+
+
+def _client_identity(scope: Scope, api_key_header: bytes, api_keys: frozenset) -> Tuple[str, str]:
+    """Clé d'API du client si elle est connue, sinon son adresse IP"""
+    for name, value in scope["headers"]:
+        if name == api_key_header:
+            api_key = value.decode("latin-1")
+            if api_key in api_keys:
+                return "key", api_key
+            break
+    client = scope.get("client")
+    return "ip", client[0] if client else ""
+
+
+class TokenBucket:
+    """Seau à jetons : `rate` jetons par seconde, au plus `burst` accumulés"""
+
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, burst: int, now: float):
+        self.tokens = float(burst)
+        self.updated_at = now
+
+    def consume(self, rate: float, burst: int, now: float) -> float:
+        """Consomme un jeton ; retourne 0 si accepté, sinon l'attente en secondes"""
+        self.tokens = min(float(burst), self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / rate if rate > 0 else float(settings.UPLOAD_RETRY_AFTER)
+
+
+class RateLimitMiddleware:
+    """
+    Limitation de débit en mémoire par client (429 avec Retry-After)
+    Un client est identifié par sa clé d'API si elle est connue (RATE_LIMIT_API_KEYS),
+    sinon par son adresse IP : une clé inconnue ne permet pas de contourner la limite
+    par IP. Derrière un proxy, lancer uvicorn avec --proxy-headers pour que
+    l'adresse du client soit celle de X-Forwarded-For. Limites propres à chaque worker
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str]):
+        self.app = app
+        self.paths = tuple(paths)
+        self.api_keys = frozenset(settings.RATE_LIMIT_API_KEYS)
+        self.api_key_header = settings.RATE_LIMIT_API_KEY_HEADER.lower().encode("latin-1")
+        # Seaux les moins récemment utilisés évincés au-delà de RATE_LIMIT_MAX_CLIENTS
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+
+    def _client(self, scope: Scope) -> Tuple[str, str, float, int]:
+        """Identité du client et limites associées"""
+        kind, identity = _client_identity(scope, self.api_key_header, self.api_keys)
+        if kind == "key":
+            return kind, identity, settings.RATE_LIMIT_API_KEY_RATE, settings.RATE_LIMIT_API_KEY_BURST
+        return kind, identity, settings.RATE_LIMIT_IP_RATE, settings.RATE_LIMIT_IP_BURST
+
+    def _consume(self, scope: Scope) -> float:
+        kind, identity, rate, burst = self._client(scope)
+        now = time.monotonic()
+        key = (kind, identity)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(burst, now)
+            while len(self._buckets) > settings.RATE_LIMIT_MAX_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.consume(rate, burst, now)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Seules les créations sont comptées (POST) : pas les blocs d'un upload reprenable
+        if (not settings.RATE_LIMIT_ENABLED or scope["type"] != "http"
+                or scope["method"] != "POST" or not _matches(scope["path"], self.paths)):
+            await self.app(scope, receive, send)
+            return
+
+        wait = self._consume(scope)
+        if wait > 0:
+            HTTP_REJECTED.labels(reason="rate_limit").inc()
+            await _reject_with_retry(
+                scope, receive, send, 429,
+                "Trop de requêtes, veuillez réessayer plus tard", math.ceil(wait)
+            )
+            return
+
+        await self.app(scope, receive, send)
+
+
+def _multipart_boundary(scope: Scope) -> Optional[bytes]:
+    for name, value in scope["headers"]:
+        if name == b"content-type":
+            for param in value.split(b";")[1:]:
+                param_name, _, param_value = param.strip().partition(b"=")
+                if param_name.lower() == b"boundary":
+                    return param_value.strip(b'"') or None
+            return None
+    return None
+
+
+class BodyFingerprint:
+    """
+    Empreinte SHA-256 du corps d'une requête, calculée bloc par bloc
+    Le délimiteur multipart, tiré au hasard à chaque envoi par la plupart des
+    clients, est ignoré : une nouvelle tentative du même upload a la même empreinte
+    """
+
+    def __init__(self, scope: Scope):
+        self._hash = hashlib.sha256()
+        self._boundary = _multipart_boundary(scope)
+        # Fin du bloc précédent : début possible d'un délimiteur coupé entre deux blocs
+        self._tail = b""
+
+    def update(self, chunk: bytes) -> None:
+        if not self._boundary:
+            self._hash.update(chunk)
+            return
+        data = (self._tail + chunk).replace(self._boundary, b"\0")
+        split = max(len(data) - len(self._boundary) + 1, 0)
+        self._hash.update(data[:split])
+        self._tail = data[split:]
+
+    def hexdigest(self) -> str:
+        self._hash.update(self._tail)
+        self._tail = b""
+        return self._hash.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    Uploads idempotents (en-tête Idempotency-Key) : la réponse réussie de la
+    première requête est enregistrée et rejouée telle quelle pour toute requête
+    portant la même clé et le même corps, sans rien réécrire (le corps n'est lu
+    que pour son empreinte). Les clés sont propres à chaque client, identifié
+    comme par RateLimitMiddleware (clé d'API connue, sinon adresse IP) ; une clé
+    réutilisée avec un autre corps est refusée (422). Une requête identique
+    arrivée pendant le traitement de la première attend son résultat (dans le
+    même worker, sans interroger la base ; depuis un autre worker, par relecture
+    du store). Une réponse en erreur n'est pas conservée : la clé est libérée et
+    la requête pourra être refaite
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], store: IdempotencyStore):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.store = store
+        self.header = settings.IDEMPOTENCY_HEADER.lower().encode("latin-1")
+        self.api_keys = frozenset(settings.RATE_LIMIT_API_KEYS)
+        self.api_key_header = settings.RATE_LIMIT_API_KEY_HEADER.lower().encode("latin-1")
+        # Clé -> réponse de la requête en cours dans ce worker (None si échec)
+        self._in_flight: Dict[str, "asyncio.Future[Optional[StoredResponse]]"] = {}
+
+    def _key(self, scope: Scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == self.header:
+                return value.decode("latin-1").strip()
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (not settings.IDEMPOTENCY_ENABLED or scope["type"] != "http"
+                or scope["method"] != "POST" or scope["path"] not in self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        key = self._key(scope)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > settings.IDEMPOTENCY_KEY_MAX_LENGTH:
+            response = JSONResponse(
+                status_code=400,
+                content={"detail": f"En-tête {settings.IDEMPOTENCY_HEADER} invalide "
+                                   f"(1 à {settings.IDEMPOTENCY_KEY_MAX_LENGTH} caractères)"}
+            )
+            await response(scope, receive, send)
+            return
+        # Une clé par client et par route : un client ne rejoue jamais la réponse d'un
+        # autre, l'upload simple et le lot ne se rejouent pas l'un l'autre. Empreinte
+        # seule en base (pas de clé d'API en clair)
+        kind, identity = _client_identity(scope, self.api_key_header, self.api_keys)
+        key = hashlib.sha256(f"{kind}:{identity}:{scope['path']}:{key}".encode("utf-8")).hexdigest()
+
+        while True:
+            pending = self._in_flight.get(key)
+            if pending is not None:
+                stored = await asyncio.shield(pending)
+                if stored is not None:
+                    await self._replay(stored, "waited", scope, receive, send)
+                    return
+                # Première requête en échec : nouvelle tentative (corps non lu)
+                continue
+
+            future = asyncio.get_running_loop().create_future()
+            self._in_flight[key] = future
+            stored = None
+            try:
+                row = await self.store.begin(key)
+                if row is None:
+                    stored = await self._execute(key, scope, receive, send)
+                    return
+                if row["status"] == DONE:
+                    stored = StoredResponse.from_row(row)
+                    await self._replay(stored, "replayed", scope, receive, send)
+                    return
+                # Requête en cours dans un autre worker
+                stored, released = await self._wait_other_worker(key)
+                if stored is not None:
+                    await self._replay(stored, "waited", scope, receive, send)
+                    return
+                if not released:
+                    IDEMPOTENT_REQUESTS.labels(result="conflict").inc()
+                    await _reject_with_retry(
+                        scope, receive, send, 409,
+                        "Une requête avec la même clé d'idempotence est en cours de traitement",
+                        settings.UPLOAD_RETRY_AFTER
+                    )
+                    return
+            finally:
+                del self._in_flight[key]
+                future.set_result(stored)
+
+    async def _execute(self, key: str, scope: Scope, receive: Receive, send: Send) -> Optional[StoredResponse]:
+        """Traite la requête qui détient la clé ; enregistre sa réponse si elle a réussi"""
+        status_code = 0
+        content_type: Optional[str] = None
+        chunks: List[bytes] = []
+        fingerprint = BodyFingerprint(scope)
+
+        async def fingerprinting_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                fingerprint.update(message.get("body", b""))
+            return message
+
+        async def recording_send(message: Message) -> None:
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", []):
+                    if name == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, fingerprinting_receive, recording_send)
+        except BaseException:
+            await asyncio.shield(self.store.release(key))
+            raise
+
+        if not 200 <= status_code < 300:
+            await self.store.release(key)
+            return None
+        stored = StoredResponse(status_code, content_type, b"".join(chunks), fingerprint.hexdigest())
+        await self.store.complete(key, stored)
+        IDEMPOTENT_REQUESTS.labels(result="stored").inc()
+        return stored
+
+    async def _wait_other_worker(self, key: str) -> Tuple[Optional[StoredResponse], bool]:
+        """
+        Relit la clé jusqu'à la réponse de l'autre worker ou IDEMPOTENCY_WAIT_TIMEOUT ;
+        retourne (réponse, clé libérée entre-temps)
+        """
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+            row = await self.store.get(key)
+            if row is None:
+                return None, True
+            if row["status"] == DONE:
+                return StoredResponse.from_row(row), False
+        return None, False
+
+    @staticmethod
+    async def _read_fingerprint(scope: Scope, receive: Receive) -> str:
+        """Lit le corps de la requête sans le conserver et retourne son empreinte"""
+        fingerprint = BodyFingerprint(scope)
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            fingerprint.update(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return fingerprint.hexdigest()
+
+    async def _replay(self, stored: StoredResponse, result: str,
+                      scope: Scope, receive: Receive, send: Send) -> None:
+        if await self._read_fingerprint(scope, receive) != stored.fingerprint:
+            IDEMPOTENT_REQUESTS.labels(result="mismatch").inc()
+            response = JSONResponse(
+                status_code=422,
+                content={"detail": "Clé d'idempotence déjà utilisée pour une requête différente"}
+            )
+            await response(scope, receive, send)
+            return
+        IDEMPOTENT_REQUESTS.labels(result=result).inc()
+        response = Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type=stored.content_type,
+            headers={"Idempotent-Replayed": "true"}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,273 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Sequence, Set
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+
+import aiohttp
+
+from app.core.config import settings
+from app.core.io_pool import run_io
+from app.core.metrics import OUTBOX_EVENTS
+
+logger = logging.getLogger(__name__)
+
+# Codes HTTP après lesquels le même lot est renvoyé (les autres 4xx sont définitifs)
+RETRYABLE_STATUSES = frozenset({408, 425, 429})
+
+
+class DeliveryError(Exception):
+    """Échec de livraison d'un lot ; `retry_after` imposé par le destinataire (secondes)"""
+
+    def __init__(self, message: str, permanent: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.permanent = permanent
+        self.retry_after = retry_after
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """En-tête Retry-After : nombre de secondes ou date HTTP"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def encode_batch(events: Sequence[sqlite3.Row]) -> bytes:
+    """Corps d'un lot : {"events": [...]}, charges utiles stockées en JSON compact reprises telles quelles"""
+    return "".join((
+        '{"events":[',
+        ",".join(
+            f'{{"id":{event["event_id"]},"type":{json.dumps(event["event_type"])},'
+            f'"created_at":{json.dumps(event["created_at"])},"data":{event["payload"]}}}'
+            for event in events
+        ),
+        "]}"
+    )).encode("utf-8")
+
+
+class HTTPSink:
+    """Destinataire HTTP : un POST JSON par lot, session et connexions partagées"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def open(self) -> None:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=settings.OUTBOX_MAX_IN_FLIGHT),
+                timeout=aiohttp.ClientTimeout(total=settings.OUTBOX_TIMEOUT)
+            )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def send(self, body: bytes) -> None:
+        try:
+            async with self._session.post(
+                self.url, data=body, headers={"Content-Type": "application/json"}
+            ) as response:
+                if response.status < 300:
+                    return
+                permanent = 400 <= response.status < 500 and response.status not in RETRYABLE_STATUSES
+                raise DeliveryError(
+                    f"HTTP {response.status}",
+                    permanent=permanent,
+                    retry_after=_retry_after(response.headers.get("Retry-After"))
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise DeliveryError(f"{type(e).__name__}: {e}")
+
+
+class FileSink:
+    """Destinataire local (développement, tests) : une ligne NDJSON par événement"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def open(self) -> None:
+        await run_io(os.makedirs, os.path.dirname(self.path) or ".", exist_ok=True)
+
+    async def close(self) -> None:
+        pass
+
+    def _append(self, body: bytes) -> None:
+        lines = "".join(
+            json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for event in json.loads(body)["events"]
+        )
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    async def send(self, body: bytes) -> None:
+        try:
+            await run_io(self._append, body)
+        except OSError as e:
+            raise DeliveryError(str(e))
+
+
+def create_sink(url: str):
+    if url.startswith("file:"):
+        return FileSink(url[len("file:"):])
+    if url.startswith(("http://", "https://")):
+        return HTTPSink(url)
+    raise ValueError(f"OUTBOX_SINK_URL non supportée : {url}")
+
+
+def backoff_delay(attempts: int) -> float:
+    """Attente avant la tentative suivante : exponentielle plafonnée, avec gigue"""
+    delay = min(settings.OUTBOX_BACKOFF_MAX, settings.OUTBOX_BACKOFF_BASE * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class OutboxDispatcher:
+    """
+    Livraison des événements de l'outbox aux services aval
+    Les événements sont écrits dans la transaction de l'upload (index) ; ce
+    dispatcher les réserve par lots de OUTBOX_BATCH_SIZE et les envoie hors du
+    chemin de la requête, avec au plus OUTBOX_MAX_IN_FLIGHT lots en cours par
+    worker. Un lot en échec est renvoyé après une attente exponentielle ; la
+    réservation d'un worker arrêté expire et le lot est repris (livraison au
+    moins une fois : les destinataires dédoublonnent sur l'id de l'événement)
+    """
+
+    def __init__(self, storage_service):
+        self.storage_service = storage_service
+        self._sink = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    async def start(self) -> None:
+        if not settings.OUTBOX_SINK_URL or self._task is not None:
+            return
+        self._sink = create_sink(settings.OUTBOX_SINK_URL)
+        await self._sink.open()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._sink is not None:
+            await self._sink.close()
+            self._sink = None
+
+    async def on_upload(self, metadata: Dict[str, Any]) -> None:
+        """Listener du StorageService : l'événement est déjà en outbox, réveil du dispatcher"""
+        self._wakeup.set()
+
+    async def on_purge(self, upload_ids: List[str]) -> None:
+        """Listener de la purge de rétention : événements de suppression à livrer"""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        in_flight: Set[asyncio.Task] = set()
+        try:
+            await self._dispatch(in_flight)
+        finally:
+            # Arrêt : les lots en cours seront repris à l'expiration de leur réservation
+            for task in in_flight:
+                task.cancel()
+
+    async def _dispatch(self, in_flight: Set[asyncio.Task]) -> None:
+        index = self.storage_service.index
+        while True:
+            self._wakeup.clear()
+            batch = []
+            if len(in_flight) < settings.OUTBOX_MAX_IN_FLIGHT:
+                try:
+                    batch = await index.claim_events(settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_LEASE_SECONDS)
+                except Exception:
+                    logger.exception("Impossible de lire l'outbox")
+
+            if batch:
+                in_flight.add(asyncio.create_task(self._deliver(batch)))
+                if len(batch) == settings.OUTBOX_BATCH_SIZE and len(in_flight) < settings.OUTBOX_MAX_IN_FLIGHT:
+                    continue
+
+            # Attente : fin d'un envoi, nouvel événement ou scrutation périodique
+            # (événements d'un autre worker, nouvelles tentatives)
+            wakeup = asyncio.ensure_future(self._wakeup.wait())
+            await asyncio.wait(
+                {wakeup, *in_flight},
+                timeout=settings.OUTBOX_POLL_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            wakeup.cancel()
+            in_flight.difference_update([task for task in in_flight if task.done()])
+            # Regroupement des événements d'une rafale d'uploads en un seul lot
+            if settings.OUTBOX_LINGER > 0:
+                await asyncio.sleep(settings.OUTBOX_LINGER)
+
+    async def _deliver(self, batch: List[sqlite3.Row]) -> None:
+        index = self.storage_service.index
+        event_ids = [event["event_id"] for event in batch]
+        try:
+            await self._sink.send(encode_batch(batch))
+        except DeliveryError as e:
+            await self._retry(batch, e)
+            return
+        except Exception as e:
+            logger.exception("Échec inattendu de livraison d'un lot d'événements")
+            await self._retry(batch, DeliveryError(str(e)))
+            return
+
+        try:
+            await index.ack_events(event_ids)
+        except Exception:
+            # Lot livré mais toujours en outbox : renvoyé après expiration de la réservation
+            logger.exception("Impossible de retirer de l'outbox %d événements livrés", len(event_ids))
+            return
+        OUTBOX_EVENTS.labels(result="delivered").inc(len(event_ids))
+        # Place libre pour un autre lot
+        self._wakeup.set()
+
+    async def _retry(self, batch: List[sqlite3.Row], error: DeliveryError) -> None:
+        try:
+            await self._schedule_retry(batch, error)
+        except Exception:
+            # Lot toujours réservé : repris après expiration de la réservation
+            logger.exception("Impossible de replanifier %d événements", len(batch))
+
+    async def _schedule_retry(self, batch: List[sqlite3.Row], error: DeliveryError) -> None:
+        index = self.storage_service.index
+        dead = [
+            event["event_id"] for event in batch
+            if error.permanent or event["attempts"] >= settings.OUTBOX_MAX_ATTEMPTS
+        ]
+        retry = [event for event in batch if event["event_id"] not in dead]
+        message = str(error)[:500]
+
+        if dead:
+            logger.error("%d événements abandonnés après échec de livraison : %s", len(dead), message)
+            await index.retry_events(dead, 0.0, message, dead=True)
+            OUTBOX_EVENTS.labels(result="dead").inc(len(dead))
+        if retry:
+            delay = backoff_delay(max(event["attempts"] for event in retry))
+            if error.retry_after is not None:
+                delay = max(delay, min(error.retry_after, settings.OUTBOX_BACKOFF_MAX))
+            logger.warning(
+                "Livraison de %d événements en échec (%s), nouvelle tentative dans %.1fs",
+                len(retry), message, delay
+            )
+            await index.retry_events([event["event_id"] for event in retry], delay, message)
+            OUTBOX_EVENTS.labels(result="retried").inc(len(retry))
@@ -0,0 +1,148 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+import os
+
+from starlette.background import BackgroundTask
+from starlette.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.io_pool import run_io
+
+
+class RangeNotSatisfiable(Exception):
+    """Plage demandée hors du fichier (416)"""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Plage d'octets demandée (début, fin incluse), None pour le fichier complet
+    Une seule plage est servie : les demandes multi-plages reçoivent le fichier complet
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # bytes=-N : les N derniers octets
+            suffix = int(end_text)
+            if suffix == 0:
+                raise RangeNotSatisfiable()
+            start, end = max(0, size - suffix), size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+class LocalRangeResponse(Response):
+    """
+    Envoi d'un fichier local (complet ou plage) sans passer par Python quand le
+    serveur le permet : extension ASGI zerocopysend (sendfile), pathsend pour un
+    fichier complet, sinon lecture par blocs dans un thread
+    `release` est appelé une fois la réponse terminée, même interrompue
+    (fichier épinglé du cache disque)
+    """
+
+    def __init__(self, path: str, start: int, length: int, status_code: int, headers: Dict[str, str],
+                 media_type: str = "application/pdf", release: Optional[Callable[[], Awaitable[None]]] = None):
+        self.path = path
+        self.start = start
+        self.length = length
+        self.full_file = status_code == 200
+        self.release = release
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self._send_file(scope, send)
+        finally:
+            if self.release is not None:
+                await self.release()
+
+    async def _send_file(self, scope: Scope, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with await run_io(open, self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+            return
+
+        if self.full_file and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+
+        fd = await run_io(os.open, self.path, os.O_RDONLY)
+        try:
+            offset, remaining = self.start, self.length
+            while remaining > 0:
+                chunk = await run_io(os.pread, fd, min(settings.DOWNLOAD_CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # Fichier tronqué pendant l'envoi : fin de réponse
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
+
+
+def range_response(
+    size: int,
+    range_header: Optional[str],
+    headers: Dict[str, str],
+    local_path: Optional[str] = None,
+    stream_factory: Optional[Callable[[int, int], AsyncIterator[bytes]]] = None,
+    head: bool = False,
+    release: Optional[Callable[[], Awaitable[None]]] = None,
+) -> Response:
+    """
+    Réponse 200 ou 206 pour un fichier de `size` octets (416 si la plage est invalide)
+    `local_path` : fichier local, libéré par `release` après l'envoi ;
+    sinon `stream_factory(offset, length)` fournit les octets
+    """
+    headers = {**headers, "accept-ranges": "bytes"}
+    try:
+        requested = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(
+            status_code=416,
+            headers={**headers, "content-range": f"bytes */{size}"},
+            background=BackgroundTask(release) if release is not None else None
+        )
+
+    if requested is None:
+        start, length, status_code = 0, size, 200
+    else:
+        start, end = requested
+        length, status_code = end - start + 1, 206
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+    if local_path is not None:
+        return LocalRangeResponse(local_path, start, length, status_code, headers, release=release)
+
+    headers["content-length"] = str(length)
+    if head:
+        # HEAD : en-têtes seuls, sans téléchargement distant
+        return Response(status_code=status_code, headers=headers, media_type="application/pdf")
+    return StreamingResponse(
+        stream_factory(start, length), status_code=status_code, headers=headers, media_type="application/pdf"
+    )
@@ -0,0 +1,125 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, List, Optional, Sequence
+import asyncio
+import fcntl
+import json
+import logging
+import os
+
+from app.core.config import settings
+from app.core.io_pool import run_io
+
+logger = logging.getLogger(__name__)
+
+
+def _rewind(created_at: str, seconds: float) -> str:
+    """Date de création décalée de `seconds` en arrière (chaîne vide si illisible : tout est relu)"""
+    try:
+        return (datetime.fromisoformat(created_at) - timedelta(seconds=seconds)).isoformat()
+    except ValueError:
+        return ""
+
+
+class IndexReconciler:
+    """
+    Rattrapage des index dérivés (recherche plein texte, matching) depuis l'index des uploads
+    Les listeners d'upload indexent chaque candidat immédiatement mais ne
+    retentent pas un échec. Toutes les RECONCILE_INTERVAL secondes, les uploads
+    créés depuis la position enregistrée par chaque index (moins RECONCILE_LAG :
+    uploads validés dans le désordre entre workers) sont comparés à l'index et
+    les absents y sont ajoutés, avec le texte du CV s'il est extrait. Un index
+    créé vide (nouveau déploiement, fichier supprimé) n'a pas de position : il
+    est rempli depuis le début. Un verrou fcntl limite le rattrapage à un worker
+    à la fois
+
+    Un index cible fournit reconcile_position_sync(), set_reconcile_position_sync(),
+    add_missing_sync(uploads, cv_text_lookup) -> upload_id ajoutés, et on_purge()
+    """
+
+    def __init__(self, upload_index, cv_text_lookup: Callable[[str], Optional[str]],
+                 targets: Sequence, lock_path: Optional[str] = None):
+        self.upload_index = upload_index
+        self.cv_text_lookup = cv_text_lookup
+        self.targets = list(targets)
+        self.lock_path = lock_path or settings.RECONCILE_LOCK_PATH
+        self._task: Optional[asyncio.Task] = None
+
+    def _open_locked(self) -> Optional[int]:
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    @asynccontextmanager
+    async def _locked(self) -> AsyncIterator[bool]:
+        """True si ce processus détient le verrou (False : rattrapage en cours ailleurs)"""
+        fd = await run_io(self._open_locked)
+        try:
+            yield fd is not None
+        finally:
+            if fd is not None:
+                await run_io(os.close, fd)
+
+    async def reconcile(self) -> int:
+        """Ajoute aux index les uploads absents ; retourne le nombre d'ajouts"""
+        async with self._locked() as acquired:
+            if not acquired:
+                return 0
+            added = 0
+            for target in self.targets:
+                added += await self._reconcile_target(target)
+            return added
+
+    async def _reconcile_target(self, target) -> int:
+        position = await run_io(target.reconcile_position_sync)
+        after = (_rewind(position, settings.RECONCILE_LAG), "") if position else None
+        added = 0
+        while True:
+            rows = await run_io(self.upload_index.page_sync, settings.RECONCILE_BATCH_SIZE, after)
+            if not rows:
+                return added
+            uploads = [json.loads(row["metadata"]) for row in rows]
+            added_ids = await run_io(target.add_missing_sync, uploads, self.cv_text_lookup)
+            if added_ids:
+                await self._drop_purged(target, added_ids)
+                added += len(added_ids)
+            after = (rows[-1]["created_at"], rows[-1]["upload_id"])
+            await run_io(target.set_reconcile_position_sync, after[0])
+
+    async def _drop_purged(self, target, upload_ids: List[str]) -> None:
+        """
+        Retire les uploads purgés entre leur lecture et leur ajout : une purge
+        validée avant cette vérification a pu appeler ses listeners trop tôt
+        """
+        existing = await run_io(self.upload_index.existing_ids_sync, upload_ids)
+        purged = [upload_id for upload_id in upload_ids if upload_id not in existing]
+        if purged:
+            await target.on_purge(purged)
+
+    async def start(self) -> None:
+        if settings.RECONCILE_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            try:
+                added = await self.reconcile()
+                if added:
+                    logger.info("Rattrapage des index : %d candidats ajoutés", added)
+            except Exception:
+                logger.exception("Échec du rattrapage des index de recherche et de matching")
+            await asyncio.sleep(settings.RECONCILE_INTERVAL)
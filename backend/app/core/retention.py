@@ -0,0 +1,173 @@
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import fcntl
+import logging
+import os
+import sqlite3
+
+from app.core.config import settings
+from app.core.io_pool import run_io
+from app.core.metrics import RETENTION_PURGED
+
+logger = logging.getLogger(__name__)
+
+
+def retention_cutoff(days: Optional[int] = None) -> str:
+    """Date de création (ISO UTC) avant laquelle un upload est expiré"""
+    days = settings.RETENTION_DAYS if days is None else days
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+
+class RetentionPurger:
+    """
+    Purge RGPD des uploads plus anciens que RETENTION_DAYS
+    Les uploads expirés sont lus dans l'index (date de création) sans parcourir
+    le stockage. Chaque lot est retiré de l'index en une transaction qui met aussi
+    en file ses fichiers (métadonnées, extraction, CV sans autre référence) ; les
+    fichiers sont ensuite supprimés en lot par le backend. Une suppression en échec
+    reste en file et est reprise au passage suivant. Un verrou fcntl limite la
+    purge à un worker à la fois
+    """
+
+    def __init__(self, storage_service, lock_path: Optional[str] = None):
+        self.storage_service = storage_service
+        self.lock_path = lock_path or settings.RETENTION_LOCK_PATH
+        self._purge_listeners: List[Callable[[List[str]], Awaitable[None]]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add_purge_listener(self, listener: Callable[[List[str]], Awaitable[None]]) -> None:
+        """Enregistre un traitement appelé avec les upload_id de chaque lot purgé"""
+        if listener not in self._purge_listeners:
+            self._purge_listeners.append(listener)
+
+    def _open_locked(self) -> Optional[int]:
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    @asynccontextmanager
+    async def _locked(self) -> AsyncIterator[bool]:
+        """True si ce processus détient le verrou de purge (False : purge déjà en cours)"""
+        fd = await run_io(self._open_locked)
+        try:
+            yield fd is not None
+        finally:
+            if fd is not None:
+                await run_io(os.close, fd)
+
+    async def report(self, sample_size: int = 20) -> Dict[str, Any]:
+        """Simulation : uploads et CV qu'une purge supprimerait maintenant"""
+        cutoff = retention_cutoff()
+        report = await self.storage_service.index.retention_report(cutoff, sample_size)
+        return {"retention_days": settings.RETENTION_DAYS, "cutoff": cutoff, **report}
+
+    async def purge(self, max_uploads: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Purge les uploads expirés par lots de RETENTION_BATCH_SIZE, avec une pause
+        de RETENTION_BATCH_PAUSE entre deux lots pour laisser la place aux uploads
+        """
+        if max_uploads is None:
+            max_uploads = settings.RETENTION_MAX_UPLOADS_PER_RUN
+        index = self.storage_service.index
+        cutoff = retention_cutoff()
+        result = {"cutoff": cutoff, "uploads": 0, "files": 0, "skipped": False}
+
+        async with self._locked() as acquired:
+            if not acquired:
+                result["skipped"] = True
+                return result
+
+            # Reprise des suppressions d'un passage précédent interrompu
+            result["files"] += await self._delete_pending()
+
+            while not max_uploads or result["uploads"] < max_uploads:
+                limit = settings.RETENTION_BATCH_SIZE
+                if max_uploads:
+                    limit = min(limit, max_uploads - result["uploads"])
+                upload_ids = await index.expired(cutoff, limit)
+                if not upload_ids:
+                    break
+
+                purged = await index.purge_uploads(upload_ids)
+                await self._notify(purged)
+                result["uploads"] += len(purged)
+                RETENTION_PURGED.labels(kind="uploads").inc(len(purged))
+                result["files"] += await self._delete_pending()
+
+                if len(upload_ids) < limit:
+                    break
+                await asyncio.sleep(settings.RETENTION_BATCH_PAUSE)
+
+        return result
+
+    async def _notify(self, upload_ids: List[str]) -> None:
+        # Données dérivées (recherche, extraction, matching)
+        for listener in self._purge_listeners:
+            try:
+                await listener(upload_ids)
+            except Exception:
+                logger.exception("Échec d'un traitement de purge (%d uploads)", len(upload_ids))
+
+    async def _delete_pending(self) -> int:
+        """Supprime du stockage les fichiers en file ; retourne le nombre de fichiers supprimés"""
+        index = self.storage_service.index
+        backend = self.storage_service.backend
+        page_size = settings.RETENTION_BATCH_SIZE * 2
+        deleted_total = 0
+
+        while True:
+            # CV réservés pendant leur suppression : un upload du même contenu attend
+            # la fin du lot puis réécrit le fichier
+            pending = await index.claim_deletions(page_size)
+            by_folder: Dict[str, List[sqlite3.Row]] = defaultdict(list)
+            for row in pending:
+                by_folder[row["folder"]].append(row)
+
+            deleted = 0
+            for folder, rows in by_folder.items():
+                done: List[str] = []
+                try:
+                    done = await backend.delete_files([row["filename"] for row in rows], folder)
+                finally:
+                    await index.finish_deletions(folder, done, rows)
+                deleted += len(done)
+
+            deleted_total += deleted
+            RETENTION_PURGED.labels(kind="files").inc(deleted)
+            # Page incomplète, ou aucun progrès (échecs repris au prochain passage)
+            if len(pending) < page_size or deleted == 0:
+                return deleted_total
+
+    async def start(self) -> None:
+        if settings.RETENTION_ENABLED and settings.RETENTION_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.create_task(self._purge_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.RETENTION_INTERVAL)
+            try:
+                result = await self.purge()
+                if result["uploads"] or result["files"]:
+                    logger.info(
+                        "Purge de rétention : %d uploads, %d fichiers supprimés",
+                        result["uploads"], result["files"]
+                    )
+            except Exception:
+                logger.exception("Échec de la purge de rétention")
@@ -0,0 +1,222 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import json
+import re
+import sqlite3
+
+from app.core.config import settings
+from app.core.index import metadata_created_at
+from app.core.sqlite_store import SQLiteStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_documents (
+    rowid INTEGER PRIMARY KEY,
+    upload_id TEXT NOT NULL UNIQUE,
+    created_at TEXT,
+    form_data TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+    form_text,
+    cv_text,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+-- Position du rattrapage depuis l'index des uploads (IndexReconciler)
+CREATE TABLE IF NOT EXISTS search_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Poids bm25 des colonnes : les champs du formulaire priment sur le texte du CV
+_BM25_WEIGHTS = (5.0, 1.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def form_text(form_data: Dict[str, Any]) -> str:
+    """Texte indexé d'un formulaire : toutes les valeurs textuelles, quel que soit le champ"""
+    return "\n".join(
+        str(value) for value in form_data.values()
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool) and str(value).strip()
+    )
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Convertit la saisie utilisateur en requête FTS5 sûre
+    Chaque mot devient un terme préfixe ("dev"*), tous les termes sont requis
+    """
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens[:settings.SEARCH_MAX_TERMS])
+
+
+class SearchIndex(SQLiteStore):
+    """
+    Index plein texte (SQLite FTS5) des candidats
+    Mis à jour à chaque upload (champs du formulaire) puis à la fin de
+    l'extraction du CV (texte du CV) ; les requêtes sont classées par bm25.
+    Les uploads manqués (échec du listener, index créé après les uploads) sont
+    ajoutés par IndexReconciler
+    """
+
+    SCHEMA = SCHEMA
+
+    def __init__(self, db_path: Optional[str] = None):
+        super().__init__(db_path or settings.SEARCH_DB_PATH)
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, upload_id: str, created_at: Optional[str],
+                form_data: Dict[str, Any], cv_text: Optional[str] = None) -> None:
+        row = conn.execute(
+            "SELECT rowid FROM search_documents WHERE upload_id = ?", (upload_id,)
+        ).fetchone()
+
+        if row is None:
+            rowid = conn.execute(
+                "INSERT INTO search_documents (upload_id, created_at, form_data) VALUES (?, ?, ?)",
+                (upload_id, created_at, json.dumps(form_data, ensure_ascii=False))
+            ).lastrowid
+            conn.execute(
+                "INSERT INTO search_fts (rowid, form_text, cv_text) VALUES (?, ?, ?)",
+                (rowid, form_text(form_data), cv_text or "")
+            )
+            return
+
+        conn.execute(
+            "UPDATE search_documents SET created_at = ?, form_data = ? WHERE rowid = ?",
+            (created_at, json.dumps(form_data, ensure_ascii=False), row["rowid"])
+        )
+        if cv_text is None:
+            conn.execute(
+                "UPDATE search_fts SET form_text = ? WHERE rowid = ?",
+                (form_text(form_data), row["rowid"])
+            )
+        else:
+            conn.execute(
+                "UPDATE search_fts SET form_text = ?, cv_text = ? WHERE rowid = ?",
+                (form_text(form_data), cv_text, row["rowid"])
+            )
+
+    def index_upload_sync(self, metadata: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            self._upsert(
+                conn, metadata["upload_id"], metadata_created_at(metadata), metadata.get("form_data", {})
+            )
+
+    def set_cv_text_sync(self, upload_id: str, cv_text: str) -> None:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT rowid FROM search_documents WHERE upload_id = ?", (upload_id,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE search_fts SET cv_text = ? WHERE rowid = ?", (cv_text, row["rowid"]))
+
+    def delete_sync(self, upload_ids: List[str]) -> None:
+        with self._transaction() as conn:
+            rows = conn.execute(
+                f"DELETE FROM search_documents WHERE upload_id IN ({','.join('?' * len(upload_ids))}) RETURNING rowid",
+                upload_ids
+            ).fetchall()
+            conn.executemany("DELETE FROM search_fts WHERE rowid = ?", [(row["rowid"],) for row in rows])
+
+    def reconcile_position_sync(self) -> Optional[str]:
+        with self._reader() as conn:
+            row = conn.execute("SELECT value FROM search_state WHERE key = 'reconciled_until'").fetchone()
+        return row["value"] if row else None
+
+    def set_reconcile_position_sync(self, created_at: str) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_state (key, value) VALUES ('reconciled_until', ?)", (created_at,)
+            )
+
+    def add_missing_sync(
+        self, uploads: List[Dict[str, Any]], cv_text_lookup: Callable[[str], Optional[str]]
+    ) -> List[str]:
+        """Indexe les uploads absents de l'index (rattrapage) ; retourne leurs upload_id"""
+        added = []
+        with self._transaction() as conn:
+            upload_ids = [metadata["upload_id"] for metadata in uploads]
+            existing = {
+                row["upload_id"] for row in conn.execute(
+                    f"SELECT upload_id FROM search_documents WHERE upload_id IN ({','.join('?' * len(upload_ids))})",
+                    upload_ids
+                )
+            }
+            for metadata in uploads:
+                upload_id = metadata["upload_id"]
+                if upload_id in existing:
+                    continue
+                self._upsert(
+                    conn, upload_id, metadata_created_at(metadata), metadata.get("form_data", {}),
+                    cv_text_lookup(upload_id)
+                )
+                added.append(upload_id)
+        return added
+
+    def search_sync(self, query: str, limit: int, offset: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """Retourne (nombre total de résultats, page de résultats classés)"""
+        match_query = build_match_query(query)
+        if match_query is None:
+            return 0, []
+
+        with self._reader() as conn:
+            total = conn.execute(
+                "SELECT count(*) FROM search_fts WHERE search_fts MATCH ?", (match_query,)
+            ).fetchone()[0]
+            rows = conn.execute(
+                "SELECT d.upload_id, d.created_at, d.form_data, "
+                "       bm25(search_fts, ?, ?) AS score, "
+                "       snippet(search_fts, 1, '[', ']', '…', 16) AS cv_snippet "
+                "FROM search_fts JOIN search_documents d ON d.rowid = search_fts.rowid "
+                "WHERE search_fts MATCH ? ORDER BY score LIMIT ? OFFSET ?",
+                (*_BM25_WEIGHTS, match_query, limit, offset)
+            ).fetchall()
+
+        return total, [
+            {
+                "upload_id": row["upload_id"],
+                "created_at": row["created_at"],
+                # bm25 est négatif : plus la valeur est basse, plus le résultat est pertinent
+                "score": round(-row["score"], 4),
+                "form_data": json.loads(row["form_data"]),
+                "cv_snippet": row["cv_snippet"] or None
+            }
+            for row in rows
+        ]
+
+    def rebuild_sync(
+        self, uploads: Iterable[Dict[str, Any]], cv_text_lookup: Callable[[str], Optional[str]]
+    ) -> int:
+        """Reconstruit l'index depuis les métadonnées et les textes extraits"""
+        indexed = 0
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM search_fts")
+            conn.execute("DELETE FROM search_documents")
+            for metadata in uploads:
+                self._upsert(
+                    conn,
+                    metadata["upload_id"],
+                    metadata_created_at(metadata),
+                    metadata.get("form_data", {}),
+                    cv_text_lookup(metadata["upload_id"])
+                )
+                indexed += 1
+            conn.execute("INSERT INTO search_fts (search_fts) VALUES ('optimize')")
+        return indexed
+
+    async def on_upload(self, metadata: Dict[str, Any]) -> None:
+        """Listener du StorageService : indexe les champs du formulaire"""
+        await self._run(self.index_upload_sync, metadata)
+
+    async def on_extraction(self, upload_id: str, result: Dict[str, Any]) -> None:
+        """Listener de l'extraction : indexe le texte du CV"""
+        await self._run(self.set_cv_text_sync, upload_id, result.get("text") or "")
+
+    async def on_purge(self, upload_ids: List[str]) -> None:
+        """Listener de la purge de rétention : candidats retirés de l'index"""
+        await self._run(self.delete_sync, upload_ids)
+
+    async def search(self, query: str, limit: int, offset: int) -> Tuple[int, List[Dict[str, Any]]]:
+        return await self._run(self.search_sync, query, limit, offset)
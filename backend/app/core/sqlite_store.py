@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import os
+import sqlite3
+import threading
+
+from app.core.io_pool import run_io
+
+
+class SQLiteStore:
+    """
+    Base des stores SQLite locaux (dossier state/)
+    Connexion partagée protégée par un verrou, mode WAL pour les lectures
+    concurrentes entre workers, appels asynchrones exécutés hors de la boucle
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = os.getpid()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # Processus forké : la connexion héritée du parent n'est jamais réutilisée
+            self._conn = None
+            self._pid = os.getpid()
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            is_new = not os.path.exists(self.db_path)
+
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # WAL : lectures concurrentes entre workers pendant les écritures
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+
+            if is_new:
+                self._on_create(conn)
+        return self._conn
+
+    def _on_create(self, conn: sqlite3.Connection) -> None:
+        """Appelé une fois à la création de la base"""
+        pass
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            yield self._connect()
+
+    async def _run(self, func, *args, **kwargs):
+        return await run_io(func, *args, **kwargs)
+
+    async def warm_up(self) -> None:
+        """Ouvre la connexion (schéma, WAL) avant la première requête"""
+        def connect() -> None:
+            with self._lock:
+                self._connect()
+        await self._run(connect)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,64 @@
+from typing import Optional, Tuple
+import os
+import re
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+from app.core.storage import shard_prefix
+
+# Nom d'un fichier adressé par contenu : <sha256>.<extension>
+_CONTENT_ADDRESSED_RE = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]+$")
+
+
+class ShardedStaticFiles(StaticFiles):
+    """
+    Fichiers statiques du dossier uploads avec résolution transparente de la
+    répartition en sous-dossiers : /uploads/cv/<nom> et /uploads/cv/ab/cd/<nom>
+    servent le même fichier, qu'il soit déjà migré ou encore à plat
+    Les fichiers adressés par contenu sont immuables : leur empreinte sert
+    d'ETag fort et ils peuvent être conservés indéfiniment par le client
+    """
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is not None:
+            return full_path, stat_result
+
+        parts = path.replace("\\", "/").strip("/").split("/")
+        if len(parts) < 2:
+            return full_path, stat_result
+
+        folder, filename = parts[0], parts[-1]
+        sharded = "/".join([folder, *shard_prefix(filename), filename])
+        flat = f"{folder}/{filename}"
+        for candidate in (sharded, flat):
+            if candidate != path.strip("/"):
+                candidate_path, candidate_stat = super().lookup_path(candidate)
+                if candidate_stat is not None:
+                    return candidate_path, candidate_stat
+
+        return full_path, stat_result
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        match = _CONTENT_ADDRESSED_RE.match(os.path.basename(full_path))
+        if match:
+            response.headers["etag"] = f'"{match.group(1)}"'
+            response.headers["cache-control"] = "private, max-age=31536000, immutable"
+        else:
+            response.headers["cache-control"] = "private, no-cache"
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -1,88 +1,551 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+from datetime import datetime, timezone
+from urllib.parse import quote
+import asyncio
+import base64
+import hashlib
+import logging
+import tempfile
+import time
 import uuid
 import json
 import os
 import aiofiles
-from azure.storage.blob.aio import BlobServiceClient
+import aiohttp
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob import BlobBlock
+from azure.storage.blob.aio import BlobServiceClient, ContainerClient
+from app.core.blob_cache import BlobCache
 from app.core.config import settings
+from app.core.index import UploadIndex
+from app.core.io_pool import io_executor, run_io
+from app.core.metadata_log import SegmentedLog
+from app.core.metrics import (
+    DUPLICATE_CANDIDATES, STORAGE_CACHE_REQUESTS, STORAGE_DEDUPLICATED, STORAGE_IN_FLIGHT,
+    STORAGE_WRITTEN_BYTES, time_stage
+)
+
+logger = logging.getLogger(__name__)
 
 class StorageBackend(ABC):
     """Interface abstraite pour les backends de stockage"""
     
+    @property
+    def name(self) -> str:
+        """Nom du backend enregistré avec chaque upload (compteurs par backend)"""
+        return self.__class__.__name__
+    
     @abstractmethod
     async def save_file(self, file_content: bytes, filename: str, folder: str) -> str:
         """Sauvegarde un fichier et retourne l'URL/chemin"""
         pass
     
+    @abstractmethod
+    async def save_stream(self, chunks: AsyncIterator[bytes], filename: str, folder: str) -> str:
+        """Sauvegarde un fichier reçu par blocs et retourne l'URL/chemin"""
+        pass
+    
+    @abstractmethod
+    async def save_content_addressed(
+        self, chunks: AsyncIterator[bytes], folder: str, extension: str,
+        claim: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Sauvegarde un contenu sous le nom de son empreinte SHA-256
+        Un contenu déjà présent n'est pas réécrit. `claim` est appelé avec
+        l'empreinte avant de vérifier sa présence (réservation contre une
+        suppression concurrente par la purge de rétention)
+        Retourne {"sha256", "filename", "path", "size", "created"}
+        """
+        pass
+    
     @abstractmethod
     async def save_json(self, data: Dict[str, Any], filename: str, folder: str) -> str:
         """Sauvegarde des données JSON"""
         pass
     
+    @abstractmethod
+    async def read_json(self, filename: str, folder: str) -> Optional[Dict[str, Any]]:
+        """Relit des données JSON sauvegardées, None si absentes"""
+        pass
+    
+    @abstractmethod
+    async def get_file_size(self, filename: str, folder: str) -> Optional[int]:
+        """Taille d'un fichier en octets, None s'il n'existe pas"""
+        pass
+    
+    @abstractmethod
+    def stream_range(self, filename: str, folder: str, offset: int, length: int) -> AsyncIterator[bytes]:
+        """Lit `length` octets à partir de `offset`, bloc par bloc"""
+        pass
+    
+    @abstractmethod
+    async def delete_file(self, filename: str, folder: str) -> None:
+        """Supprime un fichier s'il existe"""
+        pass
+    
+    async def delete_files(self, filenames: List[str], folder: str) -> List[str]:
+        """
+        Supprime un lot de fichiers, RETENTION_DELETE_CONCURRENCY à la fois
+        Retourne les fichiers supprimés (ou déjà absents) ; les échecs sont journalisés
+        """
+        semaphore = asyncio.Semaphore(settings.RETENTION_DELETE_CONCURRENCY)
+        
+        async def delete(filename: str) -> Optional[str]:
+            async with semaphore:
+                try:
+                    await self.delete_file(filename, folder)
+                    return filename
+                except Exception:
+                    logger.exception("Échec de la suppression de %s/%s", folder, filename)
+                    return None
+        
+        results = await asyncio.gather(*(delete(filename) for filename in filenames))
+        return [filename for filename in results if filename is not None]
+    
     @abstractmethod
     async def get_file_url(self, filename: str, folder: str) -> str:
         """Retourne l'URL publique du fichier"""
         pass
+    
+    def get_local_path(self, filename: str, folder: str) -> Optional[str]:
+        """Chemin local du fichier s'il est accessible sur disque, sinon None"""
+        return None
+    
+    async def fetch_local_path(self, filename: str, folder: str) -> Optional[str]:
+        """Chemin local du fichier, copié sur disque au besoin (None si impossible)"""
+        return await run_io(self.get_local_path, filename, folder)
+    
+    @asynccontextmanager
+    async def local_file(self, filename: str, folder: str) -> AsyncIterator[Optional[str]]:
+        """Chemin local du fichier, lisible jusqu'à la fin du bloc (None si impossible)"""
+        yield await self.fetch_local_path(filename, folder)
+    
+    def pin_local_path(self, filename: str, folder: str) -> Optional[str]:
+        """
+        Chemin local du fichier s'il est déjà sur disque (sans téléchargement),
+        lisible jusqu'à release_local_path
+        """
+        return self.get_local_path(filename, folder)
+    
+    def release_local_path(self, path: str) -> None:
+        """Libère un chemin obtenu par pin_local_path"""
+        pass
+    
+    async def open(self) -> None:
+        """Initialise les ressources du backend (appelé au démarrage de l'application)"""
+        pass
+    
+    async def close(self) -> None:
+        """Libère les ressources du backend (appelé à l'arrêt de l'application)"""
+        pass
+
+
+def shard_prefix(filename: str) -> List[str]:
+    """
+    Sous-dossiers de répartition d'un fichier (ex: "ab/cd" pour "abcdef.pdf")
+    STORAGE_SHARD_DEPTH niveaux de STORAGE_SHARD_WIDTH caractères, 0 = à plat
+    """
+    width = settings.STORAGE_SHARD_WIDTH
+    stem = filename.split('.', 1)[0]
+    if len(stem) < settings.STORAGE_SHARD_DEPTH * width:
+        return []
+    return [stem[level * width:(level + 1) * width] for level in range(settings.STORAGE_SHARD_DEPTH)]
+
+
+async def stream_file_range(file_path: str, offset: int, length: int) -> AsyncIterator[bytes]:
+    """Lecture d'une plage d'octets d'un fichier local, bloc par bloc"""
+    async with aiofiles.open(file_path, 'rb', executor=io_executor()) as f:
+        await f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(settings.DOWNLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
 
 
 class LocalStorageBackend(StorageBackend):
-    """Backend de stockage local"""
+    """
+    Backend de stockage local
+    Les fichiers sont répartis en sous-dossiers selon le préfixe de leur nom
+    (uploads/cv/ab/cd/abcd....pdf) ; les fichiers encore à plat restent lisibles
+    Les appels système passent par le pool d'E/S, jamais par la boucle d'événements
+    """
+    
+    # Dossiers déjà créés par ce processus, au-delà : cache vidé
+    MAX_KNOWN_DIRS = 200_000
+    
+    def __init__(self):
+        self._known_dirs: Set[str] = set()
+    
+    def _ensure_dir(self, folder_path: str) -> str:
+        # os.makedirs une seule fois par dossier et non à chaque écriture
+        if folder_path not in self._known_dirs:
+            os.makedirs(folder_path, exist_ok=True)
+            if len(self._known_dirs) >= self.MAX_KNOWN_DIRS:
+                self._known_dirs.clear()
+            self._known_dirs.add(folder_path)
+        return folder_path
+    
+    async def _ensure_dir_async(self, folder_path: str) -> str:
+        if folder_path not in self._known_dirs:
+            await run_io(self._ensure_dir, folder_path)
+        return folder_path
+    
+    def _folder_path(self, filename: str, folder: str) -> str:
+        return self._ensure_dir(os.path.join(settings.UPLOAD_DIR, folder, *shard_prefix(filename)))
+    
+    def _file_path(self, filename: str, folder: str) -> str:
+        return os.path.join(self._folder_path(filename, folder), filename)
+    
+    async def _file_path_async(self, filename: str, folder: str) -> str:
+        folder_path = os.path.join(settings.UPLOAD_DIR, folder, *shard_prefix(filename))
+        return os.path.join(await self._ensure_dir_async(folder_path), filename)
+    
+    def resolve_path(self, filename: str, folder: str) -> Optional[str]:
+        """Chemin effectif d'un fichier : emplacement réparti puis ancien emplacement à plat"""
+        sharded_path = os.path.join(settings.UPLOAD_DIR, folder, *shard_prefix(filename), filename)
+        if os.path.exists(sharded_path):
+            return sharded_path
+        
+        flat_path = os.path.join(settings.UPLOAD_DIR, folder, filename)
+        if os.path.exists(flat_path):
+            return flat_path
+        return None
+    
+    def get_local_path(self, filename: str, folder: str) -> Optional[str]:
+        return self.resolve_path(filename, folder)
     
     async def save_file(self, file_content: bytes, filename: str, folder: str) -> str:
         """Sauvegarde un fichier localement"""
-        folder_path = os.path.join(settings.UPLOAD_DIR, folder)
-        os.makedirs(folder_path, exist_ok=True)
-        
-        file_path = os.path.join(folder_path, filename)
+        file_path = await self._file_path_async(filename, folder)
         
-        async with aiofiles.open(file_path, 'wb') as f:
+        async with aiofiles.open(file_path, 'wb', executor=io_executor()) as f:
             await f.write(file_content)
         
         return file_path
     
+    async def save_stream(self, chunks: AsyncIterator[bytes], filename: str, folder: str) -> str:
+        """Sauvegarde un fichier localement bloc par bloc"""
+        file_path = await self._file_path_async(filename, folder)
+        # Écriture dans un fichier temporaire pour ne jamais exposer un fichier partiel
+        temp_path = f"{file_path}.part"
+        
+        try:
+            async with aiofiles.open(temp_path, 'wb', executor=io_executor()) as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+            await run_io(os.replace, temp_path, file_path)
+        except BaseException:
+            await run_io(BlobCache._remove, temp_path)
+            raise
+        
+        return file_path
+    
+    async def save_content_addressed(
+        self, chunks: AsyncIterator[bytes], folder: str, extension: str,
+        claim: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Sauvegarde locale adressée par contenu (hash calculé pendant l'écriture)"""
+        folder_path = await self._ensure_dir_async(os.path.join(settings.UPLOAD_DIR, folder))
+        
+        temp_path = os.path.join(folder_path, f".{uuid.uuid4()}.part")
+        digest = hashlib.sha256()
+        size = 0
+        
+        try:
+            async with aiofiles.open(temp_path, 'wb', executor=io_executor()) as f:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await f.write(chunk)
+            
+            sha256 = digest.hexdigest()
+            filename = f"{sha256}{extension}"
+            if claim is not None:
+                await claim(sha256)
+            file_path, created = await run_io(self._commit_content_addressed, temp_path, filename, folder)
+        except BaseException:
+            await run_io(BlobCache._remove, temp_path)
+            raise
+        
+        return {
+            "sha256": sha256,
+            "filename": filename,
+            "path": file_path,
+            "size": size,
+            "created": created
+        }
+    
+    def _commit_content_addressed(self, temp_path: str, filename: str, folder: str) -> Tuple[str, bool]:
+        """Renomme le fichier temporaire sous son empreinte, sauf contenu déjà stocké"""
+        file_path = self.resolve_path(filename, folder)
+        if file_path is not None:
+            os.remove(temp_path)
+            return file_path, False
+        
+        file_path = self._file_path(filename, folder)
+        os.replace(temp_path, file_path)
+        return file_path, True
+    
     async def save_json(self, data: Dict[str, Any], filename: str, folder: str) -> str:
         """Sauvegarde des données JSON localement"""
-        folder_path = os.path.join(settings.UPLOAD_DIR, folder)
-        os.makedirs(folder_path, exist_ok=True)
+        file_path = await self._file_path_async(filename, folder)
         
-        file_path = os.path.join(folder_path, filename)
-        
-        async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+        async with aiofiles.open(file_path, 'w', encoding='utf-8', executor=io_executor()) as f:
             await f.write(json.dumps(data, indent=2, ensure_ascii=False))
         
         return file_path
     
+    async def read_json(self, filename: str, folder: str) -> Optional[Dict[str, Any]]:
+        """Relit des données JSON locales"""
+        file_path = await run_io(self.resolve_path, filename, folder)
+        if file_path is None:
+            return None
+        
+        async with aiofiles.open(file_path, 'r', encoding='utf-8', executor=io_executor()) as f:
+            return json.loads(await f.read())
+    
+    def _file_size(self, filename: str, folder: str) -> Optional[int]:
+        file_path = self.resolve_path(filename, folder)
+        return os.path.getsize(file_path) if file_path is not None else None
+    
+    async def get_file_size(self, filename: str, folder: str) -> Optional[int]:
+        return await run_io(self._file_size, filename, folder)
+    
+    async def stream_range(self, filename: str, folder: str, offset: int, length: int) -> AsyncIterator[bytes]:
+        """Lecture locale d'une plage d'octets"""
+        file_path = await run_io(self.resolve_path, filename, folder)
+        if file_path is None:
+            raise FileNotFoundError(filename)
+        
+        async for chunk in stream_file_range(file_path, offset, length):
+            yield chunk
+    
+    async def delete_file(self, filename: str, folder: str) -> None:
+        """Supprime un fichier local"""
+        file_path = await run_io(self.resolve_path, filename, folder)
+        if file_path is not None:
+            await run_io(os.remove, file_path)
+    
     async def get_file_url(self, filename: str, folder: str) -> str:
         """Retourne l'URL locale du fichier"""
-        return f"/uploads/{folder}/{filename}"
+        return "/".join(["/uploads", folder, *shard_prefix(filename), filename])
+    
+    def migrate_flat_files(self, folder: str, batch_size: int = 1000, pause: float = 0.0) -> Iterator[int]:
+        """
+        Déplace par lots les fichiers encore à plat vers leur sous-dossier de répartition
+        Migration en ligne : les lectures résolvent les deux emplacements pendant
+        le déplacement. Produit le nombre de fichiers déplacés après chaque lot
+        """
+        folder_path = os.path.join(settings.UPLOAD_DIR, folder)
+        if settings.STORAGE_SHARD_DEPTH <= 0 or not os.path.isdir(folder_path):
+            return
+        
+        while True:
+            batch = []
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    # Les fichiers temporaires (.xxx.part) sont ignorés
+                    if entry.name.startswith('.') or entry.name.endswith('.part') or not entry.is_file():
+                        continue
+                    if not shard_prefix(entry.name):
+                        continue
+                    batch.append(entry.name)
+                    if len(batch) >= batch_size:
+                        break
+            
+            if not batch:
+                return
+            
+            for filename in batch:
+                target_path = self._file_path(filename, folder)
+                # os.replace est atomique sur un même système de fichiers
+                os.replace(os.path.join(folder_path, filename), target_path)
+            
+            yield len(batch)
+            if pause:
+                time.sleep(pause)
 
 
 class AzureBlobStorageBackend(StorageBackend):
-    """Backend de stockage Azure Blob"""
+    """
+    Backend de stockage Azure Blob
+    Le client et sa session HTTP (pool de connexions) sont ouverts au démarrage
+    de l'application et fermés à son arrêt
+    """
     
     def __init__(self):
-        if settings.AZURE_STORAGE_CONNECTION_STRING:
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.blob_service_client: Optional[BlobServiceClient] = None
+        self.container_client: Optional[ContainerClient] = None
+        self._open_lock = asyncio.Lock()
+    
+    async def open(self) -> None:
+        """Ouvre la session HTTP partagée et le client du container"""
+        async with self._open_lock:
+            if self.container_client is not None or not settings.AZURE_STORAGE_CONNECTION_STRING:
+                return
+            
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=settings.AZURE_MAX_CONNECTIONS,
+                    keepalive_timeout=settings.AZURE_KEEPALIVE_TIMEOUT
+                )
+            )
             self.blob_service_client = BlobServiceClient.from_connection_string(
-                settings.AZURE_STORAGE_CONNECTION_STRING
+                settings.AZURE_STORAGE_CONNECTION_STRING,
+                transport=AioHttpTransport(session=self._session, session_owner=False),
+                max_single_put_size=settings.AZURE_MAX_SINGLE_PUT_SIZE,
+                max_block_size=settings.AZURE_BLOCK_SIZE,
+                # Téléchargements par blocs : premiers octets relayés sans attendre tout le blob
+                max_single_get_size=settings.DOWNLOAD_CHUNK_SIZE,
+                max_chunk_get_size=settings.DOWNLOAD_CHUNK_SIZE
             )
-        else:
+            container_client = self.blob_service_client.get_container_client(
+                settings.AZURE_CONTAINER_NAME
+            )
+            
+            if settings.AZURE_CREATE_CONTAINER:
+                try:
+                    await container_client.create_container()
+                except ResourceExistsError:
+                    pass
+            
+            self.container_client = container_client
+    
+    async def close(self) -> None:
+        """Ferme le client et la session HTTP"""
+        async with self._open_lock:
+            if self.blob_service_client is not None:
+                await self.blob_service_client.close()
+            if self._session is not None:
+                await self._session.close()
+            self._session = None
             self.blob_service_client = None
+            self.container_client = None
+    
+    async def _get_container_client(self) -> ContainerClient:
+        if self.container_client is None:
+            await self.open()
+        if self.container_client is None:
+            raise ValueError("Azure Storage not configured")
+        return self.container_client
     
     async def save_file(self, file_content: bytes, filename: str, folder: str) -> str:
         """Sauvegarde un fichier sur Azure Blob"""
-        if not self.blob_service_client:
-            raise ValueError("Azure Storage not configured")
+        container_client = await self._get_container_client()
+        blob_client = container_client.get_blob_client(f"{folder}/{filename}")
         
-        blob_name = f"{folder}/{filename}"
-        blob_client = self.blob_service_client.get_blob_client(
-            container=settings.AZURE_CONTAINER_NAME,
-            blob=blob_name
+        # Au-delà de AZURE_MAX_SINGLE_PUT_SIZE, le SDK envoie des blocs en parallèle
+        await blob_client.upload_blob(
+            file_content,
+            overwrite=True,
+            max_concurrency=settings.AZURE_UPLOAD_CONCURRENCY
         )
+        return blob_client.url
+    
+    async def save_stream(self, chunks: AsyncIterator[bytes], filename: str, folder: str) -> str:
+        """
+        Sauvegarde un fichier sur Azure Blob bloc par bloc
+        Les petits fichiers partent en un seul appel, les gros en blocs
+        envoyés en parallèle (stage_block) puis validés (commit_block_list)
+        """
+        container_client = await self._get_container_client()
+        blob_client = container_client.get_blob_client(f"{folder}/{filename}")
+        block_size = settings.AZURE_BLOCK_SIZE
         
-        await blob_client.upload_blob(file_content, overwrite=True)
+        buffer = bytearray()
+        block_ids: List[str] = []
+        in_flight: Set[asyncio.Task] = set()
+        
+        async def wait_for_slot(limit: int) -> None:
+            while len(in_flight) > limit:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                in_flight.difference_update(done)
+                for task in done:
+                    task.result()
+        
+        def stage(data: bytes) -> None:
+            block_id = base64.b64encode(f"{len(block_ids):08d}".encode()).decode()
+            block_ids.append(block_id)
+            in_flight.add(asyncio.create_task(blob_client.stage_block(block_id, data)))
+        
+        try:
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                while len(buffer) >= block_size and (block_ids or len(buffer) > settings.AZURE_MAX_SINGLE_PUT_SIZE):
+                    stage(bytes(buffer[:block_size]))
+                    del buffer[:block_size]
+                    # Mémoire bornée : au plus AZURE_UPLOAD_CONCURRENCY blocs en vol
+                    await wait_for_slot(settings.AZURE_UPLOAD_CONCURRENCY - 1)
+            
+            if not block_ids:
+                await blob_client.upload_blob(bytes(buffer), overwrite=True)
+                return blob_client.url
+            
+            if buffer:
+                stage(bytes(buffer))
+            await wait_for_slot(0)
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            raise
+        
+        await blob_client.commit_block_list([BlobBlock(block_id=block_id) for block_id in block_ids])
         return blob_client.url
     
+    async def save_content_addressed(
+        self, chunks: AsyncIterator[bytes], folder: str, extension: str,
+        claim: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Sauvegarde Azure adressée par contenu
+        Le flux est d'abord copié dans un fichier temporaire local (mémoire bornée)
+        pour calculer l'empreinte : un contenu déjà présent ne coûte aucune écriture distante
+        """
+        container_client = await self._get_container_client()
+        digest = hashlib.sha256()
+        size = 0
+        
+        with tempfile.SpooledTemporaryFile(max_size=settings.AZURE_MAX_SINGLE_PUT_SIZE) as spool:
+            async for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                await run_io(spool.write, chunk)
+            
+            sha256 = digest.hexdigest()
+            filename = f"{sha256}{extension}"
+            blob_client = container_client.get_blob_client(f"{folder}/{filename}")
+            
+            if claim is not None:
+                await claim(sha256)
+            created = not await blob_client.exists()
+            if created:
+                await run_io(spool.seek, 0)
+                
+                async def spooled_chunks() -> AsyncIterator[bytes]:
+                    while True:
+                        chunk = await run_io(spool.read, settings.UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        yield chunk
+                
+                await self.save_stream(spooled_chunks(), filename, folder)
+        
+        return {
+            "sha256": sha256,
+            "filename": filename,
+            "path": blob_client.url,
+            "size": size,
+            "created": created
+        }
+    
     async def save_json(self, data: Dict[str, Any], filename: str, folder: str) -> str:
         """Sauvegarde des données JSON sur Azure Blob"""
         json_content = json.dumps(data, indent=2, ensure_ascii=False)
@@ -90,20 +553,510 @@ class AzureBlobStorageBackend(StorageBackend):
         
         return await self.save_file(json_bytes, filename, folder)
     
+    async def read_json(self, filename: str, folder: str) -> Optional[Dict[str, Any]]:
+        """Relit des données JSON depuis Azure Blob"""
+        container_client = await self._get_container_client()
+        try:
+            downloader = await container_client.download_blob(f"{folder}/{filename}")
+        except ResourceNotFoundError:
+            return None
+        return json.loads(await downloader.readall())
+    
+    async def get_file_size(self, filename: str, folder: str) -> Optional[int]:
+        container_client = await self._get_container_client()
+        try:
+            properties = await container_client.get_blob_client(f"{folder}/{filename}").get_blob_properties()
+        except ResourceNotFoundError:
+            return None
+        return properties.size
+    
+    async def stream_range(self, filename: str, folder: str, offset: int, length: int) -> AsyncIterator[bytes]:
+        """
+        Téléchargement d'une plage du blob, relayé bloc par bloc
+        Les premiers octets sont transmis dès leur réception
+        """
+        container_client = await self._get_container_client()
+        downloader = await container_client.download_blob(
+            f"{folder}/{filename}", offset=offset, length=length
+        )
+        async for chunk in downloader.chunks():
+            yield chunk
+    
+    async def delete_file(self, filename: str, folder: str) -> None:
+        """Supprime un blob (sans erreur s'il n'existe pas)"""
+        container_client = await self._get_container_client()
+        try:
+            await container_client.delete_blob(f"{folder}/{filename}")
+        except ResourceNotFoundError:
+            pass
+    
+    async def delete_files(self, filenames: List[str], folder: str) -> List[str]:
+        """Supprime les blobs par requêtes batch (AZURE_DELETE_BATCH_SIZE blobs par requête)"""
+        container_client = await self._get_container_client()
+        deleted = []
+        batch_size = min(settings.AZURE_DELETE_BATCH_SIZE, 256)  # Maximum d'un batch Azure
+        for start in range(0, len(filenames), batch_size):
+            batch = filenames[start:start + batch_size]
+            try:
+                responses = await container_client.delete_blobs(
+                    *(f"{folder}/{filename}" for filename in batch), raise_on_any_failure=False
+                )
+                statuses = [response.status_code async for response in responses]
+            except Exception:
+                logger.exception("Échec de la suppression par lot dans %s", folder)
+                continue
+            for filename, status in zip(batch, statuses):
+                # 404 : blob déjà absent
+                if status in (202, 404):
+                    deleted.append(filename)
+                else:
+                    logger.warning("Suppression de %s/%s refusée (HTTP %s)", folder, filename, status)
+        return deleted
+    
     async def get_file_url(self, filename: str, folder: str) -> str:
         """Retourne l'URL Azure Blob du fichier"""
-        blob_name = f"{folder}/{filename}"
-        blob_client = self.blob_service_client.get_blob_client(
-            container=settings.AZURE_CONTAINER_NAME,
-            blob=blob_name
+        container_client = await self._get_container_client()
+        return f"{container_client.url}/{quote(f'{folder}/{filename}')}"
+
+
+class LogStructuredStorageBackend(LocalStorageBackend):
+    """
+    Backend local dont les données JSON sont ajoutées à un journal segmenté
+    Chaque dossier (data, extraction, ...) a son journal sous LOG_STORAGE_DIR :
+    une sauvegarde est un ajout séquentiel d'un enregistrement compact, les ajouts
+    concurrents sont regroupés en une écriture et un fsync. Les CV restent des
+    fichiers (LocalStorageBackend)
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._logs: Dict[str, SegmentedLog] = {}
+        self._pending: List[Tuple[str, str, Optional[Dict[str, Any]], asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._compactor: Optional[asyncio.Task] = None
+    
+    @staticmethod
+    def is_logged(filename: str) -> bool:
+        """Les fichiers JSON sont stockés dans le journal"""
+        return filename.endswith(".json")
+    
+    def _log(self, folder: str) -> SegmentedLog:
+        log = self._logs.get(folder)
+        if log is None:
+            log = SegmentedLog(os.path.join(settings.LOG_STORAGE_DIR, folder), settings.LOG_SEGMENT_SIZE)
+            self._logs[folder] = log
+        return log
+    
+    async def open(self) -> None:
+        self._ensure_flusher()
+        if self._compactor is None and settings.LOG_COMPACTION_INTERVAL > 0:
+            self._compactor = asyncio.create_task(self._compaction_loop())
+    
+    async def close(self) -> None:
+        for task in (self._compactor, self._flusher):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._compactor = self._flusher = None
+        
+        # Écritures encore en attente
+        if self._pending:
+            batch, self._pending = self._pending, []
+            await self._write_batch(batch)
+        for log in self._logs.values():
+            log.close()
+    
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+    
+    async def _append(self, folder: str, filename: str, data: Optional[Dict[str, Any]]) -> None:
+        self._ensure_flusher()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((folder, filename, data, future))
+        self._wakeup.set()
+        await future
+    
+    async def _flush_loop(self) -> None:
+        """
+        Validation groupée : pendant qu'un lot est écrit et synchronisé,
+        les nouveaux ajouts s'accumulent et forment le lot suivant
+        """
+        while True:
+            await self._wakeup.wait()
+            if settings.LOG_GROUP_COMMIT_DELAY > 0:
+                await asyncio.sleep(settings.LOG_GROUP_COMMIT_DELAY)
+            self._wakeup.clear()
+            batch, self._pending = self._pending, []
+            if batch:
+                await self._write_batch(batch)
+    
+    async def _write_batch(self, batch: List[Tuple[str, str, Optional[Dict[str, Any]], asyncio.Future]]) -> None:
+        by_folder: Dict[str, List] = {}
+        for item in batch:
+            by_folder.setdefault(item[0], []).append(item)
+        
+        for folder, items in by_folder.items():
+            try:
+                await run_io(self._log(folder).append_batch, [(filename, data) for _, filename, data, _ in items])
+            except Exception as e:
+                for *_, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for *_, future in items:
+                if not future.done():
+                    future.set_result(None)
+    
+    async def _compaction_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(settings.LOG_COMPACTION_INTERVAL)
+            for folder in self.log_folders():
+                log = self._log(folder)
+                if log.sealed_segment_count() < settings.LOG_COMPACTION_MIN_SEGMENTS:
+                    continue
+                try:
+                    result = await loop.run_in_executor(None, log.compact, settings.LOG_COMPACTION_MIN_SEGMENTS)
+                    logger.info("Compaction du journal %s : %s", folder, result)
+                except Exception:
+                    logger.exception("Échec de la compaction du journal %s", folder)
+    
+    def log_folders(self) -> List[str]:
+        """Dossiers ayant un journal sur disque"""
+        if not os.path.isdir(settings.LOG_STORAGE_DIR):
+            return []
+        return sorted(
+            entry.name for entry in os.scandir(settings.LOG_STORAGE_DIR) if entry.is_dir()
         )
-        return blob_client.url
+    
+    def iter_json(self, folder: str) -> Iterator[Dict[str, Any]]:
+        """Parcourt les dernières versions des données JSON d'un dossier"""
+        for _, data in self._log(folder).iter_records():
+            yield data
+    
+    def compact_sync(self, folder: str, min_segments: int = 2) -> Dict[str, int]:
+        return self._log(folder).compact(min_segments)
+    
+    async def save_json(self, data: Dict[str, Any], filename: str, folder: str) -> str:
+        """Ajoute les données JSON au journal du dossier (durables au retour)"""
+        await self._append(folder, filename, data)
+        return f"log://{folder}/{filename}"
+    
+    async def read_json(self, filename: str, folder: str) -> Optional[Dict[str, Any]]:
+        if not self.is_logged(filename):
+            return await super().read_json(filename, folder)
+        return await run_io(self._log(folder).read, filename)
+    
+    async def delete_file(self, filename: str, folder: str) -> None:
+        if self.is_logged(filename):
+            # Suppression : enregistrement de suppression, purgé à la compaction
+            await self._append(folder, filename, None)
+        else:
+            await super().delete_file(filename, folder)
+    
+    async def get_file_url(self, filename: str, folder: str) -> str:
+        if self.is_logged(filename):
+            return f"log://{folder}/{filename}"
+        return await super().get_file_url(filename, folder)
+
+
+class TieredStorageBackend(StorageBackend):
+    """
+    Backend distant (Azure) précédé d'un cache disque local (BlobCache)
+    Les écritures vont au backend distant et, au passage, dans le cache : un
+    upload récent est relu sans téléchargement. Un fichier absent du cache est
+    téléchargé une fois puis servi depuis le disque ; les lectures simultanées
+    du même fichier attendent ce téléchargement au lieu d'en lancer un autre.
+    Les plages (aperçu des CV) n'attendent pas : relayées depuis le backend
+    distant pendant que le téléchargement se fait en arrière-plan.
+    Un échec du cache n'échoue jamais l'opération : le backend distant répond
+    """
+    
+    def __init__(self, remote: StorageBackend, cache: Optional[BlobCache] = None):
+        self.remote = remote
+        self.cache = cache or BlobCache()
+        # Téléchargements en cours dans ce worker : "dossier/fichier" -> (chemin, taille)
+        self._fills: Dict[str, asyncio.Future] = {}
+        # Mises en cache lancées par les lectures de plages (hors requête)
+        self._background_fills: Set[asyncio.Task] = set()
+    
+    @property
+    def name(self) -> str:
+        return self.remote.name
+    
+    async def open(self) -> None:
+        await self.remote.open()
+        await self.cache.warm_up()
+    
+    async def close(self) -> None:
+        for task in self._background_fills:
+            task.cancel()
+        await asyncio.gather(*self._background_fills, return_exceptions=True)
+        await self.remote.close()
+        self.cache.close()
+    
+    async def _admit(self, filename: str, folder: str, temp_path: str) -> Optional[str]:
+        try:
+            return await self.cache.admit(filename, folder, temp_path)
+        except Exception:
+            logger.warning("Mise en cache de %s/%s impossible", folder, filename, exc_info=True)
+            await run_io(BlobCache._remove, temp_path)
+            return None
+    
+    async def _write_through(
+        self,
+        chunks: AsyncIterator[bytes],
+        folder: str,
+        save: Callable[[AsyncIterator[bytes]], Awaitable[Any]],
+        filename_of: Callable[[Any], str]
+    ) -> Any:
+        """
+        Sauvegarde distante de `chunks`, recopiés au passage dans un fichier du
+        cache ; le fichier est admis dans le cache si la sauvegarde réussit
+        """
+        temp_path = await run_io(self.cache.temp_path)
+        cacheable = True
+        
+        async def tee(f) -> AsyncIterator[bytes]:
+            nonlocal cacheable
+            size = 0
+            async for chunk in chunks:
+                size += len(chunk)
+                if cacheable and size > settings.STORAGE_CACHE_MAX_OBJECT_SIZE:
+                    cacheable = False
+                if cacheable:
+                    await f.write(chunk)
+                yield chunk
+        
+        try:
+            async with aiofiles.open(temp_path, 'wb', executor=io_executor()) as f:
+                result = await save(tee(f))
+        except BaseException:
+            await run_io(BlobCache._remove, temp_path)
+            raise
+        
+        if cacheable:
+            await self._admit(filename_of(result), folder, temp_path)
+        else:
+            await run_io(BlobCache._remove, temp_path)
+        return result
+    
+    async def _write_bytes(self, content: bytes, filename: str, folder: str) -> None:
+        if len(content) > settings.STORAGE_CACHE_MAX_OBJECT_SIZE:
+            return
+        temp_path = await run_io(self.cache.temp_path)
+        async with aiofiles.open(temp_path, 'wb', executor=io_executor()) as f:
+            await f.write(content)
+        await self._admit(filename, folder, temp_path)
+    
+    async def save_file(self, file_content: bytes, filename: str, folder: str) -> str:
+        url = await self.remote.save_file(file_content, filename, folder)
+        await self._write_bytes(file_content, filename, folder)
+        return url
+    
+    async def save_stream(self, chunks: AsyncIterator[bytes], filename: str, folder: str) -> str:
+        return await self._write_through(
+            chunks, folder,
+            lambda tee: self.remote.save_stream(tee, filename, folder),
+            lambda url: filename
+        )
+    
+    async def save_content_addressed(
+        self, chunks: AsyncIterator[bytes], folder: str, extension: str,
+        claim: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        # Nom (empreinte) connu à la fin du flux : admis dans le cache après la sauvegarde
+        return await self._write_through(
+            chunks, folder,
+            lambda tee: self.remote.save_content_addressed(tee, folder, extension, claim),
+            lambda result: result["filename"]
+        )
+    
+    async def save_json(self, data: Dict[str, Any], filename: str, folder: str) -> str:
+        path = await self.remote.save_json(data, filename, folder)
+        await self._write_bytes(json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'), filename, folder)
+        return path
+    
+    async def _local(self, filename: str, folder: str) -> Optional[Tuple[str, int]]:
+        """Chemin et taille du fichier en cache, téléchargé s'il est absent (None : lecture distante)"""
+        try:
+            cached = await self.cache.lookup(filename, folder)
+        except Exception:
+            logger.warning("Cache disque illisible pour %s/%s", folder, filename, exc_info=True)
+            return None
+        if cached is not None:
+            STORAGE_CACHE_REQUESTS.labels(folder=folder, result="hit").inc()
+            return cached
+        
+        key = f"{folder}/{filename}"
+        fill = self._fills.get(key)
+        if fill is not None:
+            STORAGE_CACHE_REQUESTS.labels(folder=folder, result="joined").inc()
+            return await asyncio.shield(fill)
+        
+        fill = asyncio.get_running_loop().create_future()
+        self._fills[key] = fill
+        local = None
+        try:
+            local = await self._fill(filename, folder)
+        except Exception:
+            logger.warning("Téléchargement de %s/%s vers le cache en échec", folder, filename, exc_info=True)
+        finally:
+            del self._fills[key]
+            fill.set_result(local)
+        return local
+    
+    async def _fill(self, filename: str, folder: str) -> Optional[Tuple[str, int]]:
+        size = await self.remote.get_file_size(filename, folder)
+        if size is None:
+            return None
+        if size > settings.STORAGE_CACHE_MAX_OBJECT_SIZE:
+            STORAGE_CACHE_REQUESTS.labels(folder=folder, result="bypass").inc()
+            return None
+        
+        STORAGE_CACHE_REQUESTS.labels(folder=folder, result="miss").inc()
+        temp_path = await run_io(self.cache.temp_path)
+        try:
+            async with aiofiles.open(temp_path, 'wb', executor=io_executor()) as f:
+                async for chunk in self.remote.stream_range(filename, folder, 0, size):
+                    await f.write(chunk)
+        except BaseException:
+            await run_io(BlobCache._remove, temp_path)
+            raise
+        path = await self.cache.admit(filename, folder, temp_path)
+        return (path, size) if path is not None else None
+    
+    async def read_json(self, filename: str, folder: str) -> Optional[Dict[str, Any]]:
+        local = await self._local(filename, folder)
+        if local is not None:
+            try:
+                async with aiofiles.open(local[0], 'r', encoding='utf-8', executor=io_executor()) as f:
+                    return json.loads(await f.read())
+            except FileNotFoundError:
+                # Évincé entre-temps
+                pass
+        return await self.remote.read_json(filename, folder)
+    
+    async def _cached(self, filename: str, folder: str) -> Optional[Tuple[str, int]]:
+        """Chemin et taille du fichier s'il est déjà en cache (sans téléchargement)"""
+        try:
+            cached = await self.cache.lookup(filename, folder)
+        except Exception:
+            logger.warning("Cache disque illisible pour %s/%s", folder, filename, exc_info=True)
+            return None
+        if cached is not None:
+            STORAGE_CACHE_REQUESTS.labels(folder=folder, result="hit").inc()
+        return cached
+    
+    def _fill_in_background(self, filename: str, folder: str) -> None:
+        if f"{folder}/{filename}" in self._fills:
+            return
+        task = asyncio.create_task(self._local(filename, folder))
+        self._background_fills.add(task)
+        task.add_done_callback(self._background_fills.discard)
+    
+    async def get_file_size(self, filename: str, folder: str) -> Optional[int]:
+        # Taille seule : jamais de téléchargement pour la connaître
+        cached = await self._cached(filename, folder)
+        if cached is not None:
+            return cached[1]
+        return await self.remote.get_file_size(filename, folder)
+    
+    async def stream_range(self, filename: str, folder: str, offset: int, length: int) -> AsyncIterator[bytes]:
+        """
+        Plage lue sur disque si le fichier est en cache ; sinon relayée depuis le
+        backend distant (premiers octets sans attendre le fichier complet) pendant
+        que le fichier est mis en cache en arrière-plan
+        """
+        cached = await self._cached(filename, folder)
+        if cached is not None:
+            try:
+                stream = stream_file_range(cached[0], offset, length)
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                return
+            except FileNotFoundError:
+                # Évincé entre-temps : lecture distante
+                cached = None
+            if cached is not None:
+                yield first
+                async for chunk in stream:
+                    yield chunk
+                return
+        
+        self._fill_in_background(filename, folder)
+        async for chunk in self.remote.stream_range(filename, folder, offset, length):
+            yield chunk
+    
+    def get_local_path(self, filename: str, folder: str) -> Optional[str]:
+        """Chemin en cache s'il y est déjà (sans téléchargement : appel synchrone)"""
+        try:
+            cached = self.cache.lookup_sync(filename, folder)
+        except Exception:
+            return None
+        if cached is None:
+            return None
+        STORAGE_CACHE_REQUESTS.labels(folder=folder, result="hit").inc()
+        return cached[0]
+    
+    def pin_local_path(self, filename: str, folder: str) -> Optional[str]:
+        """Copie épinglée du fichier s'il est en cache : une éviction ne la supprime pas"""
+        path = self.get_local_path(filename, folder)
+        if path is None:
+            return None
+        try:
+            return self.cache.pin_sync(path)
+        except OSError:
+            # Évincé entre la recherche et l'épinglage : lecture distante
+            return None
+    
+    def release_local_path(self, path: str) -> None:
+        self.cache.unpin_sync(path)
+    
+    async def fetch_local_path(self, filename: str, folder: str) -> Optional[str]:
+        local = await self._local(filename, folder)
+        return local[0] if local is not None else None
+    
+    @asynccontextmanager
+    async def local_file(self, filename: str, folder: str) -> AsyncIterator[Optional[str]]:
+        """Copie épinglée du fichier en cache : une éviction pendant la lecture ne la supprime pas"""
+        path = await self.fetch_local_path(filename, folder)
+        if path is None:
+            yield None
+            return
+        pinned = await run_io(self.cache.pin_sync, path)
+        try:
+            yield pinned
+        finally:
+            await run_io(self.cache.unpin_sync, pinned)
+    
+    async def delete_file(self, filename: str, folder: str) -> None:
+        await self.remote.delete_file(filename, folder)
+        await self.cache.discard([filename], folder)
+    
+    async def delete_files(self, filenames: List[str], folder: str) -> List[str]:
+        deleted = await self.remote.delete_files(filenames, folder)
+        await self.cache.discard(deleted, folder)
+        return deleted
+    
+    async def get_file_url(self, filename: str, folder: str) -> str:
+        return await self.remote.get_file_url(filename, folder)
 
 
 def get_storage_backend() -> StorageBackend:
     """Factory pour récupérer le backend de stockage configuré"""
     if settings.STORAGE_BACKEND == "azure":
+        if settings.STORAGE_CACHE_MAX_BYTES > 0:
+            return TieredStorageBackend(AzureBlobStorageBackend())
         return AzureBlobStorageBackend()
+    elif settings.STORAGE_BACKEND == "log":
+        return LogStructuredStorageBackend()
     else:
         return LocalStorageBackend()
 
@@ -113,36 +1066,121 @@ class StorageService:
     
     def __init__(self):
         self.backend = get_storage_backend()
+        self.index = UploadIndex()
+        self._upload_listeners: List[Callable[[Dict[str, Any]], Awaitable[None]]] = []
+    
+    def add_upload_listener(self, listener: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        """Enregistre un traitement appelé avec les métadonnées de chaque nouvel upload"""
+        if listener not in self._upload_listeners:
+            self._upload_listeners.append(listener)
     
-    async def save_cv_upload(self, cv_content: bytes, form_data: Dict[str, Any]) -> Dict[str, str]:
+    async def startup(self) -> None:
+        """
+        Ouvre les ressources du backend (lifespan FastAPI)
+        Appelé dans chaque worker : rien n'est ouvert à l'import du module, les
+        connexions (pool HTTP Azure, SQLite, journaux) appartiennent au worker
+        """
+        await self.backend.open()
+    
+    async def warm_up(self) -> None:
+        """Ouvre l'index avant la première requête"""
+        await self.index.warm_up()
+    
+    async def shutdown(self) -> None:
+        """Ferme les ressources du backend et de l'index (lifespan FastAPI)"""
+        await self.backend.close()
+        self.index.close()
+    
+    async def save_cv_upload(
+        self,
+        cv_content: Union[bytes, AsyncIterator[bytes]],
+        form_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
         """
         Sauvegarde un CV et ses données associées
+        Le CV peut être fourni en bytes ou sous forme de flux de blocs,
+        il est stocké une seule fois par contenu (SHA-256)
         Retourne les URLs/chemins des fichiers sauvegardés
         """
+        STORAGE_IN_FLIGHT.inc()
+        try:
+            with time_stage("save_total"):
+                return await self._save_cv_upload(cv_content, form_data)
+        finally:
+            STORAGE_IN_FLIGHT.dec()
+    
+    async def _save_cv_upload(
+        self,
+        cv_content: Union[bytes, AsyncIterator[bytes]],
+        form_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
         upload_id = str(uuid.uuid4())
-        
-        # Noms des fichiers
-        cv_filename = f"{upload_id}.pdf"
         data_filename = f"{upload_id}.json"
+        backend_name = self.backend.name
+        
+        if isinstance(cv_content, bytes):
+            cv_bytes = cv_content
+            
+            async def cv_chunks() -> AsyncIterator[bytes]:
+                yield cv_bytes
+            
+            cv_content = cv_chunks()
         
-        # Sauvegarde du CV
-        cv_path = await self.backend.save_file(cv_content, cv_filename, "cv")
+        # Sauvegarde du CV adressée par son empreinte : un CV déjà reçu
+        # n'est pas réécrit, seules ses métadonnées le sont. L'empreinte est
+        # réservée avant ce choix : la purge ne supprime pas un CV réutilisé
+        with time_stage("storage_cv_write"):
+            cv_blob = await self.backend.save_content_addressed(
+                cv_content, "cv", ".pdf", claim=self.index.claim_cv
+            )
+        cv_filename = cv_blob["filename"]
+        if cv_blob["created"]:
+            STORAGE_WRITTEN_BYTES.labels(backend=backend_name).inc(cv_blob["size"])
+        else:
+            STORAGE_DEDUPLICATED.labels(backend=backend_name).inc()
         
         # Préparation des métadonnées
         metadata = {
             "upload_id": upload_id,
             "form_data": form_data,
             "cv_filename": cv_filename,
-            "upload_timestamp": str(uuid.uuid1().time)
+            "cv_sha256": cv_blob["sha256"],
+            "cv_size": cv_blob["size"],
+            "upload_timestamp": str(uuid.uuid1().time),
+            "created_at": datetime.now(timezone.utc).isoformat()
         }
         
         # Sauvegarde des données JSON
-        data_path = await self.backend.save_json(metadata, data_filename, "data")
+        # En cas d'échec, le CV n'est pas supprimé : il peut être référencé
+        # par un autre upload concurrent du même fichier
+        with time_stage("storage_json_write"):
+            data_path = await self.backend.save_json(metadata, data_filename, "data")
+        
+        # Indexation (métadonnées, compteurs, références du CV, identité du candidat)
+        # dans une seule transaction
+        with time_stage("index_write"):
+            recorded = await self.index.record_upload(metadata, backend_name)
+        if recorded["duplicates"]["matches"]:
+            DUPLICATE_CANDIDATES.inc()
+        
+        # Traitements post-upload : un échec n'invalide pas l'upload déjà sauvegardé
+        with time_stage("listeners"):
+            for listener in self._upload_listeners:
+                try:
+                    await listener(metadata)
+                except Exception:
+                    logger.exception("Échec d'un traitement post-upload pour %s", upload_id)
         
         return {
             "upload_id": upload_id,
             "cv_url": await self.backend.get_file_url(cv_filename, "cv"),
             "data_url": await self.backend.get_file_url(data_filename, "data"),
-            "cv_path": cv_path,
-            "data_path": data_path
+            "cv_path": cv_blob["path"],
+            "data_path": data_path,
+            "cv_size": cv_blob["size"],
+            "cv_sha256": cv_blob["sha256"],
+            "cv_deduplicated": not cv_blob["created"],
+            "cv_refcount": recorded["cv_refcount"],
+            # Soumissions précédentes du même candidat (email ou téléphone identique)
+            "duplicate_of": recorded["duplicates"]
         } 
\ No newline at end of file
@@ -0,0 +1,348 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import fcntl
+import logging
+import os
+import time
+import uuid
+
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+from app.core.io_pool import run_io
+from app.core.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    session_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    content_type TEXT,
+    size INTEGER NOT NULL,
+    received INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_expires_at ON upload_sessions(expires_at);
+"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _expires_at() -> str:
+    return (_now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)).isoformat()
+
+
+def _session_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail="Session d'upload non trouvée ou expirée"
+    )
+
+
+def _session_busy() -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail="Un bloc est déjà en cours d'envoi pour cette session"
+    )
+
+
+class UploadSessionStore(SQLiteStore):
+    """
+    Sessions d'upload reprenables : taille annoncée et octets déjà reçus
+    Partagées entre workers (le fichier d'assemblage est sur disque)
+    """
+
+    SCHEMA = SCHEMA
+
+    def __init__(self, db_path: Optional[str] = None):
+        super().__init__(db_path or settings.UPLOAD_SESSION_DB_PATH)
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        return {
+            "session_id": row["session_id"],
+            "filename": row["filename"],
+            "content_type": row["content_type"],
+            "size": row["size"],
+            "offset": row["received"],
+            "complete": row["received"] == row["size"],
+            "created_at": row["created_at"],
+            "expires_at": row["expires_at"]
+        }
+
+    def create_sync(self, filename: str, size: int, content_type: Optional[str]) -> Dict[str, Any]:
+        session_id = str(uuid.uuid4())
+        with self._transaction() as conn:
+            row = conn.execute(
+                "INSERT INTO upload_sessions (session_id, filename, content_type, size, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) RETURNING *",
+                (session_id, filename, content_type, size, _now().isoformat(), _expires_at())
+            ).fetchone()
+        return self._to_dict(row)
+
+    def get_sync(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Session active (None si inconnue ou expirée)"""
+        with self._reader() as conn:
+            row = conn.execute(
+                "SELECT * FROM upload_sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, _now().isoformat())
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def set_received_sync(self, session_id: str, received: int) -> Optional[Dict[str, Any]]:
+        """Enregistre la progression et prolonge la session"""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "UPDATE upload_sessions SET received = ?, expires_at = ? WHERE session_id = ? RETURNING *",
+                (received, _expires_at(), session_id)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def delete_sync(self, session_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM upload_sessions WHERE session_id = ?", (session_id,))
+
+    def expired_sync(self, limit: int = 1000) -> List[str]:
+        with self._reader() as conn:
+            return [
+                row["session_id"] for row in conn.execute(
+                    "SELECT session_id FROM upload_sessions WHERE expires_at <= ? LIMIT ?",
+                    (_now().isoformat(), limit)
+                )
+            ]
+
+    def exists_sync(self, session_id: str) -> bool:
+        with self._reader() as conn:
+            return conn.execute(
+                "SELECT 1 FROM upload_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone() is not None
+
+    async def create(self, filename: str, size: int, content_type: Optional[str]) -> Dict[str, Any]:
+        return await self._run(self.create_sync, filename, size, content_type)
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.get_sync, session_id)
+
+    async def set_received(self, session_id: str, received: int) -> Optional[Dict[str, Any]]:
+        return await self._run(self.set_received_sync, session_id, received)
+
+    async def delete(self, session_id: str) -> None:
+        await self._run(self.delete_sync, session_id)
+
+    async def expired(self) -> List[str]:
+        return await self._run(self.expired_sync)
+
+    async def exists(self, session_id: str) -> bool:
+        return await self._run(self.exists_sync, session_id)
+
+
+class UploadSessionManager:
+    """
+    Protocole d'upload reprenable pour les gros CV
+    Le client crée une session (taille annoncée), envoie des blocs à un offset
+    donné, peut relire sa progression puis finalise. Les blocs sont assemblés
+    dans un fichier de STATE_DIR ; la validation (FileValidator, formulaire) n'a
+    lieu qu'à la finalisation. Un verrou fcntl sur le fichier empêche deux envois
+    simultanés sur une même session, quel que soit le worker
+    """
+
+    def __init__(self, store: Optional[UploadSessionStore] = None, directory: Optional[str] = None):
+        self.store = store or UploadSessionStore()
+        self.directory = directory or settings.UPLOAD_SESSION_DIR
+        self._task: Optional[asyncio.Task] = None
+
+    def _part_path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.part")
+
+    def _open_locked(self, session_id: str) -> Optional[int]:
+        """Ouvre et verrouille le fichier d'assemblage, None s'il est déjà verrouillé"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(self._part_path(session_id), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    @asynccontextmanager
+    async def _locked(self, session_id: str) -> AsyncIterator[int]:
+        """Descripteur du fichier d'assemblage, verrouillé en exclusivité (409 sinon)"""
+        fd = await run_io(self._open_locked, session_id)
+        if fd is None:
+            raise _session_busy()
+        try:
+            yield fd
+        finally:
+            await run_io(os.close, fd)
+
+    async def create(self, filename: str, size: int, content_type: Optional[str] = None) -> Dict[str, Any]:
+        # Borne la place occupée sur disque ; le contenu est validé à la finalisation
+        if size > settings.MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Fichier trop volumineux. Taille maximale: {settings.MAX_FILE_SIZE / (1024*1024):.1f}MB"
+            )
+        return await self.store.create(filename, size, content_type)
+
+    async def get(self, session_id: str) -> Dict[str, Any]:
+        session = await self.store.get(session_id)
+        if session is None:
+            raise _session_not_found()
+        return session
+
+    async def write_chunk(self, session_id: str, offset: int, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """
+        Écrit un bloc à `offset`, qui doit être la progression courante (409 sinon)
+        Les octets reçus sont conservés même si la connexion est coupée en cours
+        de bloc : le client reprend à l'offset retourné par get()
+        """
+        session = await self.get(session_id)
+
+        async with self._locked(session_id) as fd:
+            # Relue sous verrou : un autre worker a pu écrire entre-temps
+            session = await self.get(session_id)
+            if offset != session["offset"]:
+                raise HTTPException(
+                    status_code=409,
+                    detail={"message": "Offset inattendu", "offset": session["offset"]}
+                )
+
+            # Octets au-delà de la progression enregistrée : reste d'un envoi interrompu
+            await run_io(os.ftruncate, fd, offset)
+
+            limit = min(session["size"] - offset, settings.UPLOAD_SESSION_MAX_CHUNK_SIZE)
+            position = offset
+            buffer = bytearray()
+
+            async def flush() -> None:
+                nonlocal position
+                if buffer:
+                    written = await run_io(os.pwrite, fd, bytes(buffer), position)
+                    position += written
+                    buffer.clear()
+
+            try:
+                async for chunk in chunks:
+                    if position + len(buffer) - offset + len(chunk) > limit:
+                        raise HTTPException(
+                            status_code=413,
+                            detail="Bloc trop volumineux pour la taille annoncée ou la taille de bloc maximale"
+                        )
+                    buffer += chunk
+                    if len(buffer) >= settings.UPLOAD_CHUNK_SIZE:
+                        await flush()
+            finally:
+                # Progression enregistrée après synchronisation sur disque, y compris
+                # pour un bloc interrompu (les octets déjà reçus ne sont pas renvoyés)
+                await flush()
+                if position > offset:
+                    await run_io(os.fdatasync, fd)
+                    session = await self.store.set_received(session_id, position)
+
+        return session
+
+    @asynccontextmanager
+    async def finalizing(self, session_id: str) -> AsyncIterator[UploadFile]:
+        """
+        Fichier assemblé, présenté comme un UploadFile pour la validation et la
+        sauvegarde habituelles. Session et fichier supprimés en cas de succès ;
+        en cas d'échec la session reste ouverte (formulaire corrigé puis nouvel essai)
+        """
+        session = await self.get(session_id)
+        async with self._locked(session_id) as fd:
+            session = await self.get(session_id)
+            if not session["complete"]:
+                raise HTTPException(
+                    status_code=409,
+                    detail={"message": "Upload incomplet", "offset": session["offset"], "size": session["size"]}
+                )
+
+            upload_file = UploadFile(
+                file=await run_io(os.fdopen, os.dup(fd), "rb"),
+                size=session["size"],
+                filename=session["filename"],
+                headers=Headers({"content-type": session["content_type"] or ""})
+            )
+            try:
+                yield upload_file
+            finally:
+                await upload_file.close()
+
+            await self._delete(session_id)
+
+    async def _delete(self, session_id: str) -> None:
+        await self.store.delete(session_id)
+        await run_io(self._remove_part, session_id)
+
+    def _remove_part(self, session_id: str) -> None:
+        try:
+            os.remove(self._part_path(session_id))
+        except FileNotFoundError:
+            pass
+
+    async def abort(self, session_id: str) -> None:
+        await self.get(session_id)
+        async with self._locked(session_id):
+            await self._delete(session_id)
+
+    async def purge_expired(self) -> int:
+        """Supprime les sessions expirées et les fichiers d'assemblage orphelins"""
+        purged = 0
+        for session_id in await self.store.expired():
+            try:
+                async with self._locked(session_id):
+                    await self._delete(session_id)
+                purged += 1
+            except HTTPException:
+                # Bloc ou finalisation en cours : session reprise au prochain passage
+                continue
+
+        # Fichiers sans session (session supprimée par un worker arrêté pendant l'envoi)
+        for session_id in await run_io(self._stale_part_files):
+            if not await self.store.exists(session_id):
+                await run_io(self._remove_part, session_id)
+                purged += 1
+        return purged
+
+    def _stale_part_files(self) -> List[str]:
+        """Sessions des fichiers d'assemblage non modifiés depuis UPLOAD_SESSION_TTL"""
+        if not os.path.isdir(self.directory):
+            return []
+        stale_before = time.time() - settings.UPLOAD_SESSION_TTL
+        with os.scandir(self.directory) as entries:
+            return [
+                entry.name[:-len(".part")] for entry in entries
+                if entry.name.endswith(".part") and entry.stat().st_mtime <= stale_before
+            ]
+
+    async def start(self) -> None:
+        if settings.UPLOAD_SESSION_GC_INTERVAL > 0 and self._task is None:
+            self._task = asyncio.create_task(self._gc_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.store.close()
+
+    async def _gc_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.UPLOAD_SESSION_GC_INTERVAL)
+            try:
+                purged = await self.purge_expired()
+                if purged:
+                    logger.info("Sessions d'upload expirées supprimées : %d", purged)
+            except Exception:
+                logger.exception("Échec du nettoyage des sessions d'upload")
@@ -1,9 +1,9 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator, FrozenSet, Iterable, Tuple
+from functools import lru_cache
 import re
 import os
 from fastapi import HTTPException, UploadFile
 from app.core.config import settings
-import os
 
 class ValidationError(Exception):
     """Exception pour les erreurs de validation"""
@@ -46,43 +46,89 @@ class DynamicFormValidator:
         }
     }
     
+    # Champs reconnus comme consentement RGPD
+    RGPD_FIELDS = (
+        'rgpd_consent', 'consent_rgpd', 'consentement_rgpd', 
+        'gdpr_consent', 'privacy_consent', 'consentement'
+    )
+    
     @classmethod
     def validate_form_data(cls, form_data: Dict[str, Any]) -> List[ValidationError]:
         """
         Valide les données du formulaire de manière générique
         Retourne une liste des erreurs trouvées
         """
-        errors = []
+        return cls.compile_plan(frozenset(form_data)).validate(form_data)
+    
+    @classmethod
+    def validate_many(cls, submissions: Iterable[Dict[str, Any]]) -> List[List[ValidationError]]:
+        """
+        Valide un lot de formulaires (imports en masse)
+        Les soumissions partageant les mêmes champs réutilisent le même plan compilé
+        """
+        return [cls.validate_form_data(form_data) for form_data in submissions]
+    
+    @classmethod
+    @lru_cache(maxsize=256)
+    def compile_plan(cls, field_names: FrozenSet[str]) -> "ValidationPlan":
+        """
+        Compile le plan de validation d'un ensemble de champs
+        Le résultat est mémorisé : la résolution nom de champ -> règles
+        n'est faite qu'une fois par structure de formulaire
+        """
+        return ValidationPlan(
+            cls,
+            {field_name: cls._resolve_rules(field_name) for field_name in field_names}
+        )
+    
+    @classmethod
+    def _compiled_rules(cls) -> Dict[str, "CompiledRule"]:
+        """Règles compilées (regex précompilées), construites une fois par classe"""
+        compiled = cls.__dict__.get('_COMPILED_RULES')
+        if compiled is None:
+            compiled = {key: CompiledRule(rule) for key, rule in cls.VALIDATION_RULES.items()}
+            cls._COMPILED_RULES = compiled
+        return compiled
+    
+    @classmethod
+    def _resolve_rule_items(cls, field_name: str) -> List[Tuple[str, "CompiledRule"]]:
+        """Recherche les règles applicables basées sur le nom du champ"""
+        compiled = cls._compiled_rules()
+        lowered = field_name.lower()
+        applicable_rules = []
         
-        # Validation obligatoire du consentement RGPD
-        if not cls._validate_rgpd_consent(form_data):
-            errors.append(ValidationError(
-                'rgpd_consent', 
-                'Le consentement RGPD est obligatoire et doit être explicitement accepté'
-            ))
+        # Correspondance exacte
+        if field_name in compiled:
+            applicable_rules.append((field_name, compiled[field_name]))
         
-        # Validation des champs selon leur nom/type
-        for field_name, field_value in form_data.items():
-            try:
-                cls._validate_field(field_name, field_value)
-            except ValidationError as e:
-                errors.append(e)
+        # Correspondance partielle pour les champs similaires
+        for rule_key, rule in compiled.items():
+            if rule_key == field_name:
+                continue
+            if rule_key in lowered or lowered in rule_key:
+                applicable_rules.append((rule_key, rule))
         
-        return errors
+        return applicable_rules
+    
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def _resolve_rules(cls, field_name: str) -> Tuple["CompiledRule", ...]:
+        return tuple(rule for _, rule in cls._resolve_rule_items(field_name))
+    
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def rule_keys(cls, field_name: str) -> FrozenSet[str]:
+        """Règles appliquées à un champ ("email", "phone", ...), résolues par son nom"""
+        return frozenset(key for key, _ in cls._resolve_rule_items(field_name))
     
     @classmethod
     def _validate_rgpd_consent(cls, form_data: Dict[str, Any]) -> bool:
         """Validation spécifique du consentement RGPD"""
-        rgpd_fields = [
-            'rgpd_consent', 'consent_rgpd', 'consentement_rgpd', 
-            'gdpr_consent', 'privacy_consent', 'consentement'
-        ]
-        
-        for field in rgpd_fields:
+        for field in cls.RGPD_FIELDS:
             if field in form_data:
                 consent_value = form_data[field]
                 # Le consentement doit être explicitement True
-                if consent_value is True or str(consent_value).lower() in ['true', '1', 'yes', 'oui']:
+                if consent_value is True or str(consent_value).lower() in ('true', '1', 'yes', 'oui'):
                     return True
         
         return False
@@ -90,92 +136,171 @@ class DynamicFormValidator:
     @classmethod
     def _validate_field(cls, field_name: str, field_value: Any) -> None:
         """Valide un champ individuel selon les règles génériques"""
-        # Recherche de règles applicables basées sur le nom du champ
-        applicable_rules = []
-        
-        # Correspondance exacte
-        if field_name in cls.VALIDATION_RULES:
-            applicable_rules.append(cls.VALIDATION_RULES[field_name])
-        
-        # Correspondance partielle pour les champs similaires
-        for rule_key, rule in cls.VALIDATION_RULES.items():
-            if rule_key in field_name.lower() or field_name.lower() in rule_key:
-                applicable_rules.append(rule)
-        
-        # Application des règles trouvées
-        for rule in applicable_rules:
-            cls._apply_validation_rule(field_name, field_value, rule)
+        text = None if field_value is None else str(field_value)
+        for rule in cls._resolve_rules(field_name):
+            rule.apply(field_name, field_value, text)
+
+
+class CompiledRule:
+    """Règle de validation avec regex précompilée"""
     
-    @classmethod
-    def _apply_validation_rule(cls, field_name: str, field_value: Any, rule: Dict[str, Any]) -> None:
-        """Applique une règle de validation spécifique"""
-        # Vérification champ requis
-        if rule.get('required', False) and (field_value is None or str(field_value).strip() == ''):
-            raise ValidationError(field_name, f"Le champ {field_name} est obligatoire")
+    __slots__ = ('required', 'pattern', 'min_length', 'max_length', 'has_expected_value',
+                 'expected_value', 'message')
+    
+    def __init__(self, rule: Dict[str, Any]):
+        self.required = rule.get('required', False)
+        self.pattern = re.compile(rule['pattern']) if 'pattern' in rule else None
+        self.min_length = rule.get('min_length')
+        self.max_length = rule.get('max_length')
+        self.has_expected_value = 'expected_value' in rule
+        self.expected_value = rule.get('expected_value')
+        self.message = rule.get('message')
+    
+    def apply(self, field_name: str, field_value: Any, text: Optional[str]) -> None:
+        """
+        Applique la règle à un champ
+        `text` est la représentation str() de la valeur, calculée une seule fois par champ
+        """
+        is_empty = text is None or text.strip() == ''
         
-        # Si le champ est vide et non requis, pas de validation supplémentaire
-        if field_value is None or str(field_value).strip() == '':
+        # Vérification champ requis
+        if is_empty:
+            if self.required:
+                raise ValidationError(field_name, f"Le champ {field_name} est obligatoire")
+            # Si le champ est vide et non requis, pas de validation supplémentaire
             return
         
         # Validation du pattern regex
-        if 'pattern' in rule:
-            if not re.match(rule['pattern'], str(field_value)):
-                raise ValidationError(field_name, rule.get('message', 'Format invalide'))
+        if self.pattern is not None and not self.pattern.match(text):
+            raise ValidationError(field_name, self.message or 'Format invalide')
         
         # Validation de la longueur minimale
-        if 'min_length' in rule:
-            if len(str(field_value)) < rule['min_length']:
-                raise ValidationError(
-                    field_name, 
-                    f"Minimum {rule['min_length']} caractères requis"
-                )
+        if self.min_length is not None and len(text) < self.min_length:
+            raise ValidationError(field_name, f"Minimum {self.min_length} caractères requis")
         
         # Validation de la longueur maximale
-        if 'max_length' in rule:
-            if len(str(field_value)) > rule['max_length']:
-                raise ValidationError(
-                    field_name, 
-                    f"Maximum {rule['max_length']} caractères autorisés"
-                )
+        if self.max_length is not None and len(text) > self.max_length:
+            raise ValidationError(field_name, f"Maximum {self.max_length} caractères autorisés")
         
         # Validation de valeur attendue
-        if 'expected_value' in rule:
-            if field_value != rule['expected_value']:
-                raise ValidationError(field_name, rule.get('message', 'Valeur invalide'))
+        if self.has_expected_value and field_value != self.expected_value:
+            raise ValidationError(field_name, self.message or 'Valeur invalide')
+
+
+class ValidationPlan:
+    """
+    Plan de validation compilé : règles déjà résolues pour chaque nom de champ
+    Les champs inconnus du plan sont résolus à la volée (cache du validateur)
+    """
+    
+    def __init__(
+        self,
+        validator: type,
+        field_rules: Dict[str, Tuple[CompiledRule, ...]]
+    ):
+        self.validator = validator
+        self.field_rules = field_rules
+    
+    def validate(self, form_data: Dict[str, Any]) -> List[ValidationError]:
+        errors = []
+        
+        # Validation obligatoire du consentement RGPD
+        if not self.validator._validate_rgpd_consent(form_data):
+            errors.append(ValidationError(
+                'rgpd_consent', 
+                'Le consentement RGPD est obligatoire et doit être explicitement accepté'
+            ))
+        
+        # Validation des champs selon leur nom/type
+        field_rules = self.field_rules
+        for field_name, field_value in form_data.items():
+            rules = field_rules.get(field_name)
+            if rules is None:
+                rules = self.validator._resolve_rules(field_name)
+            if not rules:
+                continue
+            
+            text = None if field_value is None else str(field_value)
+            try:
+                for rule in rules:
+                    rule.apply(field_name, field_value, text)
+            except ValidationError as e:
+                errors.append(e)
+        
+        return errors
+
 
 class FileValidator:
     """Validateur pour les fichiers uploadés"""
     
     @classmethod
-    async def validate_cv_file(cls, file: UploadFile) -> None:
-        """Valide un fichier CV uploadé"""
-        # Vérification de la taille
-        content = await file.read()
-        await file.seek(0)  # Reset pour la lecture suivante
-        
-        if len(content) > settings.MAX_FILE_SIZE:
+    def _file_too_large(cls) -> HTTPException:
+        return HTTPException(
+            status_code=413,
+            detail=f"Fichier trop volumineux. Taille maximale: {settings.MAX_FILE_SIZE / (1024*1024):.1f}MB"
+        )
+    
+    @classmethod
+    def validate_cv_metadata(cls, file: UploadFile) -> None:
+        """Vérifications ne nécessitant pas de lire le contenu du fichier"""
+        # Vérification de l'extension
+        if not file.filename or not file.filename.lower().endswith('.pdf'):
             raise HTTPException(
-                status_code=413,
-                detail=f"Fichier trop volumineux. Taille maximale: {settings.MAX_FILE_SIZE / (1024*1024):.1f}MB"
+                status_code=415,
+                detail="Seuls les fichiers PDF sont acceptés"
             )
         
+        # Rejet immédiat si la taille annoncée dépasse déjà la limite
+        if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+            raise cls._file_too_large()
+    
+    @classmethod
+    async def iter_cv_chunks(
+        cls, file: UploadFile, chunk_size: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Lit le CV bloc par bloc en le validant au fil de l'eau
+        Le header PDF est vérifié sur le premier bloc et la taille à chaque bloc,
+        la mémoire utilisée reste donc bornée quelle que soit la taille du fichier
+        """
+        chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
         # Vérification basique du type de fichier (simplifié sans libmagic)
-        # On se base sur l'extension et le content-type pour une démo
-        if not file.content_type or file.content_type not in settings.ALLOWED_FILE_TYPES:
-            # Vérification basique du header PDF
-            if not content.startswith(b'%PDF-'):
+        # On se base sur le content-type, et sinon sur le header PDF
+        check_header = not file.content_type or file.content_type not in settings.ALLOWED_FILE_TYPES
+        total_size = 0
+        
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            
+            if total_size == 0 and check_header and not chunk.startswith(b'%PDF-'):
                 raise HTTPException(
                     status_code=415,
                     detail="Le fichier ne semble pas être un PDF valide"
                 )
+            
+            total_size += len(chunk)
+            if total_size > settings.MAX_FILE_SIZE:
+                raise cls._file_too_large()
+            
+            yield chunk
         
-        # Vérification de l'extension
-        if not file.filename.lower().endswith('.pdf'):
+        if total_size == 0 and check_header:
             raise HTTPException(
                 status_code=415,
-                detail="Seuls les fichiers PDF sont acceptés"
+                detail="Le fichier ne semble pas être un PDF valide"
             )
     
+    @classmethod
+    async def validate_cv_file(cls, file: UploadFile) -> None:
+        """Valide un fichier CV uploadé sans le charger entièrement en mémoire"""
+        cls.validate_cv_metadata(file)
+        
+        async for _ in cls.iter_cv_chunks(file):
+            pass
+        await file.seek(0)  # Reset pour la lecture suivante
+    
     @classmethod
     def validate_filename(cls, filename: str) -> str:
         """Nettoie et valide un nom de fichier"""
@@ -0,0 +1,36 @@
+from typing import Any, Dict
+import asyncio
+import logging
+import time
+
+from app.core.form_config import FORM_FIELDS, get_form_config_payload
+from app.core.validation import DynamicFormValidator
+
+logger = logging.getLogger(__name__)
+
+
+def _sample_form_data() -> Dict[str, Any]:
+    """Formulaire fictif couvrant tous les champs configurés"""
+    return {field["name"]: "" for field in FORM_FIELDS}
+
+
+async def warm_up(*components: Any) -> float:
+    """
+    Prépare un worker avant qu'il n'accepte des requêtes (lifespan) : caches de
+    configuration et de validation, connexions SQLite, matrice de matching,
+    processus d'extraction. Chaque composant expose `warm_up()` ; un échec est
+    journalisé sans empêcher le démarrage. Retourne la durée en secondes
+    """
+    started = time.perf_counter()
+
+    get_form_config_payload()
+    DynamicFormValidator.validate_form_data(_sample_form_data())
+
+    results = await asyncio.gather(*(component.warm_up() for component in components), return_exceptions=True)
+    for component, result in zip(components, results):
+        if isinstance(result, Exception):
+            logger.warning("Préchauffage de %s en échec : %s", component.__class__.__name__, result)
+
+    elapsed = time.perf_counter() - started
+    logger.info("Worker préchauffé en %.0f ms", elapsed * 1000)
+    return elapsed
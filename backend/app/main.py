@@ -1,37 +1,166 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
 
-from app.routers import upload
+from app.routers import export, match, retention, search, upload, upload_sessions
 from app.core.config import settings
+from app.core.idempotency import IdempotencyStore
+from app.core.io_pool import shutdown_io_executor
+from app.core.loop_monitor import EventLoopLagMonitor
+from app.core.metrics import MetricsMiddleware, mark_worker_dead, render_metrics
+from app.core.middleware import (
+    AdmissionControlMiddleware, IdempotencyMiddleware, RateLimitMiddleware, UploadSizeLimitMiddleware
+)
+from app.core.reconcile import IndexReconciler
+from app.core.static_files import ShardedStaticFiles
+from app.core.warmup import warm_up
+
+# Surveillance des blocages de la boucle d'événements (appels bloquants, disque lent)
+loop_monitor = EventLoopLagMonitor()
+
+# Réponses des uploads par clé d'idempotence, partagées entre workers
+idempotency_store = IdempotencyStore()
+
+# Rattrapage des index de recherche et de matching (listeners en échec, nouvel index)
+index_reconciler = IndexReconciler(
+    upload.storage_service.index,
+    upload.extraction_pipeline.queue.get_text_sync,
+    [search.search_index, match.matching_index]
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Ouverture des ressources de stockage (pool HTTP Azure, ...)
+    await upload.storage_service.startup()
+    # Indexation plein texte à chaque upload puis à chaque extraction terminée
+    upload.storage_service.add_upload_listener(search.search_index.on_upload)
+    upload.extraction_pipeline.add_result_listener(search.search_index.on_extraction)
+    # Vecteur de matching créé après l'upload (par lots, hors requête), recalculé avec le texte du CV
+    upload.storage_service.add_upload_listener(match.matching_index.on_upload)
+    upload.extraction_pipeline.add_result_listener(match.matching_index.on_extraction)
+    await match.matching_index.start()
+    await upload.extraction_pipeline.start()
+    await index_reconciler.start()
+    # Purge de rétention : données dérivées retirées avec les uploads expirés
+    retention.retention_purger.add_purge_listener(search.search_index.on_purge)
+    retention.retention_purger.add_purge_listener(upload.extraction_pipeline.on_purge)
+    retention.retention_purger.add_purge_listener(match.matching_index.on_purge)
+    retention.retention_purger.add_purge_listener(upload.outbox_dispatcher.on_purge)
+    await retention.retention_purger.start()
+    # Événements d'upload (outbox) livrés par lots aux services aval
+    upload.storage_service.add_upload_listener(upload.outbox_dispatcher.on_upload)
+    await upload.outbox_dispatcher.start()
+    # Nettoyage périodique des uploads reprenables expirés
+    await upload_sessions.session_manager.start()
+    # Le worker n'accepte des connexions qu'après le lifespan : les premières
+    # requêtes ne paient ni les imports ni l'ouverture des bases
+    if settings.WARM_UP_ON_STARTUP:
+        await warm_up(
+            upload.storage_service,
+            upload.extraction_pipeline,
+            search.search_index,
+            match.matching_index,
+            upload_sessions.session_manager.store,
+            idempotency_store
+        )
+    await loop_monitor.start()
+    yield
+    await index_reconciler.stop()
+    await retention.retention_purger.stop()
+    await upload_sessions.session_manager.stop()
+    await upload.extraction_pipeline.stop()
+    await upload.outbox_dispatcher.stop()
+    await match.matching_index.stop()
+    search.search_index.close()
+    idempotency_store.close()
+    await upload.storage_service.shutdown()
+    await loop_monitor.stop()
+    shutdown_io_executor()
+    mark_worker_dead()
 
 app = FastAPI(
     title="AI Recruiting CV Upload Service",
     description="Microservice for dynamic CV upload with schema-less backend",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Configuration CORS
+# Rejet des uploads trop volumineux avant le parsing multipart
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/api/upload": settings.MAX_FILE_SIZE + settings.MAX_FORM_OVERHEAD,
+        "/api/upload/batch": (settings.MAX_FILE_SIZE + settings.MAX_FORM_OVERHEAD) * settings.BATCH_MAX_ITEMS,
+    }
+)
+
+# Routes d'écriture protégées : uploads directs, par lot et reprenables
+UPLOAD_PATHS = ("/api/upload", "/api/upload-sessions")
+
+# Uploads simultanés bornés : le surplus est rejeté en 503 au lieu d'être mis en file
+app.add_middleware(
+    AdmissionControlMiddleware,
+    paths=UPLOAD_PATHS,
+    max_concurrency=settings.UPLOAD_MAX_CONCURRENCY,
+    queue_timeout=settings.UPLOAD_ADMISSION_TIMEOUT,
+    retry_after=settings.UPLOAD_RETRY_AFTER
+)
+
+# Débit par client, vérifié avant le contrôle d'admission (429)
+app.add_middleware(RateLimitMiddleware, paths=UPLOAD_PATHS)
+
+# Réponses rejouées pour les uploads retentés avec la même clé, avant le contrôle
+# de débit et d'admission : un rejeu ne consomme ni jeton ni place
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths=("/api/upload", "/api/upload/batch"),
+    store=idempotency_store
+)
+
+# Configuration CORS, autour des middlewares qui répondent eux-mêmes : les rejets
+# (413, 429, 503, 409, 422) et les réponses rejouées portent aussi les en-têtes CORS
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # En-têtes lus par pdf.js pour les requêtes Range (/api/uploads/{id}/cv),
+    # et signalement des réponses d'upload rejouées (Idempotency-Key)
+    expose_headers=["Accept-Ranges", "Content-Range", "Content-Length", "ETag", "Idempotent-Replayed"],
+)
+
+# Mesures des uploads (ajouté en dernier : englobe aussi les rejets 413, 429 et 503)
+app.add_middleware(
+    MetricsMiddleware,
+    endpoints={
+        "/api/upload": "upload",
+        "/api/upload/batch": "upload_batch",
+    }
 )
 
 # Montage du dossier uploads pour servir les fichiers statiques
 os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", ShardedStaticFiles(directory="uploads"), name="uploads")
 
 # Routes
 app.include_router(upload.router, prefix="/api")
+app.include_router(upload_sessions.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
+app.include_router(match.router, prefix="/api")
+app.include_router(export.router, prefix="/api")
+app.include_router(retention.router, prefix="/api")
 
 @app.get("/")
 async def root():
     return {"message": "AI Recruiting CV Upload Service is running"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"} 
\ No newline at end of file
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Optional
+
+from app.core.export import EXPORT_FORMATS, iter_export, to_index_date
+from app.routers.upload import storage_service
+
+router = APIRouter()
+
+@router.get("/export/uploads")
+async def export_uploads(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson (métadonnées complètes) ou csv"),
+    created_from: Optional[datetime] = Query(None, description="Date de création minimale (incluse, UTC par défaut)"),
+    created_to: Optional[datetime] = Query(None, description="Date de création maximale (exclue)")
+):
+    """
+    Endpoint d'export en flux des métadonnées des uploads (ingestion ATS)
+    
+    Les uploads sont lus dans l'index par lots et envoyés au fil de l'eau : la
+    mémoire utilisée ne dépend pas du nombre d'uploads, quel que soit le backend
+    de stockage. Une ligne par upload, dans l'ordre de création. Une erreur
+    pendant l'envoi termine le fichier par une ligne d'erreur (voir iter_export)
+    """
+    stream = iter_export(
+        storage_service.index, format, to_index_date(created_from), to_index_date(created_to)
+    )
+    filename = f"uploads-{datetime.now().strftime('%Y%m%dT%H%M%S')}.{format}"
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store"
+        }
+    )
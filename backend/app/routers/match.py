@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from datetime import datetime
+import time
+
+from app.core.config import settings
+from app.core.matching import MatchingIndex
+from app.routers.upload import storage_service
+
+router = APIRouter()
+
+# Matrice des CV partagée (alimentée par les listeners enregistrés au démarrage)
+matching_index = MatchingIndex(storage_service.index)
+
+
+class MatchRequest(BaseModel):
+    job_description: str = Field(..., min_length=1, max_length=settings.MATCH_MAX_QUERY_CHARS)
+    top_k: int = Field(10, ge=1, le=settings.MATCH_MAX_TOP_K)
+
+
+@router.post("/match")
+async def match_candidates(request: MatchRequest):
+    """
+    Endpoint de matching CV / offre d'emploi
+    
+    Retourne les uploads dont le CV (et le formulaire) est le plus proche de la
+    description de poste, par similarité cosinus TF-IDF sur n-grammes hachés.
+    """
+    try:
+        started = time.perf_counter()
+        candidates, results = await matching_index.top_k(request.job_description, request.top_k)
+        
+        return {
+            "top_k": request.top_k,
+            "candidates_scored": candidates,
+            "results": results,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors du matching: {str(e)}"
+        )
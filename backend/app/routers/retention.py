@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.retention import RetentionPurger
+from app.routers.upload import storage_service
+
+router = APIRouter()
+
+# Purge RGPD des uploads expirés (planifiée par le lifespan si RETENTION_ENABLED)
+retention_purger = RetentionPurger(storage_service)
+
+@router.get("/retention/report")
+async def retention_report(sample_size: int = Query(20, ge=0, le=1000)):
+    """
+    Endpoint de simulation de la purge de rétention (rien n'est supprimé)
+    
+    Nombre d'uploads plus anciens que RETENTION_DAYS, CV qui ne seraient plus
+    référencés (fichiers et octets libérés) et échantillon des plus anciens.
+    """
+    try:
+        return await retention_purger.report(sample_size)
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors du calcul du rapport de rétention: {str(e)}"
+        )
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Query
+from datetime import datetime
+
+from app.core.config import settings
+from app.core.search import SearchIndex
+
+router = APIRouter()
+
+# Index plein texte partagé (alimenté par les listeners enregistrés au démarrage)
+search_index = SearchIndex()
+
+@router.get("/search")
+async def search_candidates(
+    q: str = Query(..., min_length=1, description="Termes recherchés (formulaire et texte du CV)"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=settings.SEARCH_MAX_PAGE_SIZE)
+):
+    """
+    Endpoint de recherche plein texte sur les candidats
+    
+    Les résultats sont classés par pertinence (bm25), les champs du formulaire
+    pesant plus que le texte du CV. Chaque mot est recherché en préfixe.
+    """
+    try:
+        total, results = await search_index.search(q, limit=page_size, offset=(page - 1) * page_size)
+        
+        return {
+            "query": q,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "results": results,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la recherche: {str(e)}"
+        )
@@ -1,12 +1,21 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from typing import Dict, Any, Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse, Response
+from typing import Dict, Any, List, Optional
+import asyncio
 import json
 import os
-import glob
 from datetime import datetime
 
+from app.core.config import settings
+from app.core.export import InvalidCursor, decode_cursor, list_page, to_index_date
+from app.core.extraction import ExtractionPipeline
+from app.core.outbox import OutboxDispatcher
 from app.core.storage import StorageService
+from app.core.form_config import get_form_config_payload
+from app.core.http_cache import CachedPayload, cached_json_response, etag_matches
+from app.core.io_pool import run_io
+from app.core.metrics import observe_since_request_start, time_stage
+from app.core.range_response import range_response
 from app.core.validation import DynamicFormValidator, FileValidator, ValidationError
 
 router = APIRouter()
@@ -14,6 +23,60 @@ router = APIRouter()
 # Service de stockage partagé
 storage_service = StorageService()
 
+# Extraction du texte des CV après upload (démarrée par le lifespan de l'application)
+extraction_pipeline = ExtractionPipeline(storage_service)
+
+# Livraison des événements d'upload aux services aval, hors du chemin de la requête
+outbox_dispatcher = OutboxDispatcher(storage_service)
+
+async def process_cv_upload(cv_file: UploadFile, parsed_form_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validation et sauvegarde d'un CV et de son formulaire
+    Partagé par l'upload direct et la finalisation des uploads reprenables
+    """
+    # Validation du fichier CV (extension, taille annoncée)
+    # Le header PDF et la taille réelle sont vérifiés pendant la sauvegarde
+    with time_stage("file_validation"):
+        FileValidator.validate_cv_metadata(cv_file)
+    
+    # Validation générique des données du formulaire
+    with time_stage("form_validation"):
+        validation_errors = DynamicFormValidator.validate_form_data(parsed_form_data)
+    
+    if validation_errors:
+        error_details = {
+            "message": "Erreurs de validation détectées",
+            "errors": [
+                {"field": error.field, "message": error.message}
+                for error in validation_errors
+            ]
+        }
+        raise HTTPException(status_code=422, detail=error_details)
+    
+    # Sauvegarde en flux via le service de stockage : le fichier n'est jamais
+    # chargé entièrement en mémoire et est rejeté dès qu'il dépasse la limite
+    storage_result = await storage_service.save_cv_upload(
+        FileValidator.iter_cv_chunks(cv_file),
+        parsed_form_data
+    )
+    
+    # Construction de la réponse
+    return {
+        "success": True,
+        "message": "CV et données sauvegardés avec succès",
+        "upload_id": storage_result["upload_id"],
+        "cv_url": storage_result["cv_url"],
+        "cv_deduplicated": storage_result["cv_deduplicated"],
+        "duplicate_of": storage_result["duplicate_of"],
+        "timestamp": datetime.now().isoformat(),
+        "form_fields_received": list(parsed_form_data.keys()),
+        "file_info": {
+            "filename": cv_file.filename,
+            "size": storage_result["cv_size"],
+            "content_type": cv_file.content_type
+        }
+    }
+
 @router.post("/upload")
 async def upload_cv(
     cv_file: UploadFile = File(..., description="Fichier CV au format PDF"),
@@ -25,52 +88,20 @@ async def upload_cv(
     Le backend accepte n'importe quelle structure de formulaire,
     aucun champ n'est hardcodé dans le code.
     """
+    # Temps passé avant le handler : réception du corps et parsing multipart
+    observe_since_request_start("multipart_parse")
     try:
         # Parsing des données du formulaire
         try:
-            parsed_form_data = json.loads(form_data)
+            with time_stage("form_json_parse"):
+                parsed_form_data = json.loads(form_data)
         except json.JSONDecodeError:
             raise HTTPException(
                 status_code=400,
                 detail="Format JSON invalide pour les données du formulaire"
             )
         
-        # Validation du fichier CV
-        await FileValidator.validate_cv_file(cv_file)
-        
-        # Validation générique des données du formulaire
-        validation_errors = DynamicFormValidator.validate_form_data(parsed_form_data)
-        
-        if validation_errors:
-            error_details = {
-                "message": "Erreurs de validation détectées",
-                "errors": [
-                    {"field": error.field, "message": error.message}
-                    for error in validation_errors
-                ]
-            }
-            raise HTTPException(status_code=422, detail=error_details)
-        
-        # Lecture du contenu du fichier
-        cv_content = await cv_file.read()
-        
-        # Sauvegarde via le service de stockage
-        storage_result = await storage_service.save_cv_upload(cv_content, parsed_form_data)
-        
-        # Construction de la réponse
-        response_data = {
-            "success": True,
-            "message": "CV et données sauvegardés avec succès",
-            "upload_id": storage_result["upload_id"],
-            "cv_url": storage_result["cv_url"],
-            "timestamp": datetime.now().isoformat(),
-            "form_fields_received": list(parsed_form_data.keys()),
-            "file_info": {
-                "filename": cv_file.filename,
-                "size": len(cv_content),
-                "content_type": cv_file.content_type
-            }
-        }
+        response_data = await process_cv_upload(cv_file, parsed_form_data)
         
         return JSONResponse(
             status_code=201,
@@ -87,29 +118,128 @@ async def upload_cv(
             detail=f"Erreur interne du serveur: {str(e)}"
         )
 
+@router.post("/upload/batch")
+async def upload_cv_batch(
+    cv_files: List[UploadFile] = File(..., description="Fichiers CV au format PDF"),
+    form_data: str = Form(..., description="Liste JSON des formulaires, dans l'ordre des fichiers")
+):
+    """
+    Endpoint d'upload par lot : N couples (CV, formulaire) en une seule requête
+    
+    Chaque élément est validé et sauvegardé indépendamment, les sauvegardes
+    s'exécutent en parallèle (BATCH_UPLOAD_CONCURRENCY) et la réponse détaille
+    le résultat de chaque élément, y compris les échecs partiels.
+    """
+    # Parsing des données du formulaire
+    try:
+        parsed_forms = json.loads(form_data)
+    except json.JSONDecodeError:
+        raise HTTPException(
+            status_code=400,
+            detail="Format JSON invalide pour les données du formulaire"
+        )
+    
+    if not isinstance(parsed_forms, list) or not all(isinstance(item, dict) for item in parsed_forms):
+        raise HTTPException(
+            status_code=400,
+            detail="form_data doit être une liste JSON de formulaires"
+        )
+    
+    if len(parsed_forms) != len(cv_files):
+        raise HTTPException(
+            status_code=400,
+            detail=f"{len(cv_files)} fichiers reçus pour {len(parsed_forms)} formulaires"
+        )
+    
+    if len(cv_files) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lot trop volumineux. Nombre maximal d'éléments: {settings.BATCH_MAX_ITEMS}"
+        )
+    
+    # Validation de tous les formulaires en une passe
+    validation_results = DynamicFormValidator.validate_many(parsed_forms)
+    semaphore = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+    
+    async def process_item(index: int, cv_file: UploadFile, item_form: Dict[str, Any]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"index": index, "filename": cv_file.filename}
+        
+        if validation_results[index]:
+            result.update({
+                "success": False,
+                "status_code": 422,
+                "errors": [
+                    {"field": error.field, "message": error.message}
+                    for error in validation_results[index]
+                ]
+            })
+            return result
+        
+        try:
+            FileValidator.validate_cv_metadata(cv_file)
+            async with semaphore:
+                storage_result = await storage_service.save_cv_upload(
+                    FileValidator.iter_cv_chunks(cv_file),
+                    item_form
+                )
+        except HTTPException as e:
+            result.update({"success": False, "status_code": e.status_code, "detail": e.detail})
+            return result
+        except Exception as e:
+            result.update({
+                "success": False,
+                "status_code": 500,
+                "detail": f"Erreur interne du serveur: {str(e)}"
+            })
+            return result
+        
+        result.update({
+            "success": True,
+            "status_code": 201,
+            "upload_id": storage_result["upload_id"],
+            "cv_url": storage_result["cv_url"],
+            "size": storage_result["cv_size"],
+            "duplicate_of": storage_result["duplicate_of"]
+        })
+        return result
+    
+    results = await asyncio.gather(*(
+        process_item(index, cv_file, item_form)
+        for index, (cv_file, item_form) in enumerate(zip(cv_files, parsed_forms))
+    ))
+    
+    succeeded = sum(1 for result in results if result["success"])
+    response_data = {
+        "success": succeeded == len(results),
+        "message": f"{succeeded}/{len(results)} CV sauvegardés avec succès",
+        "timestamp": datetime.now().isoformat(),
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+    
+    # 207 Multi-Status dès qu'au moins un élément a échoué
+    return JSONResponse(
+        status_code=201 if succeeded == len(results) else 207,
+        content=response_data
+    )
+
 @router.get("/stats")
 async def get_upload_stats():
     """
     Endpoint pour récupérer les statistiques d'upload
     
-    Retourne le nombre total d'uploads reçus en comptant les fichiers JSON
-    dans le dossier de données (chaque upload génère un fichier JSON unique)
+    Les compteurs (total, par jour, par backend) sont maintenus par l'index
+    des uploads à chaque sauvegarde : aucun parcours du dossier de données
     """
     try:
-        # Comptage des fichiers de données (un par upload)
-        data_dir = os.path.join("uploads", "data")
-        
-        if not os.path.exists(data_dir):
-            total_uploads = 0
-        else:
-            # Compter les fichiers JSON dans le dossier data
-            json_files = glob.glob(os.path.join(data_dir, "*.json"))
-            total_uploads = len(json_files)
+        stats = await storage_service.index.get_stats()
         
         return {
-            "total_uploads": total_uploads,
+            **stats,
             "timestamp": datetime.now().isoformat(),
-            "storage_backend": storage_service.backend.__class__.__name__
+            "storage_backend": storage_service.backend.name
         }
         
     except Exception as e:
@@ -119,93 +249,183 @@ async def get_upload_stats():
         )
 
 @router.get("/form-config")
-async def get_form_configuration():
+async def get_form_configuration(request: Request):
     """
     Endpoint optionnel pour retourner la configuration du formulaire
     
     Cet endpoint peut être utilisé par le frontend pour obtenir
-    la structure des champs à afficher dynamiquement
-    """
-    # Configuration exemple - peut être stockée en base ou dans un fichier
-    form_config = {
-        "fields": [
-            {
-                "name": "prenom",
-                "type": "text",
-                "label": "Prénom",
-                "required": True,
-                "placeholder": "Votre prénom"
-            },
-            {
-                "name": "nom", 
-                "type": "text",
-                "label": "Nom",
-                "required": True,
-                "placeholder": "Votre nom"
-            },
-            {
-                "name": "email",
-                "type": "email",
-                "label": "Email",
-                "required": True,
-                "placeholder": "votre@email.com"
-            },
-            {
-                "name": "telephone",
-                "type": "tel",
-                "label": "Téléphone",
-                "required": False,
-                "placeholder": "01 23 45 67 89"
-            },
-            {
-                "name": "localisation",
-                "type": "text",
-                "label": "Localisation",
-                "required": False,
-                "placeholder": "Ville, Région"
-            },
-            {
-                "name": "date_disponibilite",
-                "type": "date",
-                "label": "Date de disponibilité",
-                "required": False
-            },
-            {
-                "name": "rgpd_consent",
-                "type": "checkbox",
-                "label": "J'accepte le traitement de mes données personnelles conformément au RGPD",
-                "required": True
-            }
-        ],
-        "version": "1.0",
-        "last_updated": datetime.now().isoformat()
-    }
+    la structure des champs à afficher dynamiquement.
+    La réponse est sérialisée une fois ; ETag et Cache-Control permettent
+    au client de la réutiliser (304 si inchangée)
+    """
+    return cached_json_response(
+        request,
+        get_form_config_payload(),
+        f"public, max-age={settings.FORM_CONFIG_MAX_AGE}"
+    )
+
+@router.get("/uploads")
+async def list_uploads(
+    limit: int = Query(100, ge=1, le=settings.UPLOADS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Curseur `next_cursor` de la page précédente"),
+    created_from: Optional[datetime] = Query(None, description="Date de création minimale (incluse, UTC par défaut)"),
+    created_to: Optional[datetime] = Query(None, description="Date de création maximale (exclue)")
+):
+    """
+    Endpoint de listing des uploads, du plus ancien au plus récent
     
-    return form_config
+    Pagination par curseur : le coût d'une page ne dépend pas de sa position,
+    et les uploads reçus pendant le parcours ne décalent pas les pages.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        rows = await storage_service.index.page(
+            limit + 1, after, to_index_date(created_from), to_index_date(created_to)
+        )
+        # Corps assemblé hors de la boucle d'événements (pages jusqu'à UPLOADS_MAX_PAGE_SIZE)
+        body = await run_io(list_page, rows, limit)
+        return Response(content=body, media_type="application/json")
+        
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=400,
+            detail="Curseur de pagination invalide"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors du listing des uploads: {str(e)}"
+        )
 
 @router.get("/uploads/{upload_id}")
-async def get_upload_details(upload_id: str):
+async def get_upload_details(upload_id: str, request: Request):
     """
     Endpoint pour récupérer les détails d'un upload spécifique
+    
+    Données personnelles : cache privé, revalidé par ETag à chaque lecture
     """
     try:
-        # Vérification de l'existence du fichier de données
-        data_file = os.path.join("uploads", "data", f"{upload_id}.json")
+        # Lecture par clé dans l'index des uploads (cache LRU en mémoire)
+        entry = await storage_service.index.get_upload(upload_id)
         
-        if not os.path.exists(data_file):
+        if entry is None:
             raise HTTPException(
                 status_code=404,
                 detail="Upload non trouvé"
             )
         
-        # Lecture des métadonnées
-        with open(data_file, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
+        payload = CachedPayload({
+            "upload_id": upload_id,
+            "metadata": entry["metadata"],
+            "cv_available": entry["cv_available"],
+            "cv_refcount": entry["cv_refcount"]
+        })
+        return cached_json_response(request, payload, "private, no-cache")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la récupération des détails: {str(e)}"
+        ) 
+
+@router.api_route("/uploads/{upload_id}/cv", methods=["GET", "HEAD"])
+async def download_cv(upload_id: str, request: Request):
+    """
+    Endpoint de téléchargement du CV d'un upload, avec support des requêtes Range
+        
+    Répond 206 Partial Content pour une plage, ce qui permet à pdf.js d'afficher
+    les premières pages avant la fin du téléchargement. Fichier local envoyé sans
+    copie (sendfile) si le serveur le permet, blob Azure relayé par plages.
+    """
+    try:
+        entry = await storage_service.index.get_upload(upload_id)
+        if entry is None or not entry["cv_available"]:
+            raise HTTPException(
+                status_code=404,
+                detail="CV non trouvé"
+            )
+        
+        metadata = entry["metadata"]
+        cv_filename = metadata.get("cv_filename", f"{upload_id}.pdf")
+        backend = storage_service.backend
+        
+        # CV adressé par contenu : son empreinte est un ETag fort et le contenu est immuable
+        headers = {
+            "content-disposition": f'inline; filename="{upload_id}.pdf"',
+            "cache-control": "private, max-age=31536000, immutable"
+        }
+        etag = f'"{metadata["cv_sha256"]}"' if metadata.get("cv_sha256") else None
+        if etag is not None:
+            headers["etag"] = etag
+            if etag_matches(request, etag):
+                return Response(status_code=304, headers=headers)
+        
+        # If-Range : la plage n'est servie que si le client a la même version
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and if_range is not None and if_range != etag:
+            range_header = None
+        
+        # Fichier local épinglé jusqu'à la fin de l'envoi : une éviction du cache
+        # disque pendant la réponse ne le supprime pas
+        local_path = await run_io(backend.pin_local_path, cv_filename, "cv")
+        if local_path is None:
+            size = await backend.get_file_size(cv_filename, "cv")
+            if size is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="CV non trouvé"
+                )
+            return range_response(
+                size,
+                range_header,
+                headers,
+                stream_factory=lambda offset, length: backend.stream_range(cv_filename, "cv", offset, length),
+                head=request.method == "HEAD"
+            )
+        
+        async def release() -> None:
+            await run_io(backend.release_local_path, local_path)
+        
+        try:
+            size = await run_io(os.path.getsize, local_path)
+        except BaseException:
+            await release()
+            raise
+        return range_response(size, range_header, headers, local_path=local_path, release=release)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors du téléchargement du CV: {str(e)}"
+        )
+
+@router.get("/uploads/{upload_id}/extraction")
+async def get_upload_extraction(upload_id: str):
+    """
+    Endpoint pour suivre l'extraction du texte d'un CV
+    
+    Retourne le statut du job (pending, running, done, failed, skipped)
+    et, une fois terminé, le texte extrait, le nombre de pages et le chiffrement
+    """
+    try:
+        job = await extraction_pipeline.get_status(upload_id)
+        
+        if job is None:
+            if await storage_service.index.get_upload(upload_id) is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Upload non trouvé"
+                )
+            job = {"status": "not_queued", "result": None}
         
         return {
             "upload_id": upload_id,
-            "metadata": metadata,
-            "cv_available": os.path.exists(os.path.join("uploads", "cv", f"{upload_id}.pdf"))
+            **job
         }
         
     except HTTPException:
@@ -213,5 +433,5 @@ async def get_upload_details(upload_id: str):
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Erreur lors de la récupération des détails: {str(e)}"
-        ) 
\ No newline at end of file
+            detail=f"Erreur lors de la récupération de l'extraction: {str(e)}"
+        )
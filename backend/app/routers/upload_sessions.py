@@ -0,0 +1,136 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.upload_sessions import UploadSessionManager
+from app.routers.upload import process_cv_upload
+
+router = APIRouter()
+
+# Sessions d'upload reprenables (nettoyage des sessions expirées démarré par le lifespan)
+session_manager = UploadSessionManager()
+
+
+class CreateUploadSessionRequest(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., ge=1, description="Taille totale du fichier en octets")
+    content_type: Optional[str] = None
+
+
+class FinalizeUploadSessionRequest(BaseModel):
+    form_data: Dict[str, Any]
+
+
+@router.post("/upload-sessions")
+async def create_upload_session(request: CreateUploadSessionRequest):
+    """
+    Endpoint de création d'un upload reprenable
+
+    Le fichier est ensuite envoyé par blocs (PUT avec offset), la progression
+    peut être relue (GET) pour reprendre après une coupure, puis l'upload est
+    finalisé avec les données du formulaire.
+    """
+    try:
+        session = await session_manager.create(request.filename, request.size, request.content_type)
+        return JSONResponse(
+            status_code=201,
+            content={**session, "max_chunk_size": settings.UPLOAD_SESSION_MAX_CHUNK_SIZE}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la création de la session d'upload: {str(e)}"
+        )
+
+@router.get("/upload-sessions/{session_id}")
+async def get_upload_session(session_id: str):
+    """
+    Endpoint de progression d'un upload reprenable
+
+    `offset` est le nombre d'octets reçus : le client reprend son envoi à cet offset.
+    """
+    try:
+        return await session_manager.get(session_id)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la lecture de la session d'upload: {str(e)}"
+        )
+
+@router.put("/upload-sessions/{session_id}")
+async def upload_session_chunk(
+    session_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="Position du bloc dans le fichier (progression courante)")
+):
+    """
+    Endpoint d'envoi d'un bloc (corps brut de la requête)
+
+    Le bloc est écrit en flux sur disque. Un offset différent de la progression
+    courante est refusé (409) avec l'offset attendu.
+    """
+    try:
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > settings.UPLOAD_SESSION_MAX_CHUNK_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Bloc trop volumineux. Taille maximale: {settings.UPLOAD_SESSION_MAX_CHUNK_SIZE} octets"
+            )
+
+        return await session_manager.write_chunk(session_id, offset, request.stream())
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de l'envoi du bloc: {str(e)}"
+        )
+
+@router.post("/upload-sessions/{session_id}/finalize")
+async def finalize_upload_session(session_id: str, request: FinalizeUploadSessionRequest):
+    """
+    Endpoint de finalisation d'un upload reprenable
+
+    Le fichier assemblé et le formulaire sont validés puis sauvegardés comme
+    pour /api/upload. En cas d'erreur de validation la session reste ouverte.
+    """
+    try:
+        async with session_manager.finalizing(session_id) as cv_file:
+            response_data = await process_cv_upload(cv_file, request.form_data)
+
+        return JSONResponse(
+            status_code=201,
+            content=response_data
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la finalisation de l'upload: {str(e)}"
+        )
+
+@router.delete("/upload-sessions/{session_id}", status_code=204)
+async def abort_upload_session(session_id: str):
+    """Endpoint d'abandon d'un upload reprenable (fichier partiel supprimé)"""
+    try:
+        await session_manager.abort(session_id)
+        return Response(status_code=204)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de l'abandon de la session d'upload: {str(e)}"
+        )
@@ -0,0 +1,6 @@
+"""
+Suite de benchmarks du service d'upload
+- load : générateur de charge ASGI en processus (upload, stats, lecture d'un upload)
+- micro : micro-benchmarks des validateurs et des backends de stockage
+Les résultats sont sauvegardés en JSON et comparés à une baseline
+"""
@@ -0,0 +1,120 @@
+"""
+Usage (depuis backend/) :
+    python -m benchmarks load --requests 200 --concurrency 16 --sizes 50k,500k,2m
+    python -m benchmarks micro --iterations 10000 --backends local log azure
+    python -m benchmarks compare benchmarks/baselines/load.json benchmarks/results/load-....json
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _isolate(keep: bool) -> str:
+    """
+    Exécute les benchmarks dans un dossier temporaire : les chemins relatifs
+    (uploads/, state/) ne touchent pas aux données réelles
+    """
+    sys.path.insert(0, BACKEND_DIR)
+    workdir = tempfile.mkdtemp(prefix="cv-bench-")
+    # Même configuration (.env) que le service
+    env_file = os.path.join(BACKEND_DIR, ".env")
+    if os.path.exists(env_file):
+        shutil.copy(env_file, workdir)
+    os.chdir(workdir)
+    if not keep:
+        import atexit
+        atexit.register(shutil.rmtree, workdir, True)
+    return workdir
+
+
+def _finish(report, args) -> int:
+    from benchmarks import common
+
+    common.print_report(report)
+    saved = common.save_report(report, args.output)
+    print(f"\n💾 Résultats : {saved}")
+
+    baseline = args.baseline or common.baseline_path(report["suite"])
+    regression = False
+    if os.path.exists(baseline):
+        rows = common.compare_reports(common.load_report(baseline), report, args.tolerance)
+        regression = common.print_comparison(rows, args.tolerance)
+    else:
+        print(f"Pas de baseline ({baseline})")
+
+    if args.save_baseline:
+        print(f"📌 Baseline mise à jour : {common.save_report(report, common.baseline_path(report['suite']))}")
+
+    return 1 if regression else 0
+
+
+def main() -> int:
+    sys.path.insert(0, BACKEND_DIR)
+    from benchmarks.common import parse_size
+
+    parser = argparse.ArgumentParser(description="Benchmarks du service d'upload")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument("--sizes", default="50k,500k,2m", help="Tailles des PDF synthétiques")
+        sub.add_argument("--output", help="Fichier de résultats (défaut : benchmarks/results/)")
+        sub.add_argument("--baseline", help="Baseline de comparaison (défaut : benchmarks/baselines/<suite>.json)")
+        sub.add_argument("--save-baseline", action="store_true", help="Enregistre ce run comme baseline")
+        sub.add_argument("--tolerance", type=float, default=0.15, help="Écart toléré avant régression")
+        sub.add_argument("--keep", action="store_true", help="Conserve le dossier de travail temporaire")
+
+    load = subparsers.add_parser("load", help="Charge ASGI : upload, stats, lecture d'un upload")
+    add_common(load)
+    load.add_argument("--requests", type=int, default=200, help="Requêtes par scénario")
+    load.add_argument("--concurrency", type=int, default=16)
+    load.add_argument("--no-extraction", action="store_true", help="Désactive l'extraction des CV")
+
+    micro = subparsers.add_parser("micro", help="Micro-benchmarks validateurs et stockage")
+    add_common(micro)
+    micro.add_argument("--iterations", type=int, default=10_000)
+    micro.add_argument("--backends", nargs="+", default=["local"], choices=["local", "log", "azure"])
+
+    compare = subparsers.add_parser("compare", help="Compare deux fichiers de résultats")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--tolerance", type=float, default=0.15)
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        from benchmarks import common
+
+        rows = common.compare_reports(
+            common.load_report(args.baseline), common.load_report(args.current), args.tolerance
+        )
+        return 1 if common.print_comparison(rows, args.tolerance) else 0
+
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size]
+    # Chemins de sortie résolus avant le changement de dossier
+    for name in ("output", "baseline"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    print(f"📂 Dossier de travail : {_isolate(args.keep)}")
+
+    if args.command == "load":
+        from app.core.config import settings
+        from benchmarks.load import run_load
+
+        if args.no_extraction:
+            settings.EXTRACTION_ENABLED = False
+        report = asyncio.run(run_load(args.requests, args.concurrency, sizes))
+    else:
+        from benchmarks.micro import run_micro
+
+        report = run_micro(args.iterations, sizes, args.backends)
+
+    return _finish(report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
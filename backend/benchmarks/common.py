@@ -0,0 +1,219 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import os
+import platform
+import resource
+import statistics
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINES_DIR = os.path.join(BENCHMARKS_DIR, "baselines")
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+# Métriques comparées : True si une valeur plus élevée est meilleure
+COMPARED_METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_per_s": True,
+}
+
+
+def parse_size(value: str) -> int:
+    """Taille lisible ("200k", "2m", "512") en octets"""
+    value = value.strip().lower()
+    units = {"k": 1024, "m": 1024 * 1024}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def make_pdf(size: int, seed: int = 0) -> bytes:
+    """
+    PDF synthétique valide d'environ `size` octets
+    Le texte contient `seed` : chaque CV est distinct (pas de déduplication)
+    """
+    text = f"CV synthetique {seed} Developpeur Python FastAPI Paris".encode("latin-1")
+    content = b"BT /F1 12 Tf 72 720 Td (" + text + b") Tj ET"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    out = bytearray(b"%PDF-1.4\n")
+    # Remplissage par des lignes de commentaire pour atteindre la taille voulue
+    padding = max(0, size - 700)
+    line = b"% " + b"x" * 76 + b"\n"
+    out += line * (padding // len(line))
+
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def sample_form_data(index: int = 0) -> Dict[str, Any]:
+    """Formulaire valide pour la configuration par défaut"""
+    return {
+        "prenom": "Jean",
+        "nom": f"Dupont{index}",
+        "email": f"jean.dupont{index}@example.com",
+        "telephone": "0612345678",
+        "localisation": "Paris",
+        "date_disponibilite": "2024-09-01",
+        "rgpd_consent": True,
+    }
+
+
+def summarize(latencies: Sequence[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """Percentiles (ms) et débit d'une série de mesures exprimées en secondes"""
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"count": 0, "errors": errors}
+
+    def percentile(p: float) -> float:
+        rank = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return round(ordered[rank] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "throughput_per_s": round(len(ordered) / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus (Linux : ru_maxrss en Ko)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if platform.system() == "Darwin":
+        peak /= 1024  # macOS : octets
+    return round(peak / 1024, 1)
+
+
+def build_report(suite: str, params: Dict[str, Any], metrics: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "suite": suite,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "params": params,
+        "peak_rss_mb": peak_rss_mb(),
+        "metrics": metrics,
+    }
+
+
+def baseline_path(suite: str) -> str:
+    return os.path.join(BASELINES_DIR, f"{suite}.json")
+
+
+def save_report(report: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Sauvegarde un rapport (par défaut : results/<suite>-<date>.json)"""
+    if path is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{report['suite']}-{stamp}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_reports(
+    baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float
+) -> List[Dict[str, Any]]:
+    """
+    Compare deux rapports métrique par métrique
+    Retourne les écarts ; `regression` est vrai au-delà de la tolérance (0.15 = 15%)
+    """
+    rows = []
+    for name, metrics in current["metrics"].items():
+        reference = baseline["metrics"].get(name)
+        if not reference:
+            continue
+        for key, higher_is_better in COMPARED_METRICS.items():
+            before, after = reference.get(key), metrics.get(key)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            rows.append({
+                "benchmark": name,
+                "metric": key,
+                "baseline": before,
+                "current": after,
+                "change": round(change, 4),
+                "regression": worse > tolerance,
+            })
+        # Toute nouvelle erreur est une régression, quelle que soit la tolérance
+        if metrics.get("errors", 0) > reference.get("errors", 0):
+            rows.append({
+                "benchmark": name,
+                "metric": "errors",
+                "baseline": reference.get("errors", 0),
+                "current": metrics["errors"],
+                "change": 0.0,
+                "regression": True,
+            })
+
+    before_rss, after_rss = baseline.get("peak_rss_mb"), current.get("peak_rss_mb")
+    if before_rss and after_rss is not None:
+        change = (after_rss - before_rss) / before_rss
+        rows.append({
+            "benchmark": "process",
+            "metric": "peak_rss_mb",
+            "baseline": before_rss,
+            "current": after_rss,
+            "change": round(change, 4),
+            "regression": change > tolerance,
+        })
+    return rows
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n📊 {report['suite']} (pic RSS : {report['peak_rss_mb']} MB)")
+    header = f"{'benchmark':<56} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'débit/s':>10} {'err':>5}"
+    print(header)
+    print("-" * len(header))
+    for name, m in report["metrics"].items():
+        print(
+            f"{name:<56} {m.get('count', 0):>6} {m.get('p50_ms', '-'):>9} {m.get('p95_ms', '-'):>9} "
+            f"{m.get('p99_ms', '-'):>9} {m.get('throughput_per_s', '-'):>10} {m.get('errors', 0):>5}"
+        )
+
+
+def print_comparison(rows: List[Dict[str, Any]], tolerance: float) -> bool:
+    """Affiche la comparaison ; retourne True si une régression est détectée"""
+    if not rows:
+        print("\nAucune métrique commune avec la baseline")
+        return False
+
+    print(f"\n🔍 Comparaison avec la baseline (tolérance {tolerance:.0%})")
+    for row in rows:
+        flag = "❌ RÉGRESSION" if row["regression"] else "  "
+        print(
+            f"{row['benchmark']:<56} {row['metric']:<17} {row['baseline']:>10} → {row['current']:>10} "
+            f"({row['change']:+.1%}) {flag}"
+        )
+    return any(row["regression"] for row in rows)
@@ -0,0 +1,107 @@
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+import asyncio
+import itertools
+import json
+import time
+
+import httpx
+
+from benchmarks.common import build_report, make_pdf, sample_form_data, summarize
+
+
+async def _drive(
+    name: str,
+    requests: int,
+    concurrency: int,
+    call: Callable[[int], Awaitable[httpx.Response]],
+    expected_status: Tuple[int, ...] = (200,)
+) -> Tuple[Dict[str, Any], List[httpx.Response]]:
+    """Exécute `requests` appels avec `concurrency` clients simultanés"""
+    counter = itertools.count()
+    latencies: List[float] = []
+    responses: List[httpx.Response] = []
+    errors = 0
+
+    async def client_loop() -> None:
+        nonlocal errors
+        while True:
+            index = next(counter)
+            if index >= requests:
+                return
+            started = time.perf_counter()
+            try:
+                response = await call(index)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status_code in expected_status:
+                responses.append(response)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    result = summarize(latencies, elapsed, errors)
+    print(f"   {name}: {result.get('p95_ms')} ms p95, {result.get('throughput_per_s')} req/s, {errors} erreurs")
+    return result, responses
+
+
+async def run_load(requests: int, concurrency: int, sizes: List[int]) -> Dict[str, Any]:
+    """
+    Charge en processus via l'application ASGI (sans réseau ni serveur)
+    Le lifespan est exécuté : index, extraction et listeners sont actifs comme en production
+    """
+    from app.core.config import settings
+    from app.main import app
+
+    # Un seul client simulé : débit mesuré sans la limitation par client
+    # (le contrôle d'admission reste actif, ses 503 sont comptés en erreurs)
+    settings.RATE_LIMIT_ENABLED = False
+
+    metrics: Dict[str, Dict[str, Any]] = {}
+    upload_ids: List[str] = []
+    # PDF générés à l'avance : la génération n'est pas mesurée
+    payloads = {size: [make_pdf(size, seed) for seed in range(min(requests, 64))] for size in sizes}
+    seeds = itertools.count(len(payloads[sizes[0]]) if sizes else 0)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for size in sizes:
+                def upload(index: int, size: int = size) -> Awaitable[httpx.Response]:
+                    pool = payloads[size]
+                    # Au-delà des PDF pré-générés, un seed unique évite la déduplication
+                    content = pool[index] if index < len(pool) else make_pdf(size, next(seeds))
+                    return client.post(
+                        "/api/upload",
+                        files={"cv_file": (f"cv_{index}.pdf", content, "application/pdf")},
+                        data={"form_data": json.dumps(sample_form_data(index))}
+                    )
+
+                print(f"▶ POST /api/upload ({size} octets)")
+                result, responses = await _drive(
+                    f"upload_{size}", requests, concurrency, upload, expected_status=(201,)
+                )
+                metrics[f"POST /api/upload [{size}B]"] = result
+                upload_ids.extend(response.json()["upload_id"] for response in responses)
+
+            print("▶ GET /api/stats")
+            metrics["GET /api/stats"], _ = await _drive(
+                "stats", requests, concurrency, lambda index: client.get("/api/stats")
+            )
+
+            if upload_ids:
+                print("▶ GET /api/uploads/{id}")
+                metrics["GET /api/uploads/{id}"], _ = await _drive(
+                    "get_upload", requests, concurrency,
+                    lambda index: client.get(f"/api/uploads/{upload_ids[index % len(upload_ids)]}")
+                )
+
+    return build_report(
+        "load",
+        {"requests": requests, "concurrency": concurrency, "sizes": sizes},
+        metrics
+    )
@@ -0,0 +1,148 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import io
+import itertools
+import time
+
+from benchmarks.common import build_report, make_pdf, sample_form_data, summarize
+
+
+def _measure(func: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        func()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def _measure_async(func: Callable[[], Awaitable[Any]], iterations: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        await func()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        await func()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def _upload_file(content: bytes):
+    from fastapi import UploadFile
+    from starlette.datastructures import Headers
+
+    return UploadFile(
+        file=io.BytesIO(content),
+        filename="cv.pdf",
+        size=len(content),
+        headers=Headers({"content-type": "application/pdf"})
+    )
+
+
+def bench_validators(iterations: int, sizes: List[int]) -> Dict[str, Dict[str, Any]]:
+    from app.core.validation import DynamicFormValidator, FileValidator
+
+    metrics = {}
+    valid_form = sample_form_data()
+    invalid_form = {**valid_form, "email": "invalide", "rgpd_consent": False, "telephone": "abc"}
+
+    metrics["DynamicFormValidator.validate_form_data [valide]"] = _measure(
+        lambda: DynamicFormValidator.validate_form_data(valid_form), iterations, iterations // 10
+    )
+    metrics["DynamicFormValidator.validate_form_data [invalide]"] = _measure(
+        lambda: DynamicFormValidator.validate_form_data(invalid_form), iterations, iterations // 10
+    )
+
+    async def validate_files() -> None:
+        for size in sizes:
+            content = make_pdf(size)
+            file = _upload_file(content)
+
+            async def validate() -> None:
+                await FileValidator.validate_cv_file(file)
+
+            metrics[f"FileValidator.validate_cv_file [{size}B]"] = await _measure_async(
+                validate, max(10, iterations // 100), 5
+            )
+
+    asyncio.run(validate_files())
+    return metrics
+
+
+async def _bench_backend(backend, label: str, iterations: int, sizes: List[int]) -> Dict[str, Dict[str, Any]]:
+    metrics = {}
+    seeds = itertools.count()
+    await backend.open()
+    try:
+        for size in sizes:
+            content = make_pdf(size)
+
+            async def save_file() -> None:
+                await backend.save_file(content, f"bench_{next(seeds)}.pdf", "bench")
+
+            async def save_content_addressed() -> None:
+                # Contenu distinct à chaque appel : mesure de l'écriture, pas de la déduplication
+                unique = make_pdf(size, next(seeds))
+
+                async def chunks():
+                    yield unique
+
+                await backend.save_content_addressed(chunks(), "bench", ".pdf")
+
+            metrics[f"{label}.save_file [{size}B]"] = await _measure_async(save_file, iterations, 2)
+            metrics[f"{label}.save_content_addressed [{size}B]"] = await _measure_async(
+                save_content_addressed, iterations, 2
+            )
+
+        form = {"upload_id": "bench", "form_data": sample_form_data()}
+
+        async def save_json() -> None:
+            await backend.save_json(form, f"bench_{next(seeds)}.json", "bench")
+
+        metrics[f"{label}.save_json"] = await _measure_async(save_json, iterations, 2)
+    finally:
+        await backend.close()
+    return metrics
+
+
+def bench_storage(iterations: int, sizes: List[int], backends: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    from app.core.config import settings
+    from app.core.storage import AzureBlobStorageBackend, LocalStorageBackend, LogStructuredStorageBackend
+
+    backends = backends or ["local"]
+    metrics: Dict[str, Dict[str, Any]] = {}
+
+    if "local" in backends:
+        metrics.update(asyncio.run(_bench_backend(LocalStorageBackend(), "LocalStorageBackend", iterations, sizes)))
+
+    if "log" in backends:
+        metrics.update(asyncio.run(
+            _bench_backend(LogStructuredStorageBackend(), "LogStructuredStorageBackend", iterations, sizes)
+        ))
+
+    if "azure" in backends:
+        if not settings.AZURE_STORAGE_CONNECTION_STRING:
+            print("⚠️  AZURE_STORAGE_CONNECTION_STRING absent : backend Azure ignoré (voir Azurite)")
+        else:
+            metrics.update(asyncio.run(
+                _bench_backend(AzureBlobStorageBackend(), "AzureBlobStorageBackend", iterations, sizes)
+            ))
+
+    return metrics
+
+
+def run_micro(iterations: int, sizes: List[int], backends: List[str]) -> Dict[str, Any]:
+    metrics = {}
+    print("▶ Validateurs")
+    metrics.update(bench_validators(iterations, sizes))
+    print("▶ Backends de stockage")
+    metrics.update(bench_storage(max(10, iterations // 100), sizes, backends))
+    return build_report(
+        "micro",
+        {"iterations": iterations, "sizes": sizes, "backends": backends},
+        metrics
+    )
@@ -0,0 +1,174 @@
+import argparse
+
+from app.core.config import settings
+
+
+def rebuild_index(args: argparse.Namespace) -> None:
+    """Reconstruit l'index des uploads depuis les fichiers de métadonnées"""
+    from app.core.index import UploadIndex
+
+    index = UploadIndex()
+    indexed = index.rebuild_sync(args.data_dir, backend=args.backend)
+    index.close()
+    source = args.data_dir or ("le journal" if settings.STORAGE_BACKEND == "log" else settings.DATA_UPLOAD_DIR)
+    print(f"✅ Index reconstruit : {indexed} uploads indexés depuis {source}")
+
+
+def migrate_shards(args: argparse.Namespace) -> None:
+    """Migre en ligne les fichiers à plat vers les sous-dossiers de répartition"""
+    from app.core.storage import LocalStorageBackend
+
+    backend = LocalStorageBackend()
+    for folder in args.folders:
+        moved = 0
+        for batch_count in backend.migrate_flat_files(folder, args.batch_size, args.pause):
+            moved += batch_count
+            print(f"   {folder}: {moved} fichiers déplacés")
+        print(f"✅ {folder} : migration terminée ({moved} fichiers déplacés)")
+
+
+def rebuild_search(args: argparse.Namespace) -> None:
+    """Reconstruit l'index plein texte depuis l'index des uploads et les extractions"""
+    from app.core.extraction import ExtractionQueue
+    from app.core.index import UploadIndex
+    from app.core.search import SearchIndex
+
+    index, queue, search_index = UploadIndex(), ExtractionQueue(), SearchIndex()
+    indexed = search_index.rebuild_sync(index.iter_metadata_sync(), queue.get_text_sync)
+    for store in (index, queue, search_index):
+        store.close()
+    print(f"✅ Index de recherche reconstruit : {indexed} candidats indexés")
+
+
+def rebuild_match(args: argparse.Namespace) -> None:
+    """Recalcule la matrice de matching depuis l'index des uploads et les extractions"""
+    from app.core.extraction import ExtractionQueue
+    from app.core.index import UploadIndex
+    from app.core.matching import MatchingIndex
+
+    index, queue = UploadIndex(), ExtractionQueue()
+    indexed = MatchingIndex().rebuild_sync(index.iter_metadata_sync(), queue.get_text_sync)
+    for store in (index, queue):
+        store.close()
+    print(f"✅ Matrice de matching reconstruite : {indexed} candidats vectorisés")
+
+
+def compact_log(args: argparse.Namespace) -> None:
+    """Compacte les journaux du backend "log" (versions remplacées et suppressions)"""
+    from app.core.storage import LogStructuredStorageBackend
+
+    backend = LogStructuredStorageBackend()
+    for folder in args.folders or backend.log_folders():
+        result = backend.compact_sync(folder)
+        print(
+            f"✅ {folder} : {result['segments']} segments compactés, "
+            f"{result['kept']} enregistrements conservés, {result['dropped']} supprimés"
+        )
+
+
+def purge_expired(args: argparse.Namespace) -> None:
+    """Purge RGPD des uploads plus anciens que RETENTION_DAYS (ou simulation)"""
+    import asyncio
+    import json
+
+    from app.core.extraction import ExtractionQueue
+    from app.core.io_pool import shutdown_io_executor
+    from app.core.matching import MatchingIndex
+    from app.core.retention import RetentionPurger
+    from app.core.search import SearchIndex
+    from app.core.storage import StorageService
+
+    if args.days is not None:
+        settings.RETENTION_DAYS = args.days
+
+    async def run() -> dict:
+        storage_service, queue, search_index = StorageService(), ExtractionQueue(), SearchIndex()
+        purger = RetentionPurger(storage_service)
+        purger.add_purge_listener(search_index.on_purge)
+        purger.add_purge_listener(queue.delete)
+        purger.add_purge_listener(MatchingIndex().on_purge)
+        await storage_service.startup()
+        try:
+            if args.dry_run:
+                return await purger.report(args.sample_size)
+            return await purger.purge(args.max_uploads)
+        finally:
+            await storage_service.shutdown()
+            queue.close()
+            search_index.close()
+
+    result = asyncio.run(run())
+    shutdown_io_executor()
+    if args.dry_run:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    elif result["skipped"]:
+        print("⏳ Purge déjà en cours dans un autre processus")
+    else:
+        print(
+            f"✅ Purge terminée (uploads créés avant {result['cutoff']}) : "
+            f"{result['uploads']} uploads, {result['files']} fichiers supprimés"
+        )
+
+
+def outbox_status(args: argparse.Namespace) -> None:
+    """État de l'outbox d'événements ; remise en file des événements abandonnés"""
+    from app.core.index import UploadIndex
+
+    index = UploadIndex()
+    if args.requeue_dead:
+        print(f"✅ {index.requeue_dead_events_sync()} événements abandonnés remis en file")
+    stats = index.outbox_stats_sync()
+    index.close()
+    print(f"Outbox : {stats.get('pending', 0)} événements à livrer, {stats.get('dead', 0)} abandonnés")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Commandes d'administration du service d'upload")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subparsers.add_parser("rebuild-index", help="Reconstruit l'index SQLite des uploads")
+    rebuild.add_argument("--data-dir", help="Dossier de fichiers JSON (défaut : selon STORAGE_BACKEND)")
+    rebuild.add_argument("--backend")
+    rebuild.set_defaults(func=rebuild_index)
+
+    rebuild_search_parser = subparsers.add_parser(
+        "rebuild-search", help="Reconstruit l'index plein texte des candidats"
+    )
+    rebuild_search_parser.set_defaults(func=rebuild_search)
+
+    rebuild_match_parser = subparsers.add_parser(
+        "rebuild-match", help="Recalcule la matrice de matching des CV"
+    )
+    rebuild_match_parser.set_defaults(func=rebuild_match)
+
+    migrate = subparsers.add_parser(
+        "migrate-shards", help="Déplace les fichiers à plat vers les sous-dossiers de répartition"
+    )
+    migrate.add_argument("--folders", nargs="+", default=["cv", "data"])
+    migrate.add_argument("--batch-size", type=int, default=1000)
+    migrate.add_argument("--pause", type=float, default=0.1, help="Pause entre deux lots (secondes)")
+    migrate.set_defaults(func=migrate_shards)
+
+    compact = subparsers.add_parser("compact-log", help="Compacte les journaux du backend log")
+    compact.add_argument("--folders", nargs="+", help="Dossiers à compacter (défaut : tous)")
+    compact.set_defaults(func=compact_log)
+
+    purge = subparsers.add_parser(
+        "purge-expired", help="Supprime les uploads plus anciens que la durée de conservation"
+    )
+    purge.add_argument("--days", type=int, help="Durée de conservation (défaut : RETENTION_DAYS)")
+    purge.add_argument("--dry-run", action="store_true", help="Rapport sans suppression")
+    purge.add_argument("--sample-size", type=int, default=20, help="Uploads listés dans le rapport")
+    purge.add_argument("--max-uploads", type=int, help="Limite de la purge (défaut : RETENTION_MAX_UPLOADS_PER_RUN)")
+    purge.set_defaults(func=purge_expired)
+
+    outbox = subparsers.add_parser("outbox", help="État de l'outbox d'événements vers les services aval")
+    outbox.add_argument("--requeue-dead", action="store_true", help="Remet en file les événements abandonnés")
+    outbox.set_defaults(func=outbox_status)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,75 @@
+import importlib.util
 import uvicorn
 import os
 
+from app.core.config import settings
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def production_options() -> dict:
+    """
+    Options uvicorn du mode production (MODE=production)
+    Un worker par cœur, boucle uvloop et parseur httptools (uvicorn[standard]),
+    keep-alive supérieur au délai d'inactivité des load balancers, file d'attente
+    de connexions élargie, arrêt progressif laissant terminer les uploads en cours
+    """
+    workers = int(os.getenv("WORKERS", 0)) or os.cpu_count() or 1
+
+    # Le pool d'extraction est propre à chaque worker : les cœurs sont partagés
+    # au lieu de lancer workers × CPU processus. Une valeur configurée (variable
+    # d'environnement ou .env, lus par settings) est conservée
+    if not settings.EXTRACTION_WORKERS:
+        os.environ["EXTRACTION_WORKERS"] = str(max(1, (os.cpu_count() or 1) // workers))
+
+    return {
+        "workers": workers,
+        "loop": "uvloop" if _installed("uvloop") else "auto",
+        "http": "httptools" if _installed("httptools") else "auto",
+        "timeout_keep_alive": int(os.getenv("KEEP_ALIVE", 75)),
+        "backlog": int(os.getenv("BACKLOG", 4096)),
+        # Délai laissé aux requêtes en cours (uploads) après SIGTERM
+        "timeout_graceful_shutdown": int(os.getenv("GRACEFUL_TIMEOUT", 60)),
+        # Adresse client réelle derrière le proxy (limitation de débit par IP)
+        "proxy_headers": True,
+        "forwarded_allow_ips": os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        "access_log": os.getenv("ACCESS_LOG", "false").lower() == "true",
+    }
+
+
 if __name__ == "__main__":
     # Configuration du serveur
-    host = os.getenv("HOST", "127.0.0.1")
+    production = os.getenv("MODE", "development").lower() == "production"
+    host = os.getenv("HOST", "0.0.0.0" if production else "127.0.0.1")
     port = int(os.getenv("PORT", 8000))
-    reload = os.getenv("RELOAD", "true").lower() == "true"
-    
+    reload = not production and os.getenv("RELOAD", "true").lower() == "true"
+
     # Création des dossiers nécessaires
     os.makedirs("uploads/cv", exist_ok=True)
     os.makedirs("uploads/data", exist_ok=True)
-    
-    print(f"🚀 Démarrage du serveur FastAPI...")
+
+    options = production_options() if production else {"reload": reload}
+
+    if production:
+        # Vérification seulement, pas un préchauffage : uvicorn lance ses workers
+        # par spawn, qui réimportent tout (préchauffage dans le lifespan, warm_up).
+        # Une erreur de configuration ou d'import arrête ici le démarrage au lieu
+        # de faire boucler les workers
+        import app.main  # noqa: F401
+
+    print(f"🚀 Démarrage du serveur FastAPI ({'production' if production else 'développement'})...")
     print(f"📂 Dossiers uploads créés")
+    if production:
+        print(f"⚙️  {options['workers']} workers, boucle {options['loop']}, http {options['http']}")
     print(f"🌐 http://{host}:{port}")
     print(f"📚 Documentation: http://{host}:{port}/docs")
-    
+
     uvicorn.run(
         "app.main:app",
         host=host,
         port=port,
-        reload=reload,
-        log_level="info"
-    ) 
\ No newline at end of file
+        log_level="info",
+        **options
+    )
@@ -0,0 +1,56 @@
+"""Export en flux : une erreur en cours d'envoi termine le fichier par une ligne d'erreur"""
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.core.export import CSV_ERROR_MARKER, iter_export
+
+
+class FailingIndex:
+    """Index dont la lecture échoue après le premier lot"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def page_sync(self, limit, after=None, created_from=None, created_to=None):
+        self.calls += 1
+        if self.calls > 1:
+            raise OSError("disk I/O error")
+        return [{
+            "upload_id": "upload-a",
+            "created_at": "2026-01-01T00:00:00+00:00",
+            "metadata": json.dumps({"upload_id": "upload-a", "form_data": {"nom": "Dupont"}})
+        }]
+
+
+def _export(export_format):
+    async def collect():
+        return b"".join([chunk async for chunk in iter_export(FailingIndex(), export_format)])
+
+    return asyncio.run(collect()).decode("utf-8")
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 1)
+
+
+def test_ndjson_export_ends_with_error_line():
+    lines = _export("ndjson").splitlines()
+
+    assert json.loads(lines[0])["upload_id"] == "upload-a"
+    assert json.loads(lines[-1]) == {
+        "export_error": "Export interrompu : erreur de lecture de l'index",
+        "last_created_at": "2026-01-01T00:00:00+00:00"
+    }
+
+
+def test_csv_export_ends_with_trailer_row():
+    rows = list(csv.reader(io.StringIO(_export("csv"))))
+
+    assert rows[1][0] == "upload-a"
+    assert rows[-1][:2] == [CSV_ERROR_MARKER, "2026-01-01T00:00:00+00:00"]
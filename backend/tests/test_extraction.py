@@ -0,0 +1,80 @@
+"""Extraction des CV : échecs de téléchargement et fichiers du cache disque"""
+import asyncio
+import os
+
+import pytest
+from pypdf import PdfWriter
+
+from app.core.blob_cache import BlobCache
+from app.core.config import settings
+from app.core.extraction import FAILED, PENDING, ExtractionPipeline, extract_pdf
+from app.core.storage import StorageService
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "OUTBOX_SINK_URL", "")
+    service = StorageService()
+    pipeline = ExtractionPipeline(service)
+    yield pipeline
+    pipeline.queue.close()
+    service.index.close()
+
+
+@pytest.mark.parametrize("attempts, status", [(1, PENDING), (3, FAILED)])
+def test_download_error_is_retried_then_failed(pipeline, monkeypatch, attempts, status):
+    monkeypatch.setattr(settings, "EXTRACTION_MAX_ATTEMPTS", 3)
+
+    async def unreachable(filename, folder):
+        raise ConnectionError("stockage distant injoignable")
+
+    monkeypatch.setattr(pipeline.storage_service.backend, "fetch_local_path", unreachable)
+    pipeline.queue.enqueue_sync("upload-1", "cv.pdf")
+    for _ in range(attempts):
+        job = pipeline.queue.claim_sync(1)[0]
+        pipeline.queue.complete_sync("upload-1", PENDING)
+    asyncio.run(pipeline._process(job))
+
+    state = pipeline.queue.get_job_sync("upload-1")
+    assert state["status"] == status
+    assert "injoignable" in state["error"]
+
+
+def test_pinned_file_survives_eviction(tmp_path):
+    cache = BlobCache(directory=str(tmp_path / "cache"), db_path=str(tmp_path / "cache.db"))
+    # Base créée avant le premier fichier (comme à l'ouverture du backend)
+    assert cache.lookup_sync("cv.pdf", "cv") is None
+    temp_path = cache.temp_path()
+    with open(temp_path, "wb") as f:
+        f.write(b"%PDF-1.4 cv")
+    path = cache.admit_sync("cv.pdf", "cv", temp_path)
+
+    pinned = cache.pin_sync(path)
+    cache.discard_sync(["cv.pdf"], "cv")
+    assert not os.path.exists(path)
+    with open(pinned, "rb") as f:
+        assert f.read() == b"%PDF-1.4 cv"
+
+    cache.unpin_sync(pinned)
+    assert not os.path.exists(pinned)
+    cache.close()
+
+
+@pytest.fixture
+def encrypted_pdf(tmp_path):
+    """PDF protégé par un mot de passe utilisateur"""
+    writer = PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    writer.encrypt("secret", algorithm="RC4-128")
+    path = tmp_path / "protected.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_password_protected_pdf_is_reported_encrypted(encrypted_pdf):
+    assert extract_pdf(encrypted_pdf, 1000) == {
+        "encrypted": True, "page_count": None, "text": "", "text_truncated": False
+    }
@@ -0,0 +1,74 @@
+"""Clés d'idempotence : portée par client et empreinte du corps"""
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.config import settings
+from app.core.idempotency import IdempotencyStore
+from app.core.middleware import BodyFingerprint, IdempotencyMiddleware
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_API_KEYS", ["cle-a", "cle-b"])
+    calls = []
+
+    async def upload(request: Request):
+        form = await request.form()
+        calls.append(form["nom"])
+        return JSONResponse({"call": len(calls), "nom": form["nom"]}, status_code=201)
+
+    app = Starlette(routes=[Route("/api/upload", upload, methods=["POST"])])
+    store = IdempotencyStore(str(tmp_path / "idempotency.db"))
+    app.add_middleware(IdempotencyMiddleware, paths=["/api/upload"], store=store)
+    with TestClient(app) as client:
+        client.calls = calls
+        yield client
+    store.close()
+
+
+def _post(client, nom, api_key="cle-a", key="k1"):
+    headers = {settings.IDEMPOTENCY_HEADER: key, settings.RATE_LIMIT_API_KEY_HEADER: api_key}
+    return client.post("/api/upload", data={"nom": nom}, files={"cv": ("cv.pdf", b"%PDF")}, headers=headers)
+
+
+def test_retry_replays_response(client):
+    first = _post(client, "Dupont")
+    # Nouvel envoi : délimiteur multipart différent, même contenu
+    second = _post(client, "Dupont")
+    assert first.status_code == second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.json()
+    assert client.calls == ["Dupont"]
+
+
+def test_key_reused_with_other_body_is_rejected(client):
+    assert _post(client, "Dupont").status_code == 201
+    response = _post(client, "Martin")
+    assert response.status_code == 422
+    assert client.calls == ["Dupont"]
+
+
+def test_keys_are_scoped_to_client(client):
+    assert _post(client, "Dupont", api_key="cle-a").json()["call"] == 1
+    other = _post(client, "Martin", api_key="cle-b")
+    assert other.status_code == 201
+    assert "Idempotent-Replayed" not in other.headers
+    assert other.json() == {"call": 2, "nom": "Martin"}
+
+
+def test_fingerprint_ignores_boundary_split_across_chunks():
+    def digest(boundary: bytes, chunk_size: int) -> str:
+        scope = {"headers": [(b"content-type", b"multipart/form-data; boundary=" + boundary)]}
+        body = b"--" + boundary + b"\r\ncontenu\r\n--" + boundary + b"--\r\n"
+        fingerprint = BodyFingerprint(scope)
+        for start in range(0, len(body), chunk_size):
+            fingerprint.update(body[start:start + chunk_size])
+        return fingerprint.hexdigest()
+
+    reference = digest(b"aaaaaaaaaaaaaaaa", 1000)
+    assert all(digest(b"b1b2b3b4b5b6b7b8", size) == reference for size in (1, 3, 7, 16))
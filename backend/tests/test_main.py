@@ -0,0 +1,17 @@
+"""Ordre des middlewares de l'application"""
+import importlib
+
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.core.middleware import IdempotencyMiddleware, RateLimitMiddleware, UploadSizeLimitMiddleware
+
+
+def test_cors_wraps_early_responses(tmp_path, monkeypatch):
+    # Dossiers créés à l'import (uploads/, state/) dans un dossier temporaire
+    monkeypatch.chdir(tmp_path)
+    main = importlib.import_module("app.main")
+    # Le premier de user_middleware est le plus extérieur
+    order = [middleware.cls for middleware in main.app.user_middleware]
+    cors = order.index(CORSMiddleware)
+    for early in (UploadSizeLimitMiddleware, RateLimitMiddleware, IdempotencyMiddleware):
+        assert cors < order.index(early)
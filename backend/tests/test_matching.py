@@ -0,0 +1,57 @@
+"""Ajout par lots des nouveaux uploads à la matrice de matching"""
+import asyncio
+import os
+
+import numpy as np
+
+from app.core.matching import MatchingIndex
+
+
+def _index(tmp_path):
+    return MatchingIndex(directory=str(tmp_path / "match"), dim=64)
+
+
+def test_uploads_are_inserted_in_one_batch(tmp_path):
+    index = _index(tmp_path)
+
+    async def scenario():
+        await index.start()
+        for nom in ("Dupont", "Martin", "Durand"):
+            await index.on_upload({"upload_id": f"upload-{nom}", "form_data": {"nom": nom}})
+        # Rien n'est écrit pendant la requête
+        assert index._row_count() == 0
+        await index.stop()
+
+    asyncio.run(scenario())
+    assert index._row_count() == 3
+    assert index._load_df()[-1] == 3
+    assert index.top_k_sync("Martin", 1)[1][0]["upload_id"] == "upload-Martin"
+
+
+def test_row_added_by_extraction_before_insert_is_kept(tmp_path):
+    index = _index(tmp_path)
+    index.insert_many_sync([("upload-a", "Dupont", 0)])
+    queued_rows = index._row_count()
+    # Extraction terminée (autre worker) avant l'ajout du lot de l'upload
+    index.upsert_sync("upload-b", "Martin développeur Python")
+
+    assert index.insert_many_sync([("upload-b", "Martin", queued_rows), ("upload-c", "Durand", queued_rows)]) == 1
+    ids = np.fromfile(index.ids_path, dtype="S36")
+    assert sorted(upload_id.strip() for upload_id in ids.tolist()) == [b"upload-a", b"upload-b", b"upload-c"]
+    assert index._load_df()[-1] == 3
+
+
+def test_rebuild_replaces_files_mapped_by_other_workers(tmp_path):
+    reader, rebuilder = _index(tmp_path), _index(tmp_path)
+    reader.insert_many_sync([("upload-a", "Dupont", 0), ("upload-b", "Martin", 0)])
+    _, vectors, ids = reader._refresh()
+
+    uploads = [{"upload_id": "upload-c", "form_data": {"nom": "Durand"}},
+               {"upload_id": "upload-d", "form_data": {"nom": "Bernard"}}]
+    assert rebuilder.rebuild_sync(uploads, lambda upload_id: None) == 2
+
+    # Ancienne matrice toujours lisible (fichiers non tronqués), puis re-mappée
+    assert [upload_id.strip() for upload_id in ids.tolist()] == [b"upload-a", b"upload-b"]
+    assert np.count_nonzero(vectors) > 0
+    assert reader.top_k_sync("Durand", 1)[1][0]["upload_id"] == "upload-c"
+    assert sorted(os.listdir(tmp_path / "match")) == ["df_64.i64", "ids_64.bin", "matching.lock", "vectors_64.f32"]
@@ -0,0 +1,40 @@
+"""Dossier des métriques multi-processus : valeurs d'un lancement précédent effacées"""
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env(directory):
+    env = {key: value for key, value in os.environ.items() if key != "PROMETHEUS_MULTIPROC_DIR"}
+    env.update(METRICS_MULTIPROC_DIR=str(directory), PYTHONPATH=BACKEND_DIR)
+    return env
+
+
+def _import_metrics(directory):
+    subprocess.run([sys.executable, "-c", "import app.core.metrics"], env=_env(directory), check=True)
+
+
+def test_stale_values_are_removed_without_live_worker(tmp_path):
+    directory = tmp_path / "metrics"
+    directory.mkdir()
+    (directory / "counter_1234.db").write_bytes(b"stale")
+    _import_metrics(directory)
+    assert not (directory / "counter_1234.db").exists()
+
+
+def test_values_are_kept_while_a_worker_is_alive(tmp_path):
+    directory = tmp_path / "metrics"
+    worker = subprocess.Popen(
+        [sys.executable, "-c", "import sys, app.core.metrics; print('ok', flush=True); sys.stdin.read()"],
+        env=_env(directory), stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+    try:
+        assert worker.stdout.readline().strip() == b"ok"
+        (directory / "counter_1234.db").write_bytes(b"live")
+        _import_metrics(directory)
+        assert (directory / "counter_1234.db").exists()
+    finally:
+        worker.stdin.close()
+        worker.wait()
@@ -0,0 +1,83 @@
+"""Rattrapage des index de recherche et de matching depuis l'index des uploads"""
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.matching import MatchingIndex
+from app.core.reconcile import IndexReconciler
+from app.core.search import SearchIndex
+from app.core.storage import StorageService
+
+FORM = {"prenom": "Jean", "nom": "Dupont", "rgpd_consent": True}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "OUTBOX_SINK_URL", "")
+    service = StorageService()
+    yield service
+    service.index.close()
+
+
+def _upload(service, nom):
+    cv = f"%PDF-1.4\n% CV de {nom}\n%%EOF\n".encode()
+    return asyncio.run(service.save_cv_upload(cv, {**FORM, "nom": nom}))
+
+
+def _reconciler(service, search_index, matching_index):
+    return IndexReconciler(
+        service.index, lambda upload_id: None, [search_index, matching_index], lock_path="state/reconcile.lock"
+    )
+
+
+def test_new_indexes_are_filled_from_upload_index(service, tmp_path):
+    # Uploads antérieurs aux index (nouveau déploiement)
+    for nom in ("Dupont", "Martin", "Durand"):
+        _upload(service, nom)
+    search_index, matching_index = SearchIndex(str(tmp_path / "search.db")), MatchingIndex(directory=str(tmp_path / "m"))
+
+    assert asyncio.run(_reconciler(service, search_index, matching_index).reconcile()) == 6
+    assert search_index.search_sync("Martin", 10, 0)[0] == 1
+    assert matching_index._row_count() == 3
+    assert search_index.reconcile_position_sync() is not None
+    search_index.close()
+
+
+def test_failed_listener_is_caught_up_once(service, tmp_path):
+    search_index, matching_index = SearchIndex(str(tmp_path / "search.db")), MatchingIndex(directory=str(tmp_path / "m"))
+    reconciler = _reconciler(service, search_index, matching_index)
+    indexed = _upload(service, "Dupont")
+    search_index.index_upload_sync(indexed)
+    matching_index.upsert_sync(indexed["upload_id"], "Dupont")
+    asyncio.run(reconciler.reconcile())
+
+    # Listeners en échec pour cet upload : rien d'indexé
+    _upload(service, "Martin")
+    assert search_index.search_sync("Martin", 10, 0)[0] == 0
+
+    assert asyncio.run(reconciler.reconcile()) == 2
+    assert search_index.search_sync("Martin", 10, 0)[0] == 1
+    assert matching_index._row_count() == 2
+    # Uploads déjà présents : rien n'est ajouté deux fois
+    assert asyncio.run(reconciler.reconcile()) == 0
+    search_index.close()
+
+
+def test_upload_purged_during_reconcile_is_dropped(service, tmp_path):
+    search_index, matching_index = SearchIndex(str(tmp_path / "search.db")), MatchingIndex(directory=str(tmp_path / "m"))
+    upload = _upload(service, "Dupont")
+    add_missing = search_index.add_missing_sync
+
+    def purge_then_add(uploads, cv_text_lookup):
+        # Purge validée entre la lecture du lot et son ajout
+        service.index.purge_uploads_sync([upload["upload_id"]])
+        return add_missing(uploads, cv_text_lookup)
+
+    search_index.add_missing_sync = purge_then_add
+    asyncio.run(_reconciler(service, search_index, matching_index).reconcile())
+    assert search_index.search_sync("Dupont", 10, 0)[0] == 0
+    assert matching_index.top_k_sync("Dupont", 5)[1] == []
+    search_index.close()
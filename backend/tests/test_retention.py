@@ -0,0 +1,83 @@
+"""Purge de rétention et uploads simultanés du même CV (déduplication par empreinte)"""
+import asyncio
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.core.storage import StorageService
+
+CV = b"%PDF-1.4\n% CV de test\n%%EOF\n"
+FORM = {"prenom": "Jean", "nom": "Dupont", "email": "jean.dupont@example.com", "rgpd_consent": True}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # Chemins relatifs (uploads/, state/) résolus dans un dossier temporaire
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(settings, "OUTBOX_SINK_URL", "")
+    monkeypatch.setattr(settings, "RETENTION_LOCK_POLL_INTERVAL", 0.01)
+    service = StorageService()
+    yield service
+    service.index.close()
+
+
+def _cv_path(service: StorageService, filename: str) -> str:
+    return service.backend.resolve_path(filename, "cv")
+
+
+def test_upload_waits_for_deletion_of_same_cv(service):
+    async def scenario():
+        first = await service.save_cv_upload(CV, FORM)
+        filename = f"{first['cv_sha256']}.pdf"
+        await service.index.purge_uploads([first["upload_id"]])
+
+        # La purge réserve le CV orphelin puis le supprime...
+        claimed = [row for row in await service.index.claim_deletions(100) if row["folder"] == "cv"]
+        assert [row["filename"] for row in claimed] == [filename]
+
+        # ...pendant qu'un upload du même contenu arrive
+        upload = asyncio.create_task(service.save_cv_upload(CV, FORM))
+        await asyncio.sleep(0.2)
+        assert not upload.done()
+
+        deleted = await service.backend.delete_files([filename], "cv")
+        await service.index.finish_deletions("cv", deleted, claimed)
+        return await asyncio.wait_for(upload, 5)
+
+    second = asyncio.run(scenario())
+    # Le CV supprimé est réécrit par l'upload : ses métadonnées pointent vers un fichier existant
+    assert second["cv_deduplicated"] is False
+    assert second["cv_refcount"] == 1
+    assert os.path.exists(_cv_path(service, f"{second['cv_sha256']}.pdf"))
+
+
+def test_deletion_skips_cv_claimed_by_upload(service):
+    async def scenario():
+        first = await service.save_cv_upload(CV, FORM)
+        sha256 = first["cv_sha256"]
+        # Upload en cours : CV réservé, pas encore enregistré dans l'index
+        assert await asyncio.to_thread(service.index.claim_cv_sync, sha256)
+        await service.index.purge_uploads([first["upload_id"]])
+        claimed = await service.index.claim_deletions(100)
+        return sha256, [row["filename"] for row in claimed if row["folder"] == "cv"]
+
+    sha256, claimed = asyncio.run(scenario())
+    assert claimed == []
+    assert os.path.exists(_cv_path(service, f"{sha256}.pdf"))
+
+
+def test_upload_cancels_queued_deletion(service):
+    async def scenario():
+        first = await service.save_cv_upload(CV, FORM)
+        await service.index.purge_uploads([first["upload_id"]])
+        # Nouvel upload du même CV avant le passage de la suppression
+        second = await service.save_cv_upload(CV, FORM)
+        claimed = await service.index.claim_deletions(100)
+        return second, [row["filename"] for row in claimed if row["folder"] == "cv"]
+
+    second, claimed = asyncio.run(scenario())
+    assert second["cv_deduplicated"] is True
+    assert claimed == []
+    assert os.path.exists(_cv_path(service, f"{second['cv_sha256']}.pdf"))
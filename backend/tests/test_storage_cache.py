@@ -0,0 +1,88 @@
+"""Backend distant précédé du cache disque : lectures de CV"""
+import asyncio
+import os
+
+import pytest
+
+from app.core.blob_cache import BlobCache
+from app.core.storage import TieredStorageBackend
+
+CV = b"%PDF-1.4\n" + b"x" * 4096 + b"\n%%EOF\n"
+
+
+class FakeRemote:
+    """Backend distant en mémoire, qui compte les lectures"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.files = {("cv", "cv.pdf"): CV}
+        self.reads = []
+
+    async def get_file_size(self, filename, folder):
+        content = self.files.get((folder, filename))
+        return len(content) if content is not None else None
+
+    async def stream_range(self, filename, folder, offset, length):
+        self.reads.append((offset, length))
+        yield self.files[(folder, filename)][offset:offset + length]
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def backend(tmp_path):
+    cache = BlobCache(directory=str(tmp_path / "cache"), db_path=str(tmp_path / "cache.db"))
+    # Base créée avant le premier fichier (comme à l'ouverture du backend)
+    assert cache.lookup_sync("cv.pdf", "cv") is None
+    backend = TieredStorageBackend(FakeRemote(), cache)
+    yield backend
+    cache.close()
+
+
+def _cache(backend, filename="cv.pdf"):
+    async def fill():
+        await backend._local(filename, "cv")
+
+    asyncio.run(fill())
+
+
+def test_pinned_cv_survives_eviction(backend):
+    _cache(backend)
+    pinned = backend.pin_local_path("cv.pdf", "cv")
+    backend.cache.discard_sync(["cv.pdf"], "cv")
+
+    with open(pinned, "rb") as f:
+        assert f.read() == CV
+    backend.release_local_path(pinned)
+    assert not os.path.exists(pinned)
+
+
+def test_uncached_cv_is_not_pinned(backend):
+    assert backend.pin_local_path("cv.pdf", "cv") is None
+
+
+def test_size_of_uncached_cv_does_not_download_it(backend):
+    assert asyncio.run(backend.get_file_size("cv.pdf", "cv")) == len(CV)
+    assert backend.remote.reads == []
+    assert backend.cache.lookup_sync("cv.pdf", "cv") is None
+
+
+def test_uncached_range_is_relayed_then_cached(backend):
+    async def scenario():
+        first = b"".join([chunk async for chunk in backend.stream_range("cv.pdf", "cv", 0, 100)])
+        # Plage relayée telle quelle, sans attendre le fichier complet
+        assert first == CV[:100]
+        assert backend.remote.reads[0] == (0, 100)
+        await asyncio.gather(*backend._background_fills)
+
+    asyncio.run(scenario())
+    assert backend.remote.reads[1] == (0, len(CV))
+    assert backend.cache.lookup_sync("cv.pdf", "cv")[1] == len(CV)
+
+    async def cached_range():
+        return b"".join([chunk async for chunk in backend.stream_range("cv.pdf", "cv", 10, 20)])
+
+    assert asyncio.run(cached_range()) == CV[10:30]
+    assert len(backend.remote.reads) == 2
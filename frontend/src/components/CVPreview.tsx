@@ -1,4 +1,4 @@
-import { useState } from 'react'
+import { useEffect, useMemo, useState } from 'react'
 import { Document, Page, pdfjs } from 'react-pdf'
 import { ChevronLeft, ChevronRight, Eye, EyeOff } from 'lucide-react'
 
@@ -6,7 +6,8 @@ import { ChevronLeft, ChevronRight, Eye, EyeOff } from 'lucide-react'
 pdfjs.GlobalWorkerOptions.workerSrc = `//unpkg.com/pdfjs-dist@${pdfjs.version}/build/pdf.worker.min.js`
 
 interface CVPreviewProps {
-  file: File
+  // Fichier local avant envoi, ou URL d'un CV déjà envoyé (chargé par plages via Range)
+  file: File | string
 }
 
 const CVPreview = ({ file }: CVPreviewProps) => {
@@ -16,7 +17,15 @@ const CVPreview = ({ file }: CVPreviewProps) => {
   const [loading, setLoading] = useState<boolean>(false)
   const [error, setError] = useState<string | null>(null)
 
-  const fileUrl = URL.createObjectURL(file)
+  const fileUrl = useMemo(
+    () => (typeof file === 'string' ? file : URL.createObjectURL(file)),
+    [file]
+  )
+
+  useEffect(() => {
+    if (typeof file === 'string') return
+    return () => URL.revokeObjectURL(fileUrl)
+  }, [file, fileUrl])
 
   const onDocumentLoadSuccess = ({ numPages }: { numPages: number }) => {
     setNumPages(numPages)
@@ -132,6 +132,10 @@ const CVUploadForm = () => {
         <p className="text-sm text-gray-500 mb-6">
           ID de référence: <code className="bg-gray-100 px-2 py-1 rounded">{uploadSuccess}</code>
         </p>
+        {/* Aperçu du CV enregistré, chargé par plages depuis le serveur */}
+        <div className="text-left mb-6">
+          <CVPreview file={apiService.getCVUrl(uploadSuccess)} />
+        </div>
         <button
           onClick={() => {
             setUploadSuccess(null)
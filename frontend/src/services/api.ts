@@ -51,5 +51,12 @@ export const apiService = {
   async getUploadDetails(uploadId: string): Promise<any> {
     const response = await apiClient.get(`/api/uploads/${uploadId}`)
     return response.data
+  },
+
+  /**
+   * URL du CV d'un upload (requêtes Range supportées, pour l'aperçu PDF progressif)
+   */
+  getCVUrl(uploadId: string): string {
+    return `${API_BASE_URL}/api/uploads/${uploadId}/cv`
   }
 } 
\ No newline at end of file